@@ -12,7 +12,9 @@ import { Order } from '../../models/order.model';
 })
 export class MyOrdersComponent implements OnInit {
   orders: Order[] = [];
+  nextCursor: string | null = null;
   loading = false;
+  loadingMore = false;
   errorMessage = '';
 
   constructor(private orderService: OrderService) {}
@@ -26,8 +28,9 @@ export class MyOrdersComponent implements OnInit {
     this.errorMessage = '';
 
     this.orderService.getMyOrders().subscribe({
-      next: (data) => {
-        this.orders = data;
+      next: (page) => {
+        this.orders = page.orders;
+        this.nextCursor = page.nextCursor;
         this.loading = false;
       },
       error: (error) => {
@@ -38,6 +41,28 @@ export class MyOrdersComponent implements OnInit {
     });
   }
 
+  // Append the next page of orders
+  loadMore(): void {
+    if (!this.nextCursor || this.loadingMore) {
+      return;
+    }
+    this.loadingMore = true;
+    this.errorMessage = '';
+
+    this.orderService.getMyOrders(this.nextCursor).subscribe({
+      next: (page) => {
+        this.orders = [...this.orders, ...page.orders];
+        this.nextCursor = page.nextCursor;
+        this.loadingMore = false;
+      },
+      error: (error) => {
+        this.loadingMore = false;
+        this.errorMessage = 'Failed to load more orders. Please try again later.';
+        console.error('Error loading more orders:', error);
+      }
+    });
+  }
+
   getStatusClass(status: string): string {
     const statusMap: { [key: string]: string } = {
       'PENDING': 'status-pending',
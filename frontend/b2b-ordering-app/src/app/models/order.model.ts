@@ -24,3 +24,9 @@ export interface Order {
   created_at: string;
   items: OrderItem[];
 }
+
+// One page of an order list; nextCursor is null on the last page
+export interface OrderPage {
+  orders: Order[];
+  nextCursor: string | null;
+}
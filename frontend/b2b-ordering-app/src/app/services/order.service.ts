@@ -1,10 +1,10 @@
 // src/app/services/order.service.ts
 
 import { Injectable } from '@angular/core';
-import { HttpClient } from '@angular/common/http';
+import { HttpClient, HttpParams, HttpResponse } from '@angular/common/http';
 import { Observable, throwError } from 'rxjs';
-import { catchError } from 'rxjs/operators';
-import { Order, OrderCreateRequest } from '../models/order.model';
+import { catchError, map } from 'rxjs/operators';
+import { Order, OrderCreateRequest, OrderPage } from '../models/order.model';
 
 @Injectable({
   providedIn: 'root'
@@ -14,12 +14,29 @@ export class OrderService {
 
   constructor(private http: HttpClient) {}
 
-  getOrders(): Observable<Order[]> {
-    return this.http.get<Order[]>(this.apiUrl);
+  // The lists are paginated: pass the nextCursor of a page to get the next one
+  getOrders(cursor?: string | null, limit?: number): Observable<OrderPage> {
+    return this.getPage(this.apiUrl, cursor, limit);
   }
 
-  getMyOrders(): Observable<Order[]> {
-    return this.http.get<Order[]>(`${this.apiUrl}/me`);
+  getMyOrders(cursor?: string | null, limit?: number): Observable<OrderPage> {
+    return this.getPage(`${this.apiUrl}/me`, cursor, limit);
+  }
+
+  private getPage(url: string, cursor?: string | null, limit?: number): Observable<OrderPage> {
+    let params = new HttpParams();
+    if (cursor) {
+      params = params.set('cursor', cursor);
+    }
+    if (limit) {
+      params = params.set('limit', limit);
+    }
+    return this.http.get<Order[]>(url, { params, observe: 'response' }).pipe(
+      map((response: HttpResponse<Order[]>) => ({
+        orders: response.body ?? [],
+        nextCursor: response.headers.get('X-Next-Cursor')
+      }))
+    );
   }
 
   getOrder(id: string): Observable<Order> {
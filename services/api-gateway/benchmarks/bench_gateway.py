@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Gateway benchmark: drives the gateway app in process, against stub
+upstreams, with an async load generator
+
+    python benchmarks/bench_gateway.py --duration 10 --concurrency 32 --output results.json
+    python benchmarks/bench_gateway.py --compare results.json --output results-new.json
+
+Every scenario runs on a fresh gateway (empty caches), reports RPS and
+p50/p95/p99 latency for a timed run, and the peak Python heap of a
+separate, shorter run under tracemalloc (tracing slows requests down, so
+it is kept out of the timed run). Results are written as JSON.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from jose import jwt
+
+# Add src (the gateway) and this directory (the stubs) to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.auth import token_cache  # noqa: E402
+from app.config import config  # noqa: E402
+from app.main import create_app  # noqa: E402
+from stubs import ORDER_ID, PRODUCT_ID, StubUpstreams  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+
+class Scenario:
+    def __init__(
+        self,
+        name: str,
+        method: str,
+        path: str,
+        payload: str = "small",
+        request_body: Optional[str] = None,
+        jwt_cache: bool = True
+    ):
+        self.name = name
+        self.method = method
+        self.path = path
+        # Size of the upstream responses ("small" or "large")
+        self.payload = payload
+        # Size of the request body, None for bodiless requests
+        self.request_body = request_body
+        self.jwt_cache = jwt_cache
+
+
+SCENARIOS = [
+    Scenario("jwt_cached", "GET", f"/orders/{ORDER_ID}"),
+    Scenario("jwt_uncached", "GET", f"/orders/{ORDER_ID}", jwt_cache=False),
+    Scenario("small_body", "POST", "/orders/create", request_body="small"),
+    Scenario("large_body", "POST", "/orders/create", payload="large", request_body="large"),
+    Scenario("catalog_cached", "GET", f"/products/{PRODUCT_ID}"),
+    Scenario("fan_out_details", "GET", f"/orders/{ORDER_ID}/details"),
+    Scenario("fan_out_batch", "POST", "/batch"),
+]
+
+
+def make_token() -> str:
+    payload = {
+        "sub": "12345678-1234-5678-1234-567812345678",
+        "role": "staff",
+        "department_id": "00000000-0000-0000-0000-000000000001",
+        "type": "access",
+        "exp": int(time.time()) + 3600,
+    }
+    return jwt.encode(payload, config.JWT_SECRET, algorithm=config.ALGORITHM)
+
+
+def request_body(scenario: Scenario, options) -> Optional[bytes]:
+    if scenario.name == "fan_out_batch":
+        return json.dumps({"requests": [
+            {"id": str(index), "path": f"/products/list?name=Product%20{index}&limit=1"}
+            for index in range(options.fan_out)
+        ]}).encode()
+    if scenario.request_body is None:
+        return None
+    size = options.small_bytes if scenario.request_body == "small" else options.large_bytes
+    return json.dumps({"description": "x" * size, "items": [{"product_name": "Paper A4", "quantity": 1}]}).encode()
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    headers: Dict[str, str],
+    body: Optional[bytes],
+    concurrency: int,
+    duration: Optional[float] = None,
+    requests: Optional[int] = None
+) -> Tuple[List[float], int, float]:
+    """
+    Issue requests from ``concurrency`` workers until the duration is over
+    or the number of requests is reached; returns the latencies, the
+    error count and the elapsed time
+    """
+    latencies: List[float] = []
+    errors = 0
+    remaining = requests
+    deadline = time.perf_counter() + duration if duration is not None else None
+
+    async def worker() -> None:
+        nonlocal errors, remaining
+        while True:
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            if remaining is not None:
+                if remaining <= 0:
+                    return
+                remaining -= 1
+            start = time.perf_counter()
+            response = await client.request(scenario.method, scenario.path, headers=headers, content=body)
+            await response.aread()
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict:
+    if len(latencies) >= 2:
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = latencies[0] if latencies else 0.0
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(p50 * 1000, 3),
+            "p95": round(p95 * 1000, 3),
+            "p99": round(p99 * 1000, 3),
+            "mean": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+            "max": round(max(latencies) * 1000, 3) if latencies else 0.0,
+        },
+    }
+
+
+async def run_scenario(scenario: Scenario, options) -> Dict:
+    """
+    Benchmark one scenario on a fresh gateway and stub upstreams
+    """
+    payload_bytes = options.small_bytes if scenario.payload == "small" else options.large_bytes
+    stub = StubUpstreams(options.latency_ms / 1000, payload_bytes, options.fan_out)
+    app = create_app(upstream_transport=stub.transport())
+    await app.state.upstreams.startup()
+
+    cache_size = token_cache.max_size
+    token_cache.clear()
+    token_cache.max_size = cache_size if scenario.jwt_cache else 0
+
+    headers = {
+        "Authorization": f"Bearer {make_token()}",
+        "Accept-Encoding": "gzip, br, zstd" if options.compress else "identity",
+    }
+    body = request_body(scenario, options)
+    if body is not None:
+        headers["Content-Type"] = "application/json"
+
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://gateway", timeout=60) as client:
+            await drive(client, scenario, headers, body, options.concurrency, requests=options.warmup)
+            stub.calls = 0
+            latencies, errors, elapsed = await drive(
+                client, scenario, headers, body, options.concurrency, duration=options.duration
+            )
+            result = summarize(latencies, errors, elapsed)
+            result["upstream_calls"] = stub.calls
+
+            tracemalloc.start()
+            await drive(client, scenario, headers, body, options.concurrency, requests=options.memory_requests)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            result["memory_peak_kb"] = round(peak / 1024, 1)
+    finally:
+        token_cache.max_size = cache_size
+        token_cache.clear()
+        await app.state.upstreams.shutdown()
+    return result
+
+
+def compare(baseline: Dict, results: Dict) -> List[str]:
+    """
+    One line per scenario: RPS and p95 change against a previous run
+    """
+    lines = [f"{'scenario':<18}{'rps':>12}{'Δ rps':>10}{'p95 ms':>10}{'Δ p95':>10}"]
+    for name, result in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        rps, p95 = result["rps"], result["latency_ms"]["p95"]
+        if previous is None:
+            lines.append(f"{name:<18}{rps:>12}{'new':>10}{p95:>10}{'new':>10}")
+            continue
+        rps_change = (rps / previous["rps"] - 1) * 100 if previous["rps"] else 0.0
+        p95_change = (p95 / previous["latency_ms"]["p95"] - 1) * 100 if previous["latency_ms"]["p95"] else 0.0
+        lines.append(f"{name:<18}{rps:>12}{rps_change:>+9.1f}%{p95:>10}{p95_change:>+9.1f}%")
+    return lines
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the API gateway against stub upstreams")
+    parser.add_argument("--scenarios", default=",".join(scenario.name for scenario in SCENARIOS),
+                        help="comma-separated scenarios to run")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds of the timed run of each scenario")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent client connections")
+    parser.add_argument("--warmup", type=int, default=200, help="requests sent before the timed run")
+    parser.add_argument("--memory-requests", type=int, default=200, help="requests of the tracemalloc run")
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="latency of the stub upstreams")
+    parser.add_argument("--small-bytes", type=int, default=1024, help="size of the small payloads")
+    parser.add_argument("--large-bytes", type=int, default=1024 * 1024, help="size of the large payloads")
+    parser.add_argument("--fan-out", type=int, default=10, help="products per order / sub-requests per batch")
+    parser.add_argument("--compress", action="store_true", help="accept compressed responses")
+    parser.add_argument("--output", default="bench-results.json", help="JSON file the results are written to")
+    parser.add_argument("--compare", help="previous results file to compare with")
+    return parser.parse_args(argv)
+
+
+async def main(argv=None) -> Dict:
+    options = parse_args(argv)
+    selected = set(options.scenarios.split(","))
+    unknown = selected - {scenario.name for scenario in SCENARIOS}
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    # Measure the proxy itself: no throttling, no background probes
+    config.RATE_LIMIT_ENABLED = False
+    config.HEALTH_CHECK_ENABLED = False
+
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "options": {key: value for key, value in vars(options).items() if key not in ("output", "compare")},
+        },
+        "scenarios": {},
+    }
+    for scenario in SCENARIOS:
+        if scenario.name not in selected:
+            continue
+        result = await run_scenario(scenario, options)
+        results["scenarios"][scenario.name] = result
+        print(
+            f"{scenario.name:<18} {result['rps']:>10} rps  "
+            f"p50 {result['latency_ms']['p50']:>8} ms  p95 {result['latency_ms']['p95']:>8} ms  "
+            f"p99 {result['latency_ms']['p99']:>8} ms  heap {result['memory_peak_kb']:>9} KiB  "
+            f"errors {result['errors']}"
+        )
+
+    if resource is not None:
+        # ru_maxrss is in KiB on Linux (bytes on macOS)
+        results["meta"]["rss_peak_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    with open(options.output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"Results written to {options.output}")
+
+    if options.compare:
+        with open(options.compare) as file:
+            print("\n".join(compare(json.load(file), results)))
+    return results
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,89 @@
+"""
+In-process stub upstreams for the gateway benchmarks
+
+The stubs answer like the auth, order and product services, after a
+configurable latency and with a configurable payload size. Responses
+are serialized once, so the stubs cost next to nothing per call and the
+numbers measure the gateway.
+"""
+import asyncio
+import json
+import uuid
+
+import httpx
+
+ORDER_ID = "0b5f2a7e-6a4c-4c4f-9d3c-1c2b3a4d5e6f"
+PRODUCT_ID = "7d1c9e0a-3b52-4a8e-9f0e-2d6c4b1a5e73"
+
+
+def _json(body) -> bytes:
+    return json.dumps(body).encode()
+
+
+class StubUpstreams:
+    def __init__(self, latency: float = 0.0, payload_bytes: int = 1024, fan_out: int = 10):
+        self.latency = latency
+        self.calls = 0
+        # Pad the order description so the order document has the requested size
+        items = [{"product_name": f"Product {index}", "quantity": index + 1} for index in range(fan_out)]
+        order = {
+            "id": ORDER_ID,
+            "user_id": str(uuid.UUID(int=1)),
+            "department_id": str(uuid.UUID(int=2)),
+            "status": "pending",
+            "description": "",
+            "created_at": "2025-01-01T00:00:00",
+            "items": items,
+        }
+        order["description"] = "x" * max(0, payload_bytes - len(_json(order)))
+        self.order = _json(order)
+        self.orders = _json([order])
+        self.products = {
+            f"Product {index}": _json([{
+                "id": str(uuid.UUID(int=index + 10)),
+                "name": f"Product {index}",
+                "sku": f"SKU-{index:04d}",
+                "description": None,
+                "stock_quantity": 100,
+                "min_stock": 10,
+                "created_at": "2025-01-01T00:00:00",
+            }])
+            for index in range(fan_out)
+        }
+        self.product = _json({
+            "id": PRODUCT_ID,
+            "name": "Paper A4",
+            "sku": "PAP-A4",
+            "description": None,
+            "stock_quantity": 40,
+            "min_stock": 5,
+            "created_at": "2025-01-01T00:00:00",
+        })
+
+    def _response(self, body: bytes, status_code: int = 200) -> httpx.Response:
+        return httpx.Response(
+            status_code,
+            headers={"Content-Type": "application/json"},
+            stream=httpx.ByteStream(body)
+        )
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        path = request.url.path
+        if path == "/":
+            return self._response(b'{"message": "Health check successful"}')
+        if path in ("/orders", "/orders/me"):
+            return self._response(self.orders)
+        if path.startswith("/orders/"):
+            return self._response(self.order)
+        if path == "/products/list":
+            name = request.url.params.get("name")
+            return self._response(self.products.get(name, b"[]"))
+        if path.startswith("/products/"):
+            return self._response(self.product)
+        return self._response(b'{"detail": "Not Found"}', 404)
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
@@ -2,12 +2,37 @@
 """
 Run script for API Gateway
 """
+import importlib.util
 import sys
 import os
 
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
+from app.config import config  # noqa: E402
+
+
+def server_options() -> dict:
+    """
+    uvicorn settings of the run mode: one process with the defaults in
+    development, WORKERS processes on uvloop/httptools in production
+    """
+    if config.RUN_MODE != "production":
+        return {}
+    return {
+        "workers": config.WORKERS,
+        "loop": "uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        "http": "httptools" if importlib.util.find_spec("httptools") else "h11",
+        "backlog": config.BACKLOG,
+        "timeout_keep_alive": config.KEEP_ALIVE_TIMEOUT,
+        # On SIGTERM: stop accepting, let in-flight requests finish, then
+        # run the lifespan shutdown (upstream clients closed)
+        "timeout_graceful_shutdown": config.GRACEFUL_SHUTDOWN_TIMEOUT,
+        # Requests are counted by /metrics already
+        "access_log": False,
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
     
@@ -15,5 +40,6 @@ if __name__ == "__main__":
         "app.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=False
+        reload=False,
+        **server_options()
     )
@@ -0,0 +1,112 @@
+import asyncio
+import time
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+from typing import Dict, List, Optional, Tuple
+
+from app.config import config
+from app.proxy import buffered_response, fetch_upstream
+
+# Client validators describe the composed document, not the upstream ones
+CLIENT_VALIDATORS = ("If-None-Match", "If-Modified-Since")
+
+
+class ServerTiming:
+    """
+    Collects upstream timings rendered as a Server-Timing header
+    """
+
+    def __init__(self):
+        self._metrics: List[Tuple[str, float, Optional[str]]] = []
+
+    def add(self, name: str, seconds: float, description: Optional[str] = None) -> None:
+        self._metrics.append((name, seconds, description))
+
+    def header(self) -> str:
+        parts = []
+        for name, seconds, description in self._metrics:
+            part = f"{name};dur={seconds * 1000:.1f}"
+            if description:
+                part += f';desc="{description}"'
+            parts.append(part)
+        return ", ".join(parts)
+
+
+async def lookup_product(request: Request, name: str, user_data: Dict) -> Optional[Dict]:
+    """
+    Resolve an order item's product by its name; None if the catalog has
+    no such product. Raises on upstream failures and timeouts.
+    """
+    upstream = await asyncio.wait_for(
+        fetch_upstream(
+            request,
+            "products",
+            "/products/list",
+            user_data,
+            drop_headers=CLIENT_VALIDATORS,
+            params={"name": name, "limit": "1"}
+        ),
+        timeout=config.AGGREGATION_TIMEOUT
+    )
+    if upstream.status_code != 200:
+        raise HTTPException(status_code=upstream.status_code, detail=f"Product lookup failed: {name}")
+    products = upstream.json()
+    return products[0] if products else None
+
+
+def describe_failure(error: BaseException) -> str:
+    if isinstance(error, asyncio.TimeoutError):
+        return f"Timed out after {config.AGGREGATION_TIMEOUT}s"
+    if isinstance(error, HTTPException):
+        return str(error.detail)
+    return "Unexpected error"
+
+
+async def get_order_details(request: Request, order_id: str, user_data: Dict) -> Response:
+    """
+    Compose an order with the catalog data of every product it references
+
+    The order is required: its failures are relayed as they are. Products
+    are resolved concurrently and are best effort: an item whose product
+    could not be fetched gets ``"product": null`` and the failure is listed
+    under ``errors`` with ``partial`` set, instead of failing the request.
+    """
+    timing = ServerTiming()
+
+    start = time.monotonic()
+    upstream = await fetch_upstream(request, "orders", f"/orders/{order_id}", user_data, drop_headers=CLIENT_VALIDATORS)
+    timing.add("orders", time.monotonic() - start)
+    if upstream.status_code != 200:
+        response = buffered_response(upstream)
+        response.headers["Server-Timing"] = timing.header()
+        return response
+
+    order = upstream.json()
+    names = list(dict.fromkeys(item["product_name"] for item in order.get("items", [])))
+
+    start = time.monotonic()
+    results = await asyncio.gather(
+        *(lookup_product(request, name, user_data) for name in names),
+        return_exceptions=True
+    )
+    if names:
+        timing.add("products", time.monotonic() - start, f"{len(names)} lookups")
+
+    products, errors = {}, []
+    for name, result in zip(names, results):
+        if isinstance(result, BaseException):
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+            products[name] = None
+            errors.append({"service": "products", "product_name": name, "detail": describe_failure(result)})
+        else:
+            products[name] = result
+
+    order["items"] = [
+        {**item, "product": products.get(item["product_name"])}
+        for item in order.get("items", [])
+    ]
+    order["partial"] = bool(errors)
+    order["errors"] = errors
+
+    return JSONResponse(content=order, headers={"Server-Timing": timing.header()})
@@ -1,31 +1,114 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from fastapi import HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
 from typing import Dict, Optional
 
 from app.config import config
+from app.tracing import tracer
 
 security = HTTPBearer()
 optional_security = HTTPBearer(auto_error=False)
 
 
+class TokenCache:
+    """
+    Bounded LRU cache of verified JWT claims
+
+    Entries are keyed by a SHA-256 digest of the token (the raw token is
+    never kept) and expire at the token's "exp" claim, so a cached entry
+    is never served longer than the token itself is valid.
+    """
+
+    def __init__(self, max_size: int, max_ttl: float):
+        self.max_size = max_size
+        self.max_ttl = max_ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        # Sync dependencies run in the threadpool, so guard the LRU order
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[Dict]:
+        """
+        Return the cached claims of a token, or None on a miss
+        """
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            claims, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return dict(claims)
+
+    def put(self, token: str, claims: Dict) -> None:
+        """
+        Store verified claims until the token expires
+        """
+        if self.max_size <= 0:
+            return
+        expires_at = time.time() + self.max_ttl
+        if "exp" in claims:
+            expires_at = min(expires_at, float(claims["exp"]))
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (dict(claims), expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+token_cache = TokenCache(config.JWT_CACHE_SIZE, config.JWT_CACHE_MAX_TTL)
+
+
 def decode_token(token: str) -> Dict:
     """
     Decode and validate JWT token
+    Verified claims are served from the token cache until the token expires
     """
-    try:
-        payload = jwt.decode(
-            token,
-            config.JWT_SECRET,
-            algorithms=[config.ALGORITHM]
-        )
-        return payload
-    except JWTError as e:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid or expired token",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    with tracer.span("jwt.decode", phase="jwt") as span:
+        payload = token_cache.get(token)
+        span.attributes["cache_hit"] = payload is not None
+        if payload is not None:
+            return payload
+
+        try:
+            payload = jwt.decode(
+                token,
+                config.JWT_SECRET,
+                algorithms=[config.ALGORITHM]
+            )
+            token_cache.put(token, payload)
+            return payload
+        except JWTError as e:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid or expired token",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
 
 
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict:
@@ -0,0 +1,243 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+import httpx
+from typing import Callable, Dict, List, Optional
+
+from app.config import config
+
+logger = logging.getLogger(__name__)
+
+LEAST_OUTSTANDING = "least_outstanding"
+POWER_OF_TWO = "p2c"
+
+# Share of its normal traffic a replica gets at the start of its slow start
+MIN_SLOW_START_WEIGHT = 0.1
+
+
+def parse_replica_urls(raw) -> List[str]:
+    """
+    Replica URLs of an upstream: a list or a comma-separated string
+    """
+    if isinstance(raw, str):
+        raw = raw.split(",")
+    return [url.strip().rstrip("/") for url in raw if url and url.strip()]
+
+
+class Replica:
+    """
+    One instance of an upstream service
+    """
+
+    def __init__(self, url: str, slow_start_seconds: float, ramping: bool = False):
+        self.url = httpx.URL(url)
+        self.slow_start_seconds = slow_start_seconds
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.healthy = True
+        # Start of the slow-start ramp, None once at full weight
+        self.ramp_started: Optional[float] = time.monotonic() if ramping else None
+
+    def is_available(self, now: float) -> bool:
+        return self.healthy and now >= self.ejected_until
+
+    def weight(self, now: float) -> float:
+        """
+        Share of the normal traffic the replica should get (0..1):
+        ramps up linearly during the slow start after a recovery
+        """
+        if self.ramp_started is None or self.slow_start_seconds <= 0:
+            return 1.0
+        elapsed = now - self.ramp_started
+        if elapsed >= self.slow_start_seconds:
+            self.ramp_started = None
+            return 1.0
+        return max(MIN_SLOW_START_WEIGHT, elapsed / self.slow_start_seconds)
+
+    def load(self, now: float) -> float:
+        return (self.outstanding + 1) / self.weight(now)
+
+    def eject(self, seconds: float) -> None:
+        self.ejected_until = time.monotonic() + seconds
+        # Ramp up again once the ejection is over
+        self.ramp_started = self.ejected_until
+
+    def set_healthy(self, healthy: bool) -> None:
+        """
+        Apply the verdict of the health probes
+        """
+        if healthy and not self.healthy:
+            self.ramp_started = time.monotonic()
+        self.healthy = healthy
+
+    def stats(self, now: float) -> Dict:
+        return {
+            "url": str(self.url),
+            "outstanding": self.outstanding,
+            "healthy": self.healthy,
+            "ejected": now < self.ejected_until,
+            "consecutive_failures": self.consecutive_failures,
+            "weight": round(self.weight(now), 2),
+        }
+
+
+def least_outstanding(candidates: List[Replica], now: float) -> Replica:
+    """
+    Replica with the fewest requests in flight (relative to its weight),
+    ties broken at random
+    """
+    lowest = min(replica.load(now) for replica in candidates)
+    return random.choice([replica for replica in candidates if replica.load(now) == lowest])
+
+
+def power_of_two_choices(candidates: List[Replica], now: float) -> Replica:
+    """
+    Less loaded of two replicas drawn at random: close to least-outstanding
+    without herding every gateway worker onto the same replica
+    """
+    if len(candidates) <= 2:
+        return least_outstanding(candidates, now)
+    first, second = random.sample(candidates, 2)
+    return first if first.load(now) <= second.load(now) else second
+
+
+STRATEGIES: Dict[str, Callable[[List[Replica], float], Replica]] = {
+    LEAST_OUTSTANDING: least_outstanding,
+    POWER_OF_TWO: power_of_two_choices,
+}
+
+
+class ReplicaSet:
+    """
+    Replicas of one upstream and the balancing between them
+
+    Replicas failing EJECTION_FAILURES calls in a row, or marked down by
+    the health probes, stop receiving traffic; when they come back, their
+    share of the traffic ramps up over the slow-start period. If no
+    replica is available, all of them are tried rather than none.
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        strategy: str = POWER_OF_TWO,
+        ejection_failures: int = 3,
+        ejection_seconds: float = 30.0,
+        slow_start_seconds: float = 30.0
+    ):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown load balancing strategy: {strategy}")
+        self.choose = STRATEGIES[strategy]
+        self.ejection_failures = ejection_failures
+        self.ejection_seconds = ejection_seconds
+        self.slow_start_seconds = slow_start_seconds
+        self.replicas: List[Replica] = [Replica(url, slow_start_seconds) for url in urls]
+
+    @property
+    def urls(self) -> List[str]:
+        return [str(replica.url) for replica in self.replicas]
+
+    def update(self, urls: List[str]) -> None:
+        """
+        Replace the replica list; known replicas keep their state and
+        new ones start with a slow start
+        """
+        current = {str(replica.url): replica for replica in self.replicas}
+        self.replicas = [
+            current.get(str(httpx.URL(url))) or Replica(url, self.slow_start_seconds, ramping=bool(current))
+            for url in urls
+        ]
+
+    def pick(self) -> Replica:
+        now = time.monotonic()
+        candidates = [replica for replica in self.replicas if replica.is_available(now)]
+        return self.choose(candidates or self.replicas, now)
+
+    def record_success(self, replica: Replica) -> None:
+        replica.consecutive_failures = 0
+
+    def record_failure(self, replica: Replica) -> None:
+        replica.consecutive_failures += 1
+        if replica.consecutive_failures >= self.ejection_failures:
+            replica.consecutive_failures = 0
+            replica.eject(self.ejection_seconds)
+
+    def stats(self) -> List[Dict]:
+        now = time.monotonic()
+        return [replica.stats(now) for replica in self.replicas]
+
+
+def create_replica_set(urls: List[str]) -> ReplicaSet:
+    return ReplicaSet(
+        urls,
+        strategy=config.LOAD_BALANCING_STRATEGY,
+        ejection_failures=config.EJECTION_FAILURES,
+        ejection_seconds=config.EJECTION_SECONDS,
+        slow_start_seconds=config.SLOW_START_SECONDS
+    )
+
+
+def load_replica_file(path: str) -> Dict[str, List[str]]:
+    """
+    Read {"orders": ["http://order-1:8002", ...], ...} from a JSON file
+    """
+    with open(path) as file:
+        data = json.load(file)
+    if not isinstance(data, dict):
+        raise ValueError("Replica file must map service names to URL lists")
+    return {name: parse_replica_urls(urls) for name, urls in data.items()}
+
+
+class ReplicaFileWatcher:
+    """
+    Reloads the replica lists when the replica file changes (polled
+    modification time), so replicas can be added or removed without
+    restarting the gateway
+    """
+
+    def __init__(self, upstreams, path: str, interval: float):
+        self.upstreams = upstreams
+        self.path = path
+        self.interval = interval
+        self._mtime: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def reload_if_changed(self) -> bool:
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        try:
+            replicas = load_replica_file(self.path)
+        except (OSError, ValueError) as e:
+            # Keep serving with the current replicas
+            logger.warning("Ignoring invalid replica file %s: %s", self.path, e)
+            return False
+        self.upstreams.update_replicas(replicas)
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            self.reload_if_changed()
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
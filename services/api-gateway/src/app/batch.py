@@ -0,0 +1,121 @@
+import asyncio
+import httpx
+from fastapi import HTTPException, Request, status
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Literal, Optional
+
+from app.config import config
+from app.proxy import send_idempotent, send_upstream, user_headers
+
+# First path segment of a sub-request -> upstream service
+BATCH_SERVICES = {"orders": "orders", "products": "products"}
+
+# Upstream headers kept in each sub-response
+RELAYED_HEADERS = ("content-type", "etag", "location", "retry-after")
+
+
+class SubRequest(BaseModel):
+    id: Optional[str] = None
+    method: Literal["GET", "POST", "PUT", "PATCH", "DELETE"] = "GET"
+    path: str
+    body: Optional[Any] = None
+
+
+class BatchRequest(BaseModel):
+    requests: List[SubRequest] = Field(..., min_length=1)
+
+
+def sub_response(item: SubRequest, status_code: int, body: Any, headers: Optional[Dict[str, str]] = None) -> Dict:
+    return {"id": item.id, "status": status_code, "headers": headers or {}, "body": body}
+
+
+def decode_body(response: httpx.Response) -> Any:
+    if not response.content:
+        return None
+    if "json" in response.headers.get("content-type", ""):
+        try:
+            return response.json()
+        except ValueError:
+            pass
+    return response.text
+
+
+def resolve_service(url: httpx.URL) -> Optional[str]:
+    """
+    Upstream serving a sub-request path, None if it is not batchable
+    """
+    if not url.is_relative_url or not url.path.startswith("/"):
+        return None
+    segments = url.path.split("/")
+    if ".." in segments:
+        return None
+    return BATCH_SERVICES.get(segments[1])
+
+
+async def run_sub_request(request: Request, item: SubRequest, user: Dict, semaphore: asyncio.Semaphore) -> Dict:
+    """
+    Send one sub-request upstream through the same rate limits, breakers,
+    bulkheads and retries as a standalone call; failures become the
+    status of the item instead of failing the batch
+    """
+    try:
+        url = httpx.URL(item.path)
+    except httpx.InvalidURL:
+        url = None
+    service = resolve_service(url) if url is not None else None
+    if service is None:
+        return sub_response(item, status.HTTP_404_NOT_FOUND, {"detail": f"No batchable route: {item.path}"})
+
+    allowed, limit_headers = request.app.state.rate_limiter.check(url.path, user)
+    if not allowed:
+        return sub_response(
+            item,
+            status.HTTP_429_TOO_MANY_REQUESTS,
+            {"detail": "Rate limit exceeded"},
+            {"retry-after": limit_headers["Retry-After"]}
+        )
+
+    client = request.app.state.upstreams.get_client(service)
+
+    def build() -> httpx.Request:
+        return client.build_request(
+            method=item.method,
+            url=item.path,
+            headers=user_headers(user),
+            json=item.body
+        )
+
+    async with semaphore:
+        try:
+            if item.method == "GET" and item.body is None and service in config.RETRY_SERVICES:
+                response, _ = await send_idempotent(request, service, url.path, build)
+            else:
+                response, _ = await send_upstream(request, service, build())
+        except HTTPException as e:
+            return sub_response(item, e.status_code, {"detail": e.detail}, {
+                name.lower(): value for name, value in (e.headers or {}).items()
+            })
+        finally:
+            if item.method != "GET" and service == "products":
+                request.app.state.response_cache.invalidate_prefix("/products")
+
+    headers = {name: response.headers[name] for name in RELAYED_HEADERS if name in response.headers}
+    return sub_response(item, response.status_code, decode_body(response), headers)
+
+
+async def run_batch(request: Request, batch: BatchRequest, user: Dict) -> Dict:
+    """
+    Run the sub-requests of a batch concurrently, at most
+    BATCH_CONCURRENCY at a time; results keep the order of the requests
+    """
+    if len(batch.requests) > config.BATCH_MAX_REQUESTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many sub-requests: at most {config.BATCH_MAX_REQUESTS} per batch"
+        )
+
+    semaphore = asyncio.Semaphore(config.BATCH_CONCURRENCY)
+    responses = await asyncio.gather(
+        *(run_sub_request(request, item, user, semaphore) for item in batch.requests)
+    )
+    return {"responses": list(responses)}
@@ -0,0 +1,222 @@
+import hashlib
+import time
+from collections import OrderedDict
+from fastapi import Request, Response
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from app.config import config
+from app.proxy import buffered_response, fetch_upstream, strip_hop_by_hop_headers
+
+# Headers of the buffered upstream response that no longer describe the
+# cached body (httpx already decoded it) or that are set per response
+UNCACHED_HEADERS = {"content-length", "content-encoding", "date", "etag", "set-cookie"}
+
+CONDITIONAL_HEADERS = ("if-none-match", "if-modified-since")
+
+
+def parse_route_ttls(raw: str) -> List[Tuple[str, float]]:
+    """
+    Parse "prefix=ttl,prefix=ttl" into (prefix, ttl) pairs,
+    longest prefix first so the most specific route wins
+    """
+    ttls = []
+    for item in raw.split(","):
+        if "=" not in item:
+            continue
+        prefix, ttl = item.rsplit("=", 1)
+        ttls.append((prefix.strip(), float(ttl)))
+    return sorted(ttls, key=lambda pair: len(pair[0]), reverse=True)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Weak comparison of an If-None-Match header against an ETag
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return etag.removeprefix("W/") in [tag.removeprefix("W/") for tag in candidates]
+
+
+class CacheEntry:
+    def __init__(self, body: bytes, status_code: int, headers: Dict[str, str], etag: str,
+                 upstream_etag: bool, expires_at: float):
+        self.body = body
+        self.status_code = status_code
+        self.headers = headers
+        self.etag = etag
+        # Only an ETag issued by the upstream can be revalidated there
+        self.upstream_etag = upstream_etag
+        self.expires_at = expires_at
+        self.size = len(body) + sum(len(k) + len(v) for k, v in headers.items())
+
+    def is_fresh(self) -> bool:
+        return self.expires_at > time.monotonic()
+
+
+class ResponseCache:
+    """
+    In-memory LRU cache of upstream GET responses
+
+    Entries live for the TTL of their route and are revalidated upstream
+    with If-None-Match once stale. The total size of the cached bodies is
+    kept under a memory budget by evicting the least recently used entries.
+    """
+
+    def __init__(self, max_bytes: int, route_ttls: List[Tuple[str, float]]):
+        self.max_bytes = max_bytes
+        self.route_ttls = route_ttls
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+
+    def ttl_for(self, path: str) -> Optional[float]:
+        """
+        TTL of the whitelisted route matching the path, None if not cacheable
+        """
+        for prefix, ttl in self.route_ttls:
+            if path.startswith(prefix):
+                return ttl
+        return None
+
+    @staticmethod
+    def key_for(request: Request, path: str) -> str:
+        return f"{path}?{urlencode(sorted(request.query_params.multi_items()))}"
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, entry: CacheEntry) -> None:
+        self.discard(key)
+        if entry.size > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self.size += entry.size
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= evicted.size
+
+    def discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry.size
+
+    def invalidate_prefix(self, prefix: str) -> None:
+        """
+        Drop every entry whose path starts with the prefix (used on writes)
+        """
+        for key in [key for key in self._entries if key.startswith(prefix)]:
+            self.discard(key)
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+        }
+
+
+def build_entry(upstream, ttl: float) -> CacheEntry:
+    headers = {
+        key: value
+        for key, value in strip_hop_by_hop_headers(upstream.headers).items()
+        if key.lower() not in UNCACHED_HEADERS
+    }
+    etag = upstream.headers.get("etag")
+    upstream_etag = etag is not None
+    if etag is None:
+        etag = f'W/"{hashlib.sha1(upstream.content).hexdigest()}"'
+    return CacheEntry(
+        body=upstream.content,
+        status_code=upstream.status_code,
+        headers=headers,
+        etag=etag,
+        upstream_etag=upstream_etag,
+        expires_at=time.monotonic() + ttl
+    )
+
+
+def is_storable(upstream) -> bool:
+    cache_control = upstream.headers.get("cache-control", "").lower()
+    return upstream.status_code == 200 and "no-store" not in cache_control and "private" not in cache_control
+
+
+def entry_response(request: Request, entry: CacheEntry, cache_status: str) -> Response:
+    """
+    Answer from a cache entry, with 304 when the client already has it
+
+    The ETag is always sent in its weak form: the body may be compressed on
+    the way out, and a 304 must carry the same validator as that 200.
+    """
+    etag = entry.etag if entry.etag.startswith("W/") else f"W/{entry.etag}"
+    headers = {"ETag": etag, "X-Cache": cache_status}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(
+        content=entry.body,
+        status_code=entry.status_code,
+        headers={**entry.headers, **headers}
+    )
+
+
+async def forward_cached_request(
+    request: Request,
+    service: str,
+    path: str,
+    ttl: float,
+    user_data: Optional[Dict] = None
+) -> Response:
+    """
+    Serve a whitelisted GET route from the response cache
+
+    Fresh entries are answered locally, stale entries are revalidated
+    upstream with If-None-Match and misses are fetched and stored.
+    """
+    cache: ResponseCache = request.app.state.response_cache
+    key = cache.key_for(request, path)
+    entry = cache.get(key)
+
+    if entry is not None and entry.is_fresh():
+        cache.hits += 1
+        return entry_response(request, entry, "HIT")
+
+    extra_headers = {}
+    if entry is not None and entry.upstream_etag:
+        extra_headers["If-None-Match"] = entry.etag
+
+    upstream = await fetch_upstream(
+        request, service, path, user_data,
+        extra_headers=extra_headers,
+        drop_headers=CONDITIONAL_HEADERS
+    )
+
+    if upstream.status_code == 304 and entry is not None:
+        cache.revalidations += 1
+        entry.expires_at = time.monotonic() + ttl
+        return entry_response(request, entry, "REVALIDATED")
+
+    cache.misses += 1
+    if not is_storable(upstream):
+        cache.discard(key)
+        return buffered_response(upstream)
+
+    entry = build_entry(upstream, ttl)
+    cache.put(key, entry)
+    return entry_response(request, entry, "MISS")
+
+
+def create_response_cache() -> ResponseCache:
+    return ResponseCache(
+        max_bytes=config.RESPONSE_CACHE_MAX_BYTES,
+        route_ttls=parse_route_ttls(config.RESPONSE_CACHE_TTLS)
+    )
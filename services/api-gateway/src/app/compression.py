@@ -0,0 +1,246 @@
+import zlib
+from typing import Callable, Dict, List, Optional
+
+from app.config import config
+
+# Optional encoders: an encoding is only offered when its library is installed
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/problem+json",
+    "text/",
+)
+
+# Streams that must reach the client as soon as each event is written
+UNBUFFERED_TYPES = ("text/event-stream",)
+
+
+class GzipEncoder:
+    def __init__(self, level: int):
+        # wbits=31: zlib stream with a gzip header and trailer
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliEncoder:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdEncoder:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+def available_encoders() -> Dict[str, Callable]:
+    """
+    Encoder factories of the supported encodings, in server preference order
+    """
+    factories = {
+        "zstd": (lambda: ZstdEncoder(config.ZSTD_LEVEL)) if zstandard is not None else None,
+        "br": (lambda: BrotliEncoder(config.BROTLI_QUALITY)) if brotli is not None else None,
+        "gzip": lambda: GzipEncoder(config.GZIP_LEVEL),
+    }
+    return {
+        name: factories[name]
+        for name in config.COMPRESSION_ENCODINGS
+        if factories.get(name) is not None
+    }
+
+
+def negotiate_encoding(accept_encoding: str, supported: List[str]) -> Optional[str]:
+    """
+    Pick the first server-preferred encoding the client accepts (q > 0)
+    """
+    accepted = {}
+    for item in accept_encoding.split(","):
+        parts = [part.strip() for part in item.split(";")]
+        if not parts[0]:
+            continue
+        quality = 1.0
+        for param in parts[1:]:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        accepted[parts[0].lower()] = quality
+
+    for name in supported:
+        quality = accepted.get(name, accepted.get("*", 0.0))
+        if quality > 0:
+            return name
+    return None
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware compressing responses with the encoding negotiated
+    from Accept-Encoding (zstd, br or gzip)
+
+    Bodies smaller than the minimum size, non-text content, event streams and
+    responses the upstream already encoded are passed through unchanged.
+    Streamed bodies are compressed incrementally. Every compressible
+    response varies on Accept-Encoding, whether it was compressed or not,
+    and a compressed one only keeps a weak version of its ETag.
+    """
+
+    def __init__(self, app, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = config.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+        self.encoders = available_encoders()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers", []))
+        encoding = negotiate_encoding(
+            headers.get(b"accept-encoding", b"").decode("latin-1"),
+            list(self.encoders)
+        )
+        # Without an accepted encoding the responder only adds Vary
+        responder = _CompressingResponder(send, encoding, self.encoders.get(encoding), self.minimum_size)
+        await self.app(scope, receive, responder.send)
+
+
+def with_vary_accept_encoding(headers):
+    """
+    The headers with Accept-Encoding merged into their Vary header
+    """
+    vary = [value.decode("latin-1") for name, value in headers if name.lower() == b"vary"]
+    if "accept-encoding" in ", ".join(vary).lower():
+        return list(headers)
+    vary.append("Accept-Encoding")
+    headers = [(name, value) for name, value in headers if name.lower() != b"vary"]
+    headers.append((b"vary", ", ".join(vary).encode("latin-1")))
+    return headers
+
+
+def weak_etag(value: bytes) -> bytes:
+    """
+    A strong ETag validates the exact bytes of the body: once re-encoded,
+    only a weak one still holds
+    """
+    return value if value.startswith(b"W/") else b"W/" + value
+
+
+class _CompressingResponder:
+    def __init__(self, send, encoding: Optional[str], encoder_factory, minimum_size: int):
+        self._send = send
+        self.encoding = encoding
+        self.encoder_factory = encoder_factory
+        self.minimum_size = minimum_size
+        self.start_message = None
+        self.encoder = None
+        self.passthrough = False
+        self.varies = False
+
+    def _is_compressible(self, headers: Dict[str, str]) -> bool:
+        """
+        Whether the response could be compressed, for some client: it then
+        varies on Accept-Encoding
+        """
+        content_type = headers.get("content-type", "").lower()
+        return content_type.startswith(COMPRESSIBLE_TYPES) and not content_type.startswith(UNBUFFERED_TYPES)
+
+    def _should_skip(self, start_message, headers: Dict[str, str]) -> bool:
+        if self.encoding is None or not self.varies:
+            return True
+        if start_message["status"] < 200 or start_message["status"] in (204, 304):
+            return True
+        if "content-encoding" in headers:
+            return True
+        content_length = headers.get("content-length")
+        return content_length is not None and content_length.isdigit() and int(content_length) < self.minimum_size
+
+    def _identity_start(self):
+        """
+        The start message of a response sent as it is
+        """
+        if not self.varies:
+            return self.start_message
+        return {**self.start_message, "headers": with_vary_accept_encoding(self.start_message.get("headers", []))}
+
+    def _encoded_headers(self, content_length: Optional[int]):
+        headers = [
+            (name, weak_etag(value) if name.lower() == b"etag" else value)
+            for name, value in with_vary_accept_encoding(self.start_message.get("headers", []))
+            if name.lower() != b"content-length"
+        ]
+        headers.append((b"content-encoding", self.encoding.encode("latin-1")))
+        if content_length is not None:
+            headers.append((b"content-length", str(content_length).encode("latin-1")))
+        return headers
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            headers = {
+                name.decode("latin-1").lower(): value.decode("latin-1")
+                for name, value in message.get("headers", [])
+            }
+            self.varies = self._is_compressible(headers)
+            self.passthrough = self._should_skip(message, headers)
+            if self.passthrough:
+                await self._send(self._identity_start())
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.encoder is None:
+            if not more_body:
+                # Whole body in one message: compress it only if it is worth it
+                if len(body) < self.minimum_size:
+                    await self._send(self._identity_start())
+                    await self._send(message)
+                    return
+                encoder = self.encoder_factory()
+                compressed = encoder.compress(body) + encoder.finish()
+                await self._send({**self.start_message, "headers": self._encoded_headers(len(compressed))})
+                await self._send({"type": "http.response.body", "body": compressed})
+                return
+
+            # Streamed body: compress chunk by chunk, length is unknown
+            self.encoder = self.encoder_factory()
+            await self._send({**self.start_message, "headers": self._encoded_headers(None)})
+
+        chunk = self.encoder.compress(body)
+        if not more_body:
+            chunk += self.encoder.finish()
+        if chunk or not more_body:
+            await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
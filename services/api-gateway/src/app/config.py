@@ -8,16 +8,150 @@ class Config:
     PROJECT_NAME = os.getenv("PROJECT_NAME", "API Gateway")
     VERSION = os.getenv("VERSION", "0.1.0")
     
+    # Server (run.py): "production" runs WORKERS processes on uvloop/httptools
+    RUN_MODE = os.getenv("RUN_MODE", "development")
+    # One process unless set: the rate limits, the response and JWT caches
+    # and the /metrics counters live in each process (see the README)
+    WORKERS = int(os.getenv("WORKERS", "1"))
+    BACKLOG = int(os.getenv("BACKLOG", "2048"))
+    # Longer than the idle timeout of the load balancer in front of the gateway
+    KEEP_ALIVE_TIMEOUT = int(os.getenv("KEEP_ALIVE_TIMEOUT", "75"))
+    # Time allowed to in-flight requests on SIGTERM before they are cut
+    GRACEFUL_SHUTDOWN_TIMEOUT = int(os.getenv("GRACEFUL_SHUTDOWN_TIMEOUT", "30"))
+
     # Service URLs
     AUTH_SERVICE_URL = os.getenv("AUTH_SERVICE_URL", "http://localhost:8001")
     ORDER_SERVICE_URL = os.getenv("ORDER_SERVICE_URL", "http://localhost:8002")
     PRODUCT_SERVICE_URL = os.getenv("PRODUCT_SERVICE_URL", "http://localhost:8003")
+
+    # Upstream HTTP client pool (one long-lived client per service)
+    UPSTREAM_TIMEOUT = float(os.getenv("UPSTREAM_TIMEOUT", "30.0"))
+    UPSTREAM_MAX_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "100"))
+    UPSTREAM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    UPSTREAM_KEEPALIVE_EXPIRY = float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", "30.0"))
+    UPSTREAM_HTTP2 = os.getenv("UPSTREAM_HTTP2", "0") == "1"
+
+    # Timeout budget (seconds) per upstream path prefix: "prefix=seconds,..."
+    # The longest matching prefix wins, UPSTREAM_TIMEOUT applies to the others
+    ROUTE_TIMEOUTS = os.getenv("ROUTE_TIMEOUTS", "/auth=5,/products=5,/orders=10")
+    # Tighten the budget to a multiple of the observed latency percentile of the route
+    ADAPTIVE_TIMEOUTS_ENABLED = os.getenv("ADAPTIVE_TIMEOUTS_ENABLED", "1") == "1"
+    ADAPTIVE_TIMEOUT_PERCENTILE = float(os.getenv("ADAPTIVE_TIMEOUT_PERCENTILE", "0.99"))
+    ADAPTIVE_TIMEOUT_MULTIPLIER = float(os.getenv("ADAPTIVE_TIMEOUT_MULTIPLIER", "3.0"))
+    ADAPTIVE_TIMEOUT_MIN = float(os.getenv("ADAPTIVE_TIMEOUT_MIN", "0.5"))
+    ADAPTIVE_TIMEOUT_MIN_SAMPLES = int(os.getenv("ADAPTIVE_TIMEOUT_MIN_SAMPLES", "50"))
+
+    # Replicas: every *_SERVICE_URL may list several comma-separated replicas
+    # "p2c" (power of two choices) or "least_outstanding"
+    LOAD_BALANCING_STRATEGY = os.getenv("LOAD_BALANCING_STRATEGY", "p2c")
+    # Consecutive failed calls before a replica is ejected, and for how long
+    EJECTION_FAILURES = int(os.getenv("EJECTION_FAILURES", "3"))
+    EJECTION_SECONDS = float(os.getenv("EJECTION_SECONDS", "30.0"))
+    # Ramp-up period of the traffic sent to a recovered or added replica
+    SLOW_START_SECONDS = float(os.getenv("SLOW_START_SECONDS", "30.0"))
+    # Optional JSON file {"orders": ["http://order-1:8002", ...]} watched for changes
+    UPSTREAM_REPLICAS_FILE = os.getenv("UPSTREAM_REPLICAS_FILE", "")
+    UPSTREAM_REPLICAS_RELOAD_INTERVAL = float(os.getenv("UPSTREAM_REPLICAS_RELOAD_INTERVAL", "5.0"))
+
+    # Active health probes of the upstreams (GET / on every service)
+    HEALTH_CHECK_ENABLED = os.getenv("HEALTH_CHECK_ENABLED", "1") == "1"
+    HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", "5.0"))
+    HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", "2.0"))
+    # Consecutive failed probes before an upstream is considered down
+    HEALTH_FAILURE_THRESHOLD = int(os.getenv("HEALTH_FAILURE_THRESHOLD", "2"))
+    # Weight of the newest probe in the latency EWMA
+    HEALTH_LATENCY_ALPHA = float(os.getenv("HEALTH_LATENCY_ALPHA", "0.3"))
+
+    # Circuit breaker (per upstream)
+    BREAKER_WINDOW_SIZE = int(os.getenv("BREAKER_WINDOW_SIZE", "50"))
+    BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "20"))
+    BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+    BREAKER_SLOW_CALL_SECONDS = float(os.getenv("BREAKER_SLOW_CALL_SECONDS", "5.0"))
+    BREAKER_SLOW_CALL_RATE = float(os.getenv("BREAKER_SLOW_CALL_RATE", "0.8"))
+    BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "30.0"))
+    BREAKER_HALF_OPEN_CALLS = int(os.getenv("BREAKER_HALF_OPEN_CALLS", "3"))
+
+    # Retries (connection errors) and hedging for idempotent GETs
+    RETRY_SERVICES = [
+        name.strip() for name in os.getenv("RETRY_SERVICES", "orders,products").split(",") if name.strip()
+    ]
+    UPSTREAM_RETRIES = int(os.getenv("UPSTREAM_RETRIES", "2"))
+    RETRY_BACKOFF_BASE = float(os.getenv("RETRY_BACKOFF_BASE", "0.05"))
+    RETRY_BACKOFF_MAX = float(os.getenv("RETRY_BACKOFF_MAX", "1.0"))
+    # Extra upstream attempts (retries + hedges) allowed for one client request
+    RETRY_BUDGET = int(os.getenv("RETRY_BUDGET", "2"))
+    # Upstream paths whose writes are deduplicated by Idempotency-Key, so they are retried too
+    IDEMPOTENT_WRITE_ROUTES = [
+        route.strip() for route in os.getenv("IDEMPOTENT_WRITE_ROUTES", "/orders/create").split(",") if route.strip()
+    ]
+    HEDGING_ENABLED = os.getenv("HEDGING_ENABLED", "0") == "1"
+    HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0.95"))
+    HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+
+    # Bulkhead: max concurrent calls per upstream, excess gets 503 + Retry-After
+    BULKHEAD_MAX_CONCURRENCY = int(os.getenv("BULKHEAD_MAX_CONCURRENCY", "50"))
+    BULKHEAD_RETRY_AFTER = int(os.getenv("BULKHEAD_RETRY_AFTER", "1"))
+    
+    # Long-lived event streams (SSE), relayed unbuffered on their own connection pool,
+    # outside the bulkheads and deadlines, with an idle timeout between two chunks
+    STREAM_ROUTES = [
+        route.strip() for route in os.getenv("STREAM_ROUTES", "/orders/events").split(",") if route.strip()
+    ]
+    STREAM_IDLE_TIMEOUT = float(os.getenv("STREAM_IDLE_TIMEOUT", "60.0"))
+    STREAM_MAX_CONNECTIONS = int(os.getenv("STREAM_MAX_CONNECTIONS", "1000"))
+
+    # GET routes whose identical concurrent requests share one upstream call
+    COALESCED_ROUTES = [
+        route.strip()
+        for route in os.getenv("COALESCED_ROUTES", "/orders,/orders/me,/products/list").split(",")
+        if route.strip()
+    ]
+
+    # Response cache for whitelisted GET routes: "path-prefix=ttl-seconds,..."
+    # The longest matching prefix wins
+    RESPONSE_CACHE_TTLS = os.getenv("RESPONSE_CACHE_TTLS", "/products/list=30,/products/=60")
+    RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+    
+    # Token-bucket rate limits per route prefix, keyed on the JWT user and department:
+    # "prefix scope=rate-per-second/burst ...; prefix ..."
+    RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+    RATE_LIMITS = os.getenv(
+        "RATE_LIMITS",
+        "/orders user=10/20 department=50/100; /products user=20/40 department=100/200"
+    )
+    RATE_LIMIT_MAX_BUCKETS = int(os.getenv("RATE_LIMIT_MAX_BUCKETS", "100000"))
+    
+    # Response compression negotiated from Accept-Encoding (server preference order)
+    COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "1") == "1"
+    COMPRESSION_ENCODINGS = [
+        name.strip() for name in os.getenv("COMPRESSION_ENCODINGS", "zstd,br,gzip").split(",") if name.strip()
+    ]
+    COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+    BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+    ZSTD_LEVEL = int(os.getenv("ZSTD_LEVEL", "3"))
+
+    # Composed endpoints: time allowed (seconds) for each enrichment call
+    AGGREGATION_TIMEOUT = float(os.getenv("AGGREGATION_TIMEOUT", "2.0"))
+
+    # Batch endpoint: sub-requests accepted per call, and run at once
+    BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "50"))
+    BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "10"))
+    
+    # Tracing: span exporter ("none", "memory" or "file") and the file of the file exporter
+    TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none")
+    TRACE_FILE = os.getenv("TRACE_FILE", "spans.jsonl")
     
     # JWT Configuration
     # WARNING: The default JWT_SECRET is insecure and should only be used for development.
     # In production, always set a strong, unique secret via environment variables.
     JWT_SECRET = os.getenv("JWT_SECRET", "Secret")
     ALGORITHM = os.getenv("ALGORITHM", "HS256")
+
+    # Cache of verified JWT claims (0 disables the cache)
+    JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "10000"))
+    # Upper bound (seconds) for tokens without an "exp" claim
+    JWT_CACHE_MAX_TTL = float(os.getenv("JWT_CACHE_MAX_TTL", "900"))
     
     # CORS Configuration
     ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "*").split(",")
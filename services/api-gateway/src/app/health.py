@@ -0,0 +1,161 @@
+import asyncio
+import httpx
+import time
+from typing import Dict, Optional
+
+from app.config import config
+
+UNKNOWN = "unknown"
+UP = "up"
+DOWN = "down"
+
+
+class UpstreamHealth:
+    """
+    Probe results of one upstream: latency EWMA and consecutive failures
+    """
+
+    def __init__(self, failure_threshold: int, alpha: float):
+        self.failure_threshold = failure_threshold
+        self.alpha = alpha
+        self.consecutive_failures = 0
+        self.latency_ewma: Optional[float] = None
+        self.last_checked: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def status(self) -> str:
+        if self.last_checked is None:
+            return UNKNOWN
+        return DOWN if self.consecutive_failures >= self.failure_threshold else UP
+
+    def record_success(self, latency: float) -> None:
+        self.consecutive_failures = 0
+        self.last_error = None
+        self.last_checked = time.time()
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma = self.alpha * latency + (1 - self.alpha) * self.latency_ewma
+
+    def record_failure(self, error: str) -> None:
+        self.consecutive_failures += 1
+        self.last_error = error
+        self.last_checked = time.time()
+
+    def stats(self) -> Dict:
+        return {
+            "status": self.status,
+            "latency_ewma_ms": round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+            "consecutive_failures": self.consecutive_failures,
+            "last_checked": self.last_checked,
+            "last_error": self.last_error,
+        }
+
+
+class HealthMonitor:
+    """
+    Probes the health route (/) of every upstream replica concurrently on
+    an interval, in a background task started by the app lifespan
+
+    A replica failing its probes is taken out of load balancing; an
+    upstream is down when all of its replicas are. /health serves the
+    cached results, and the proxy rejects calls to an upstream marked
+    down at once instead of waiting for its timeout.
+    """
+
+    def __init__(self, upstreams, interval: float, timeout: float, failure_threshold: int, alpha: float):
+        self.upstreams = upstreams
+        self.interval = interval
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.alpha = alpha
+        # service -> replica URL -> probe results
+        self.states: Dict[str, Dict[str, UpstreamHealth]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def state_for(self, name: str, url: str) -> UpstreamHealth:
+        replicas = self.states.setdefault(name, {})
+        if url not in replicas:
+            replicas[url] = UpstreamHealth(self.failure_threshold, self.alpha)
+        return replicas[url]
+
+    async def probe(self, name: str, replica) -> None:
+        client = self.upstreams.get_client(name)
+        state = self.state_for(name, str(replica.url))
+        start = time.monotonic()
+        try:
+            response = await client.get(replica.url.join("/"), timeout=self.timeout)
+        except httpx.RequestError as e:
+            state.record_failure(f"{type(e).__name__}: {e}")
+        else:
+            if response.status_code >= 500:
+                state.record_failure(f"HTTP {response.status_code}")
+            else:
+                state.record_success(time.monotonic() - start)
+        replica.set_healthy(state.status != DOWN)
+
+    async def probe_all(self) -> None:
+        replica_sets = self.upstreams.replicas
+        # Forget the replicas removed since the last round
+        self.states = {
+            name: {url: state for url, state in self.states.get(name, {}).items() if url in replica_set.urls}
+            for name, replica_set in replica_sets.items()
+        }
+        await asyncio.gather(*(
+            self.probe(name, replica)
+            for name, replica_set in replica_sets.items()
+            for replica in list(replica_set.replicas)
+        ))
+
+    async def _run(self, initial_delay: float) -> None:
+        await asyncio.sleep(initial_delay)
+        while True:
+            await self.probe_all()
+            await asyncio.sleep(self.interval)
+
+    def start(self, initial_delay: float = 0.0) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run(initial_delay))
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    def status(self, name: str) -> str:
+        """
+        up if any replica passes its probes, down if all of them fail
+        """
+        replicas = self.states.get(name, {})
+        statuses = [replicas[url].status if url in replicas else UNKNOWN for url in self.upstreams.replicas[name].urls]
+        if statuses and all(status == DOWN for status in statuses):
+            return DOWN
+        return UP if UP in statuses else UNKNOWN
+
+    def is_down(self, name: str) -> bool:
+        return name in self.upstreams.replicas and self.status(name) == DOWN
+
+    def stats(self) -> Dict:
+        return {
+            name: {
+                "status": self.status(name),
+                "replicas": {url: state.stats() for url, state in self.states.get(name, {}).items()},
+            }
+            for name in self.upstreams.replicas
+        }
+
+
+def create_health_monitor(upstreams) -> HealthMonitor:
+    return HealthMonitor(
+        upstreams,
+        interval=config.HEALTH_CHECK_INTERVAL,
+        timeout=config.HEALTH_CHECK_TIMEOUT,
+        failure_threshold=config.HEALTH_FAILURE_THRESHOLD,
+        alpha=config.HEALTH_LATENCY_ALPHA
+    )
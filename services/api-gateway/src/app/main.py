@@ -1,25 +1,84 @@
-from fastapi import FastAPI
+import httpx
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from typing import Optional
 
+from app.auth import token_cache
+from app.balancer import ReplicaFileWatcher
+from app.cache import create_response_cache
+from app.coalesce import SingleFlight
+from app.health import create_health_monitor
+from app.metrics import AppMetrics, MetricsMiddleware, metrics_endpoint
+from app.ratelimit import RateLimitHeadersMiddleware, create_rate_limiter
+from app.resilience import LatencyTracker, RetryStats
+from app.compression import CompressionMiddleware
 from app.config import config
 from app.routes.auth import auth_router
+from app.routes.batch import batch_router
 from app.routes.orders import order_router
 from app.routes.products import product_router
+from app.timeouts import create_timeout_policy
+from app.tracing import TracingMiddleware
+from app.upstream import UpstreamRegistry
 
 
-def create_app() -> FastAPI:
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # STARTUP: runs in every worker before it accepts traffic. Open the
+    # pooled upstream clients, probe the upstreams once (which also opens
+    # the first connections), then keep probing and watching the replica file
+    await app.state.upstreams.startup()
+    if config.HEALTH_CHECK_ENABLED:
+        await app.state.health.probe_all()
+        app.state.health.start(initial_delay=config.HEALTH_CHECK_INTERVAL)
+    if config.UPSTREAM_REPLICAS_FILE:
+        app.state.replica_watcher.start()
+    yield  # the app run here
+
+    # SHUTDOWN: stop the background tasks, close the clients and their keep-alive connections
+    await app.state.replica_watcher.stop()
+    await app.state.health.stop()
+    await app.state.upstreams.shutdown()
+
+
+def create_app(upstream_transport: Optional[httpx.AsyncBaseTransport] = None) -> FastAPI:
     """
     Create and configure the API Gateway application
+    
+    Args:
+        upstream_transport: Optional transport for the upstream clients (used by the tests)
     """
     app = FastAPI(
         title=config.PROJECT_NAME,
         version=config.VERSION,
         description="API Gateway for B2B Ordering Management System",
         docs_url="/docs",
-        redoc_url="/redoc"
+        redoc_url="/redoc",
+        lifespan=lifespan
     )
+    app.state.upstreams = UpstreamRegistry(transport=upstream_transport)
+    app.state.health = create_health_monitor(app.state.upstreams)
+    app.state.replica_watcher = ReplicaFileWatcher(
+        app.state.upstreams, config.UPSTREAM_REPLICAS_FILE, config.UPSTREAM_REPLICAS_RELOAD_INTERVAL
+    )
+    app.state.response_cache = create_response_cache()
+    app.state.single_flight = SingleFlight()
+    app.state.latency = LatencyTracker()
+    app.state.timeouts = create_timeout_policy(app.state.latency)
+    app.state.retry_stats = RetryStats()
+    app.state.rate_limiter = create_rate_limiter()
+    app.state.metrics = AppMetrics()
+    app.state.metrics.watch_upstreams(app.state.upstreams)
+    app.state.metrics.watch_token_cache(token_cache)
+    app.state.metrics.watch_response_cache(app.state.response_cache, app.state.single_flight)
+    app.state.metrics.watch_rate_limiter(app.state.rate_limiter, app.state.retry_stats)
     
+    app.add_middleware(RateLimitHeadersMiddleware)
+    if config.COMPRESSION_ENABLED:
+        app.add_middleware(CompressionMiddleware)
+
     # CORS middleware
     app.add_middleware(
         CORSMiddleware,
@@ -27,12 +86,18 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        # Pagination cursor of the order lists, readable by browser clients
+        expose_headers=["X-Next-Cursor"],
     )
+    # Outermost, so the latency covers the whole middleware stack
+    app.add_middleware(MetricsMiddleware, metrics=app.state.metrics)
+    app.add_middleware(TracingMiddleware)
     
     # Include routers
     app.include_router(auth_router)
     app.include_router(order_router)
     app.include_router(product_router)
+    app.include_router(batch_router)
     
     @app.get("/")
     def health_check():
@@ -47,21 +112,31 @@ def create_app() -> FastAPI:
             }
         )
     
+    app.add_api_route("/metrics", metrics_endpoint, methods=["GET"], include_in_schema=False)
+
     @app.get("/health")
-    def health():
+    def health(request: Request):
         """
         Detailed health check endpoint
+        Served from the cached results of the background probes, with the
+        circuit breaker and bulkhead state of every upstream
         """
+        upstreams = request.app.state.upstreams.stats()
+        probes = request.app.state.health.stats()
+        for name, probe in probes.items():
+            upstreams[name]["health"] = probe
+        degraded = any(probe["status"] == "down" for probe in probes.values())
         return JSONResponse(
             content={
-                "status": "healthy",
+                "status": "degraded" if degraded else "healthy",
                 "service": "API Gateway",
                 "version": config.VERSION,
                 "services": {
                     "auth": config.AUTH_SERVICE_URL,
                     "orders": config.ORDER_SERVICE_URL,
                     "products": config.PRODUCT_SERVICE_URL
-                }
+                },
+                "upstreams": upstreams
             }
         )
     
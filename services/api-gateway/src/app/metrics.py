@@ -0,0 +1,301 @@
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from fastapi import Request
+from fastapi.responses import PlainTextResponse
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    """
+    One metric family; each distinct tuple of label values is one series
+
+    Metrics are only updated from the event loop thread (middleware and
+    async handlers), so plain dicts and numbers are enough: no locks on
+    the hot path.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        return [
+            (self.name, _format_labels(self.labelnames, labels), value)
+            for labels, value in self._values.items()
+        ]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in self.samples())
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def set_total(self, value: float, *labels: str) -> None:
+        """
+        Copy a total counted by another component (by a collector)
+        """
+        self._values[labels] = value
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        samples = []
+        for labels, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                samples.append((
+                    f"{self.name}_bucket",
+                    _format_labels(self.labelnames + ("le",), labels + (le,)),
+                    cumulative
+                ))
+            samples.append((f"{self.name}_sum", _format_labels(self.labelnames, labels), total))
+            samples.append((f"{self.name}_count", _format_labels(self.labelnames, labels), cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[Metric] = []
+        # Called before each scrape, to refresh gauges read from elsewhere
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collect in self._collectors:
+            collect()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class AppMetrics(MetricsRegistry):
+    """
+    Metrics of the gateway: HTTP traffic it serves and its upstream calls
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.requests_total = self.register(Counter(
+            "http_requests_total", "HTTP requests by method, route and status code", ("method", "route", "status")
+        ))
+        self.request_duration = self.register(Histogram(
+            "http_request_duration_seconds", "HTTP request latency by method and route", ("method", "route")
+        ))
+        self.requests_in_flight = self.register(Gauge(
+            "http_requests_in_flight", "HTTP requests currently being served"
+        ))
+        self.upstream_duration = self.register(Histogram(
+            "upstream_request_duration_seconds",
+            "Latency of the calls to upstream services, until the response headers",
+            ("service", "status")
+        ))
+        self.upstream_connections = self.register(Gauge(
+            "upstream_pool_connections", "Pooled connections per upstream by state", ("service", "state")
+        ))
+        self.upstream_queued = self.register(Gauge(
+            "upstream_pool_queued_requests", "Requests waiting for a pooled connection", ("service",)
+        ))
+
+    def watch_upstreams(self, upstreams) -> None:
+        """
+        Report the connection pools of an UpstreamRegistry on every scrape
+        """
+        def collect() -> None:
+            for service, stats in upstreams.pool_stats().items():
+                self.upstream_connections.set(stats["active"], service, "active")
+                self.upstream_connections.set(stats["idle"], service, "idle")
+                self.upstream_queued.set(stats["queued"], service)
+
+        self.add_collector(collect)
+
+    def watch_token_cache(self, token_cache) -> None:
+        """
+        Report the hits and misses of the JWT cache on every scrape
+        """
+        lookups = self.register(Counter(
+            "jwt_cache_lookups_total", "Token verifications served by the JWT cache, or not", ("result",)
+        ))
+        entries = self.register(Gauge("jwt_cache_entries", "Tokens in the JWT cache"))
+
+        def collect() -> None:
+            stats = token_cache.stats()
+            lookups.set_total(stats["hits"], "hit")
+            lookups.set_total(stats["misses"], "miss")
+            entries.set(stats["size"])
+
+        self.add_collector(collect)
+
+    def watch_response_cache(self, response_cache, single_flight) -> None:
+        """
+        Report the response cache and the coalesced GETs on every scrape
+        """
+        lookups = self.register(Counter(
+            "response_cache_lookups_total", "Response cache lookups by result", ("result",)
+        ))
+        entries = self.register(Gauge("response_cache_entries", "Responses in the response cache"))
+        size = self.register(Gauge("response_cache_bytes", "Size of the cached response bodies"))
+        coalesced = self.register(Counter(
+            "coalesced_requests_total",
+            "Identical upstream GETs sent upstream, or coalesced into one in flight",
+            ("result",)
+        ))
+        in_flight = self.register(Gauge(
+            "coalesced_requests_in_flight", "Coalesced upstream calls currently in flight"
+        ))
+
+        def collect() -> None:
+            stats = response_cache.stats()
+            lookups.set_total(stats["hits"], "hit")
+            lookups.set_total(stats["misses"], "miss")
+            lookups.set_total(stats["revalidations"], "revalidation")
+            entries.set(stats["entries"])
+            size.set(stats["bytes"])
+
+            stats = single_flight.stats()
+            coalesced.set_total(stats["upstream_calls"], "upstream")
+            coalesced.set_total(stats["saved_calls"], "coalesced")
+            in_flight.set(stats["in_flight"])
+
+        self.add_collector(collect)
+
+    def watch_rate_limiter(self, rate_limiter, retry_stats) -> None:
+        """
+        Report the rate limiter decisions and the retried and hedged
+        upstream calls on every scrape
+        """
+        decisions = self.register(Counter(
+            "rate_limit_decisions_total", "Requests allowed or denied by the rate limiter", ("decision",)
+        ))
+        retries = self.register(Counter("upstream_retries_total", "Retried upstream calls"))
+        hedges = self.register(Counter(
+            "upstream_hedged_requests_total", "Hedged upstream requests, sent and won", ("result",)
+        ))
+
+        def collect() -> None:
+            stats = rate_limiter.stats()
+            decisions.set_total(stats["allowed"], "allowed")
+            decisions.set_total(stats["denied"], "denied")
+
+            stats = retry_stats.stats()
+            retries.set_total(stats["retries"])
+            hedges.set_total(stats["hedges"], "sent")
+            hedges.set_total(stats["hedge_wins"], "won")
+
+        self.add_collector(collect)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording latency, status codes and in-flight
+    requests per route template (e.g. /orders/{path:path}), so the label
+    cardinality stays bounded whatever the request paths are
+    """
+
+    def __init__(self, app, metrics: AppMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = self.metrics
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        metrics.requests_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.requests_in_flight.dec()
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            metrics.request_duration.observe(time.perf_counter() - start, method, route_path)
+            metrics.requests_total.inc(method, route_path, str(status_code))
+
+
+def metrics_endpoint(request: Request) -> PlainTextResponse:
+    """
+    Prometheus text exposition of the app metrics
+    """
+    return PlainTextResponse(request.app.state.metrics.render(), media_type=CONTENT_TYPE)
@@ -1,65 +1,604 @@
+import asyncio
 import httpx
+import time
 from fastapi import HTTPException, Request, Response
-from typing import Dict, Optional
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from app.config import config
+from app.resilience import RetryBudget, backoff_delay, route_key
+from app.tracing import tracer
+
+# Headers that only apply to a single connection and must not be forwarded
+# (RFC 9110, section 7.6.1)
+HOP_BY_HOP_HEADERS = {
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "proxy-connection",
+    "te",
+    "trailer",
+    "transfer-encoding",
+    "upgrade",
+}
+
+# User context headers; only the gateway may set them
+USER_HEADERS = ("X-User-ID", "X-User-Role", "X-User-Department")
+
+# Absolute deadline of a request, in Unix epoch milliseconds
+DEADLINE_HEADER = "X-Request-Deadline"
+
+# Writes carrying this header are deduplicated by the service, see IDEMPOTENT_WRITE_ROUTES
+IDEMPOTENCY_KEY_HEADER = "idempotency-key"
+
+# Failures where the request never reached the service, safe to retry
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError)
+
+
+class UpstreamUnavailable(HTTPException):
+    """
+    503 raised when an upstream could not be reached
+    """
+
+    def __init__(self, error: httpx.RequestError):
+        super().__init__(
+            status_code=503,
+            detail=f"Service unavailable: {str(error)}"
+        )
+        self.retryable = isinstance(error, RETRYABLE_ERRORS)
+
+
+class UpstreamTimeout(UpstreamUnavailable):
+    """
+    504 raised when an upstream did not answer within the timeout budget
+    """
+
+    def __init__(self, error: httpx.TimeoutException):
+        super().__init__(error)
+        self.status_code = 504
+        self.detail = f"Upstream timeout: {str(error) or type(error).__name__}"
+
+
+def parse_deadline(value: Optional[str]) -> Optional[float]:
+    """
+    Deadline (epoch seconds) of an X-Request-Deadline header, None if it
+    is missing or invalid
+    """
+    try:
+        return int(value) / 1000 if value else None
+    except ValueError:
+        return None
+
+
+def format_deadline(deadline: float) -> str:
+    return str(int(deadline * 1000))
+
+
+def strip_hop_by_hop_headers(headers) -> Dict[str, str]:
+    """
+    Copy headers without the hop-by-hop ones, including any header
+    named in the Connection header
+    """
+    connection_headers = {
+        name.strip().lower()
+        for name in headers.get("connection", "").split(",")
+        if name.strip()
+    }
+    return {
+        key: value
+        for key, value in headers.items()
+        if key.lower() not in HOP_BY_HOP_HEADERS and key.lower() not in connection_headers
+    }
+
+
+def build_upstream_headers(request: Request, user_data: Optional[Dict] = None) -> Dict[str, str]:
+    """
+    Prepare the headers sent to an upstream service
+    """
+    headers = strip_hop_by_hop_headers(request.headers)
+
+    # Remove host header to avoid conflicts
+    headers.pop("host", None)
+
+    # Never trust user context sent by the client itself
+    for name in USER_HEADERS:
+        headers.pop(name.lower(), None)
+
+    # Inject user information into headers if authenticated
+    headers.update(user_headers(user_data))
+
+    return headers
+
+
+def user_headers(user_data: Optional[Dict]) -> Dict[str, str]:
+    """
+    User context headers for the claims of a verified token
+    """
+    if not user_data:
+        return {}
+    return {
+        "X-User-ID": str(user_data.get("sub", "")),
+        "X-User-Role": str(user_data.get("role", "")),
+        "X-User-Department": str(user_data.get("department_id", "")),
+    }
+
+
+def has_request_body(request: Request) -> bool:
+    """
+    True if the client announced a body (fixed length or chunked)
+    """
+    return "content-length" in request.headers or "transfer-encoding" in request.headers
+
+
+def target_replica(upstream_request: httpx.Request, replica) -> None:
+    """
+    Point a request built against the first replica of a service at the
+    replica picked by the load balancer
+    """
+    upstream_request.url = upstream_request.url.copy_with(
+        scheme=replica.url.scheme,
+        host=replica.url.host,
+        port=replica.url.port
+    )
+    upstream_request.headers["Host"] = replica.url.netloc.decode("ascii")
+
+
+def request_deadline(request: Request, service: str, path: str) -> float:
+    """
+    Deadline of an upstream call: the timeout budget of its route, capped
+    by the X-Request-Deadline the client sent, if any
+    """
+    client_deadline = parse_deadline(request.headers.get(DEADLINE_HEADER))
+    return request.app.state.timeouts.deadline(client_deadline, service, path)
+
+
+def is_retryable_write(request: Request, path: str) -> bool:
+    """
+    True for a write sent with an Idempotency-Key to a route whose service
+    replays the first response for it: such a write is safe to retry
+    """
+    return (
+        request.method in ("POST", "PUT", "PATCH")
+        and IDEMPOTENCY_KEY_HEADER in request.headers
+        and path in config.IDEMPOTENT_WRITE_ROUTES
+    )
+
+
+async def send_upstream(
+    request: Request,
+    service: str,
+    upstream_request: httpx.Request,
+    stream: bool = False,
+    deadline: Optional[float] = None
+) -> Tuple[httpx.Response, Callable[[], None]]:
+    """
+    Send a request through the bulkhead and circuit breaker of an upstream,
+    to the replica picked by its load balancer
+    Upstreams the health monitor knows to be down are rejected at once.
+
+    The call gets the time left until its deadline (epoch seconds; by
+    default the timeout budget of its route) as timeout, and the deadline
+    is passed on in the X-Request-Deadline header so the service can stop
+    working on a request nobody waits for anymore.
+
+    Returns the response and a release callback. Buffered responses are
+    released at once; streamed ones hold their bulkhead slot (and count as
+    outstanding on their replica) until the caller invokes the callback
+    after the body has been relayed.
+    """
+    upstreams = request.app.state.upstreams
+    breaker = upstreams.breakers[service]
+    bulkhead = upstreams.bulkheads[service]
+    route = route_key(service, upstream_request.url.path)
+
+    if deadline is None:
+        deadline = request_deadline(request, service, upstream_request.url.path)
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        raise HTTPException(status_code=504, detail=f"Deadline exceeded before calling {service}")
+    if request.app.state.health.is_down(service):
+        raise HTTPException(
+            status_code=503,
+            detail=f"Service unavailable: {service} is failing its health checks",
+            headers={"Retry-After": str(max(1, int(config.HEALTH_CHECK_INTERVAL)))}
+        )
+    if not bulkhead.try_acquire():
+        raise HTTPException(
+            status_code=503,
+            detail=f"Service saturated: {service}",
+            headers={"Retry-After": str(config.BULKHEAD_RETRY_AFTER)}
+        )
+    if not breaker.allow_request():
+        bulkhead.release()
+        raise HTTPException(
+            status_code=503,
+            detail=f"Service unavailable: circuit open for {service}",
+            headers={"Retry-After": str(breaker.retry_after())}
+        )
+
+    replicas = upstreams.replicas[service]
+    replica = replicas.pick()
+    target_replica(upstream_request, replica)
+    upstream_request.headers[DEADLINE_HEADER] = format_deadline(deadline)
+    upstream_request.extensions["timeout"] = httpx.Timeout(remaining).as_dict()
+    replica.outstanding += 1
+    released = False
+
+    def release() -> None:
+        nonlocal released
+        if not released:
+            released = True
+            replica.outstanding -= 1
+            bulkhead.release()
+
+    client = upstreams.get_client(service)
+    span = tracer.start_span(
+        f"{upstream_request.method} {service}",
+        kind="client",
+        **{
+            "peer.service": service,
+            "server.address": replica.url.netloc.decode("ascii"),
+            "http.method": upstream_request.method,
+            "http.target": upstream_request.url.path,
+        }
+    )
+    # Continue the trace in the service
+    upstream_request.headers["traceparent"] = span.traceparent
+    start = time.monotonic()
+    try:
+        response = await client.send(upstream_request, stream=stream)
+    except httpx.RequestError as e:
+        elapsed = time.monotonic() - start
+        request.app.state.metrics.upstream_duration.observe(elapsed, service, "error")
+        span.status = "error"
+        tracer.end_span(span, "upstream")
+        breaker.record_failure(elapsed)
+        replicas.record_failure(replica)
+        release()
+        if isinstance(e, httpx.TimeoutException):
+            raise UpstreamTimeout(e)
+        raise UpstreamUnavailable(e)
+    except BaseException:
+        span.status = "error"
+        tracer.end_span(span, "upstream")
+        breaker.release()
+        release()
+        raise
+
+    elapsed = time.monotonic() - start
+    span.attributes["http.status_code"] = response.status_code
+    tracer.end_span(span, "upstream")
+    request.app.state.metrics.upstream_duration.observe(elapsed, service, str(response.status_code))
+    if response.status_code >= 500:
+        breaker.record_failure(elapsed)
+        replicas.record_failure(replica)
+    else:
+        breaker.record_success(elapsed)
+        replicas.record_success(replica)
+        request.app.state.latency.record(route, elapsed)
+    if not stream:
+        release()
+    return response, release
+
+
+def discard_attempt(task: asyncio.Task, stream: bool) -> None:
+    """
+    Cancel a losing hedged attempt and free whatever it acquired
+    """
+    def cleanup(task: asyncio.Task) -> None:
+        if task.cancelled() or task.exception() is not None:
+            return
+        response, release = task.result()
+        if stream:
+            asyncio.ensure_future(response.aclose())
+        release()
+
+    if not task.done():
+        task.cancel()
+    task.add_done_callback(cleanup)
+
+
+async def hedged_send(
+    request: Request,
+    service: str,
+    route: str,
+    build: Callable[[], httpx.Request],
+    stream: bool,
+    budget: RetryBudget,
+    deadline: float
+) -> Tuple[httpx.Response, Callable[[], None]]:
+    """
+    Send a request and, if it is still pending after the p95 latency of
+    its route, fire a second one; the first successful response wins
+    """
+    delay = request.app.state.latency.percentile(route, config.HEDGE_PERCENTILE, config.HEDGE_MIN_SAMPLES)
+    primary = asyncio.ensure_future(send_upstream(request, service, build(), stream, deadline))
+    attempts = {primary}
+    try:
+        done, _ = await asyncio.wait(attempts, timeout=delay)
+        if delay is None or done or not budget.try_spend():
+            return await primary
+
+        stats = request.app.state.retry_stats
+        stats.hedges += 1
+        hedge = asyncio.ensure_future(send_upstream(request, service, build(), stream, deadline))
+        attempts.add(hedge)
+        pending = set(attempts)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            winners = [task for task in done if task.exception() is None]
+            if winners:
+                winner = winners[0]
+                if winner is hedge:
+                    stats.hedge_wins += 1
+                for task in attempts - {winner}:
+                    discard_attempt(task, stream)
+                return winner.result()
+            error = next(iter(done)).exception()
+        raise error
+    except BaseException:
+        for task in attempts:
+            discard_attempt(task, stream)
+        raise
+
+
+async def send_idempotent(
+    request: Request,
+    service: str,
+    path: str,
+    build: Callable[[], httpx.Request],
+    stream: bool = False,
+    deadline: Optional[float] = None,
+    hedge: bool = True
+) -> Tuple[httpx.Response, Callable[[], None]]:
+    """
+    Send an idempotent request with jittered retries on connection errors
+    and, when enabled and allowed, hedging; both are capped by one
+    per-request budget so a struggling service is not flooded with extra
+    attempts, and all the attempts share the deadline of the call
+    """
+    route = route_key(service, path)
+    budget = RetryBudget(config.RETRY_BUDGET)
+    if deadline is None:
+        deadline = request_deadline(request, service, path)
+    attempt = 0
+    while True:
+        try:
+            if config.HEDGING_ENABLED and hedge:
+                return await hedged_send(request, service, route, build, stream, budget, deadline)
+            return await send_upstream(request, service, build(), stream, deadline)
+        except UpstreamUnavailable as e:
+            if not e.retryable or attempt >= config.UPSTREAM_RETRIES or not budget.try_spend():
+                raise
+        attempt += 1
+        request.app.state.retry_stats.retries += 1
+        await asyncio.sleep(backoff_delay(attempt))
+
+
+async def dispatch(
+    request: Request,
+    service: str,
+    path: str,
+    build: Callable[[], httpx.Request],
+    stream: bool = False
+) -> Tuple[httpx.Response, Callable[[], None]]:
+    """
+    Send an upstream request, with retries and hedging for bodiless GETs
+    on the services that allow them, and retries for idempotent writes
+    (no hedging: a second attempt would find the first still in progress)
+    """
+    if request.method == "GET" and service in config.RETRY_SERVICES and not has_request_body(request):
+        return await send_idempotent(request, service, path, build, stream)
+    if is_retryable_write(request, path):
+        return await send_idempotent(request, service, path, build, stream, hedge=False)
+    return await send_upstream(request, service, build(), stream)
+
+
+async def relay_body(response: httpx.Response, release: Callable[[], None]) -> AsyncIterator[bytes]:
+    """
+    Relay the raw (still encoded) upstream chunks, so Content-Encoding and
+    Content-Length from the upstream stay valid, then free the connection
+    """
+    try:
+        async for chunk in response.aiter_raw():
+            yield chunk
+    finally:
+        await response.aclose()
+        release()
+
+
+async def forward_event_stream(
+    request: Request,
+    service: str,
+    path: str,
+    user_data: Optional[Dict] = None
+) -> Response:
+    """
+    Relay a long-lived event stream (SSE) event by event
+
+    Streams use the stream client of the service and stay out of the
+    bulkhead, the deadlines and the outstanding-request count of the
+    replicas, which are sized for short calls; a stream only fails when
+    the upstream stays silent longer than STREAM_IDLE_TIMEOUT. Upstreams
+    failing their health checks are refused at once.
+    """
+    if request.app.state.health.is_down(service):
+        raise HTTPException(
+            status_code=503,
+            detail=f"Service unavailable: {service} is failing its health checks",
+            headers={"Retry-After": str(max(1, int(config.HEALTH_CHECK_INTERVAL)))}
+        )
+
+    client = request.app.state.upstreams.get_stream_client(service)
+    upstream_request = client.build_request(
+        method=request.method,
+        url=path,
+        headers=build_upstream_headers(request, user_data),
+        params=request.query_params
+    )
+    replica = request.app.state.upstreams.replicas[service].pick()
+    target_replica(upstream_request, replica)
+
+    with tracer.span(
+        f"{upstream_request.method} {service}",
+        phase="upstream",
+        kind="client",
+        **{"peer.service": service, "http.target": path}
+    ) as span:
+        upstream_request.headers["traceparent"] = span.traceparent
+        try:
+            response = await client.send(upstream_request, stream=True)
+        except httpx.RequestError as e:
+            raise UpstreamUnavailable(e)
+        span.attributes["http.status_code"] = response.status_code
+
+    return StreamingResponse(
+        relay_body(response, lambda: None),
+        status_code=response.status_code,
+        headers=strip_hop_by_hop_headers(response.headers)
+    )
+
+
+async def fetch_upstream(
+    request: Request,
+    service: str,
+    path: str,
+    user_data: Optional[Dict] = None,
+    extra_headers: Optional[Dict[str, str]] = None,
+    drop_headers: Iterable[str] = (),
+    params: Optional[Dict[str, str]] = None
+) -> httpx.Response:
+    """
+    Send a bodiless request upstream and read the whole response
+    Used by the paths that need the complete body (e.g. the response cache)
+
+    The query defaults to the one of the incoming request. Identical GETs
+    in flight at the same time share one upstream call.
+    """
+    query = httpx.QueryParams(params) if params is not None else httpx.QueryParams(request.query_params)
+    headers = build_upstream_headers(request, user_data)
+    # The body is decoded here, so let httpx offer only what it can decode
+    headers.pop("accept-encoding", None)
+    for name in drop_headers:
+        headers.pop(name.lower(), None)
+    headers.update(extra_headers or {})
+
+    client = request.app.state.upstreams.get_client(service)
+
+    def build() -> httpx.Request:
+        return client.build_request(
+            method=request.method,
+            url=path,
+            headers=headers,
+            params=query
+        )
+
+    async def send() -> httpx.Response:
+        response, _ = await dispatch(request, service, path, build)
+        return response
+
+    if request.method != "GET":
+        return await send()
+    key = coalescing_key(request, service, path, headers, query)
+    return await request.app.state.single_flight.do(key, send)
+
+
+def coalescing_key(
+    request: Request,
+    service: str,
+    path: str,
+    headers: Dict[str, str],
+    query: httpx.QueryParams
+) -> Hashable:
+    """
+    Identity of a GET: method, URL, query and the headers that scope
+    the response to a user or select a representation
+    """
+    scoping = tuple(
+        headers.get(name, headers.get(name.lower(), ""))
+        for name in USER_HEADERS + ("If-None-Match",)
+    )
+    return (
+        request.method,
+        service,
+        path,
+        tuple(sorted(query.multi_items())),
+        scoping
+    )
+
+
+def buffered_response(upstream: httpx.Response) -> Response:
+    """
+    Relay a fully read upstream response
+    httpx already decoded the body, so the encoding headers are dropped
+    """
+    return Response(
+        content=upstream.content,
+        status_code=upstream.status_code,
+        headers={
+            name: value
+            for name, value in strip_hop_by_hop_headers(upstream.headers).items()
+            if name.lower() not in ("content-length", "content-encoding")
+        }
+    )
 
 
 async def forward_request(
     request: Request,
-    target_url: str,
+    service: str,
+    path: str,
     user_data: Optional[Dict] = None
 ) -> Response:
     """
     Forward the incoming request to a target service
-    
+
+    Both bodies are streamed: the client body is piped upstream as it
+    arrives and the upstream response is sent back chunk by chunk, so the
+    gateway never holds a whole payload in memory. GETs on the coalesced
+    routes are buffered instead, so concurrent identical reads can share
+    one upstream call.
+
     Args:
         request: The incoming FastAPI request
-        target_url: The target service URL
+        service: Name of the upstream service (auth, orders, products)
+        path: Path on the upstream service, e.g. /orders/me
         user_data: Optional user data from JWT to inject into headers
-        
+
     Returns:
-        Response from the target service
-    """
-    # Get request body if present
-    body = await request.body()
-    
-    # Prepare headers
-    headers = dict(request.headers)
-    
-    # Remove host header to avoid conflicts
-    headers.pop("host", None)
-    
-    # Inject user information into headers if authenticated
-    if user_data:
-        headers["X-User-ID"] = str(user_data.get("sub", ""))
-        headers["X-User-Role"] = str(user_data.get("role", ""))
-        headers["X-User-Department"] = str(user_data.get("department_id", ""))
-    
-    # Make the request to the target service
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.request(
-                method=request.method,
-                url=target_url,
-                headers=headers,
-                content=body,
-                params=request.query_params,
-                timeout=30.0
-            )
-            
-            # Return the response
-            return Response(
-                content=response.content,
-                status_code=response.status_code,
-                headers=dict(response.headers),
-                media_type=response.headers.get("content-type")
-            )
-        except httpx.RequestError as e:
-            raise HTTPException(
-                status_code=503,
-                detail=f"Service unavailable: {str(e)}"
-            )
-        except httpx.HTTPStatusError as e:
-            raise HTTPException(
-                status_code=e.response.status_code,
-                detail=str(e)
-            )
+        Streaming response from the target service
+    """
+    if request.method == "GET" and path in config.STREAM_ROUTES:
+        return await forward_event_stream(request, service, path, user_data)
+    if request.method == "GET" and path in config.COALESCED_ROUTES:
+        return buffered_response(await fetch_upstream(request, service, path, user_data))
+
+    headers = build_upstream_headers(request, user_data)
+    if not has_request_body(request):
+        content = None
+    elif is_retryable_write(request, path):
+        # Buffered, so the body can be sent again by a retry
+        content = await request.body()
+    else:
+        content = request.stream()
+
+    # Make the request with the pooled client of the target service
+    client = request.app.state.upstreams.get_client(service)
+
+    def build() -> httpx.Request:
+        return client.build_request(
+            method=request.method,
+            url=path,
+            headers=headers,
+            content=content,
+            params=request.query_params
+        )
+
+    response, release = await dispatch(request, service, path, build, stream=True)
+
+    return StreamingResponse(
+        relay_body(response, release),
+        status_code=response.status_code,
+        headers=strip_hop_by_hop_headers(response.headers)
+    )
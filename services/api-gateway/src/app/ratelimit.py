@@ -0,0 +1,205 @@
+import abc
+import math
+import time
+from collections import OrderedDict
+from fastapi import Depends, HTTPException, Request, status
+from typing import Dict, List, Optional, Tuple
+
+from app.auth import get_current_user
+from app.config import config
+
+# Identity claims of the JWT each limit scope is keyed on
+SCOPE_CLAIMS = {"user": "sub", "department": "department_id"}
+
+
+class BucketSpec:
+    """
+    One token bucket to draw from: refills ``rate`` tokens per second
+    up to ``burst`` tokens
+    """
+
+    def __init__(self, key: str, rate: float, burst: int):
+        self.key = key
+        self.rate = rate
+        self.burst = burst
+
+
+class BucketState:
+    def __init__(self, spec: BucketSpec, tokens: float):
+        self.spec = spec
+        self.tokens = tokens
+
+    @property
+    def remaining(self) -> int:
+        return max(0, int(self.tokens))
+
+    @property
+    def reset(self) -> int:
+        """
+        Seconds until the bucket is full again
+        """
+        return math.ceil((self.spec.burst - self.tokens) / self.spec.rate)
+
+    @property
+    def retry_after(self) -> int:
+        """
+        Seconds until the next token is available
+        """
+        return max(1, math.ceil((1 - self.tokens) / self.spec.rate))
+
+
+class BucketStore(abc.ABC):
+    """
+    Storage of token buckets
+
+    acquire() must be all-or-nothing: a token is taken from every bucket or
+    from none. Implement it on a shared store (e.g. a Redis script) to share
+    the limits between gateway replicas.
+    """
+
+    @abc.abstractmethod
+    def acquire(self, specs: List[BucketSpec]) -> Tuple[bool, List[BucketState]]:
+        ...
+
+
+class InMemoryBucketStore(BucketStore):
+    """
+    Process-local bucket store, bounded by evicting the least recently
+    used buckets (an evicted bucket simply starts full again)
+    """
+
+    def __init__(self, max_buckets: int = 100000):
+        self.max_buckets = max_buckets
+        # key -> (tokens, last refill time)
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def acquire(self, specs: List[BucketSpec]) -> Tuple[bool, List[BucketState]]:
+        now = time.monotonic()
+        states = []
+        for spec in specs:
+            tokens, updated_at = self._buckets.get(spec.key, (float(spec.burst), now))
+            tokens = min(float(spec.burst), tokens + (now - updated_at) * spec.rate)
+            states.append(BucketState(spec, tokens))
+
+        allowed = all(state.tokens >= 1 for state in states)
+        for state in states:
+            if allowed:
+                state.tokens -= 1
+            self._buckets[state.spec.key] = (state.tokens, now)
+            self._buckets.move_to_end(state.spec.key)
+        while len(self._buckets) > self.max_buckets:
+            self._buckets.popitem(last=False)
+        return allowed, states
+
+
+def parse_rate_limits(raw: str) -> List[Tuple[str, Dict[str, Tuple[float, int]]]]:
+    """
+    Parse "/orders user=10/20 department=100/200; /products user=20/40"
+    into (prefix, {scope: (rate per second, burst)}), longest prefix first
+    """
+    rules = []
+    for entry in raw.split(";"):
+        parts = entry.split()
+        if not parts:
+            continue
+        prefix, limits = parts[0], {}
+        for part in parts[1:]:
+            scope, value = part.split("=", 1)
+            rate, burst = value.split("/", 1)
+            if scope not in SCOPE_CLAIMS:
+                raise ValueError(f"Unknown rate limit scope: {scope}")
+            limits[scope] = (float(rate), int(burst))
+        rules.append((prefix, limits))
+    return sorted(rules, key=lambda rule: len(rule[0]), reverse=True)
+
+
+class RateLimiter:
+    def __init__(self, store: BucketStore, rules: List[Tuple[str, Dict[str, Tuple[float, int]]]]):
+        self.store = store
+        self.rules = rules
+        self.allowed = 0
+        self.denied = 0
+
+    def specs_for(self, path: str, user: Dict) -> List[BucketSpec]:
+        for prefix, limits in self.rules:
+            if path.startswith(prefix):
+                return [
+                    BucketSpec(f"{prefix}:{scope}:{user.get(SCOPE_CLAIMS[scope], '')}", rate, burst)
+                    for scope, (rate, burst) in limits.items()
+                ]
+        return []
+
+    def check(self, path: str, user: Dict) -> Tuple[bool, Optional[Dict[str, str]]]:
+        """
+        Take a token for the request; returns whether it is allowed and
+        the RateLimit-* headers of the most constrained bucket
+        """
+        specs = self.specs_for(path, user)
+        if not specs:
+            return True, None
+
+        allowed, states = self.store.acquire(specs)
+        tightest = min(states, key=lambda state: state.tokens)
+        headers = {
+            "RateLimit-Limit": str(tightest.spec.burst),
+            "RateLimit-Remaining": str(tightest.remaining),
+            "RateLimit-Reset": str(tightest.reset),
+        }
+        if allowed:
+            self.allowed += 1
+        else:
+            self.denied += 1
+            headers["Retry-After"] = str(tightest.retry_after)
+        return allowed, headers
+
+    def stats(self) -> Dict:
+        return {"allowed": self.allowed, "denied": self.denied}
+
+
+def create_rate_limiter(store: Optional[BucketStore] = None) -> RateLimiter:
+    rules = parse_rate_limits(config.RATE_LIMITS) if config.RATE_LIMIT_ENABLED else []
+    return RateLimiter(store or InMemoryBucketStore(config.RATE_LIMIT_MAX_BUCKETS), rules)
+
+
+async def enforce_rate_limit(request: Request, user: Dict = Depends(get_current_user)) -> None:
+    """
+    Router dependency: admit the request through the caller's user and
+    department token buckets, or reject it with 429
+    """
+    allowed, headers = request.app.state.rate_limiter.check(request.url.path, user)
+    if not allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded",
+            headers=headers
+        )
+    if headers:
+        # Added to the response by RateLimitHeadersMiddleware
+        request.state.rate_limit_headers = headers
+
+
+class RateLimitHeadersMiddleware:
+    """
+    Pure ASGI middleware copying the RateLimit-* headers computed by the
+    dependency onto the response (streamed responses included)
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = scope.get("state", {}).get("rate_limit_headers")
+                if headers:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (name.lower().encode("latin-1"), value.encode("latin-1"))
+                        for name, value in headers.items()
+                    ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
@@ -0,0 +1,247 @@
+import random
+import time
+import uuid
+from collections import deque
+from typing import Dict, Optional
+
+from app.config import config
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Per-upstream circuit breaker driven by error rate and latency
+
+    closed:    calls flow, outcomes are recorded in a sliding window of the
+               last calls; the breaker opens when the failure rate or the
+               slow-call rate of the window crosses its threshold
+    open:      calls are rejected until the open period elapses
+    half_open: a few probe calls are let through; a success closes the
+               breaker, a failure opens it again
+    """
+
+    def __init__(
+        self,
+        window_size: int,
+        min_calls: int,
+        failure_rate_threshold: float,
+        slow_call_seconds: float,
+        slow_call_rate_threshold: float,
+        open_seconds: float,
+        half_open_max_calls: int
+    ):
+        self.window_size = window_size
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.half_open_calls = 0
+        # (failed, slow) of the last calls
+        self._window: deque = deque(maxlen=window_size)
+
+    def allow_request(self) -> bool:
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.open_seconds:
+                return False
+            self.state = HALF_OPEN
+            self.half_open_calls = 0
+        if self.state == HALF_OPEN:
+            if self.half_open_calls >= self.half_open_max_calls:
+                return False
+            self.half_open_calls += 1
+        return True
+
+    def retry_after(self) -> int:
+        """
+        Seconds until the breaker lets probe calls through again
+        """
+        remaining = self.open_seconds - (time.monotonic() - self.opened_at)
+        return max(1, int(remaining + 0.999))
+
+    def record_success(self, elapsed: float) -> None:
+        self._record(failed=False, elapsed=elapsed)
+
+    def record_failure(self, elapsed: float = 0.0) -> None:
+        self._record(failed=True, elapsed=elapsed)
+
+    def release(self) -> None:
+        """
+        Forget a permitted call that never produced an outcome (cancelled)
+        """
+        if self.state == HALF_OPEN and self.half_open_calls > 0:
+            self.half_open_calls -= 1
+
+    def _record(self, failed: bool, elapsed: float) -> None:
+        slow = elapsed >= self.slow_call_seconds
+        if self.state == HALF_OPEN:
+            if failed or slow:
+                self._open()
+            else:
+                self._close()
+            return
+
+        self._window.append((failed, slow))
+        if self.state == CLOSED and len(self._window) >= self.min_calls:
+            calls = len(self._window)
+            failure_rate = sum(1 for f, _ in self._window if f) / calls
+            slow_rate = sum(1 for _, s in self._window if s) / calls
+            if failure_rate >= self.failure_rate_threshold or slow_rate >= self.slow_call_rate_threshold:
+                self._open()
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.half_open_calls = 0
+        self._window.clear()
+
+    def _close(self) -> None:
+        self.state = CLOSED
+        self.half_open_calls = 0
+        self._window.clear()
+
+    def stats(self) -> Dict:
+        calls = len(self._window)
+        return {
+            "state": self.state,
+            "window_calls": calls,
+            "failure_rate": round(sum(1 for f, _ in self._window if f) / calls, 3) if calls else 0.0,
+            "slow_call_rate": round(sum(1 for _, s in self._window if s) / calls, 3) if calls else 0.0,
+        }
+
+
+class Bulkhead:
+    """
+    Bounded number of concurrent calls to one upstream
+
+    Acquisition never waits: a saturated upstream is rejected at once so
+    a slow service cannot tie up the gateway for the other ones.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.rejected = 0
+
+    def try_acquire(self) -> bool:
+        if self.in_flight >= self.max_concurrency:
+            self.rejected += 1
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self) -> None:
+        if self.in_flight > 0:
+            self.in_flight -= 1
+
+    def stats(self) -> Dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "rejected": self.rejected,
+        }
+
+
+def create_circuit_breaker() -> CircuitBreaker:
+    return CircuitBreaker(
+        window_size=config.BREAKER_WINDOW_SIZE,
+        min_calls=config.BREAKER_MIN_CALLS,
+        failure_rate_threshold=config.BREAKER_FAILURE_RATE,
+        slow_call_seconds=config.BREAKER_SLOW_CALL_SECONDS,
+        slow_call_rate_threshold=config.BREAKER_SLOW_CALL_RATE,
+        open_seconds=config.BREAKER_OPEN_SECONDS,
+        half_open_max_calls=config.BREAKER_HALF_OPEN_CALLS
+    )
+
+
+def create_bulkhead() -> Bulkhead:
+    return Bulkhead(config.BULKHEAD_MAX_CONCURRENCY)
+
+
+class LatencyTracker:
+    """
+    Recent upstream latencies per route, used to derive hedging delays
+    and adaptive timeouts
+    """
+
+    def __init__(self, max_samples: int = 200):
+        self.max_samples = max_samples
+        self._samples: Dict[str, deque] = {}
+
+    def record(self, route: str, seconds: float) -> None:
+        samples = self._samples.get(route)
+        if samples is None:
+            samples = self._samples[route] = deque(maxlen=self.max_samples)
+        samples.append(seconds)
+
+    def percentile(self, route: str, q: float, min_samples: int = 1) -> Optional[float]:
+        """
+        q-th percentile (0..1) of the route latency, None until
+        enough samples have been seen
+        """
+        samples = self._samples.get(route)
+        if not samples or len(samples) < min_samples:
+            return None
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[index]
+
+
+class RetryStats:
+    def __init__(self):
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def stats(self) -> Dict:
+        return {"retries": self.retries, "hedges": self.hedges, "hedge_wins": self.hedge_wins}
+
+
+def backoff_delay(attempt: int) -> float:
+    """
+    Exponential backoff with full jitter for the given retry attempt (1-based)
+    """
+    cap = min(config.RETRY_BACKOFF_MAX, config.RETRY_BACKOFF_BASE * (2 ** (attempt - 1)))
+    return random.uniform(0, cap)
+
+
+def route_key(service: str, path: str) -> str:
+    """
+    Route template of an upstream path: identifier segments
+    (UUIDs, numbers) are collapsed so /products/<id> is one route
+    """
+    segments = [
+        "{id}" if segment.isdigit() or _is_uuid(segment) else segment
+        for segment in path.split("/")
+    ]
+    return f"{service}:{'/'.join(segments)}"
+
+
+def _is_uuid(value: str) -> bool:
+    try:
+        uuid.UUID(value)
+        return True
+    except ValueError:
+        return False
+
+
+class RetryBudget:
+    """
+    Extra upstream attempts (retries and hedges) left for one client request
+    """
+
+    def __init__(self, attempts: int):
+        self.remaining = attempts
+
+    def try_spend(self) -> bool:
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        return True
@@ -2,7 +2,6 @@ from fastapi import APIRouter, Request, Depends
 from typing import Dict, Optional
 
 from app.auth import get_optional_user
-from app.config import config
 from app.proxy import forward_request
 
 auth_router = APIRouter(prefix="/auth", tags=["auth"])
@@ -18,5 +17,4 @@ async def proxy_auth_service(
     Proxy all requests to the Auth Service
     Authentication is optional for auth endpoints (login, register)
     """
-    target_url = f"{config.AUTH_SERVICE_URL}/auth/{path}"
-    return await forward_request(request, target_url, user)
+    return await forward_request(request, "auth", f"/auth/{path}", user)
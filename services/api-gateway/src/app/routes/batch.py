@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Request, Depends
+from typing import Dict
+
+from app.auth import get_current_user
+from app.batch import BatchRequest, run_batch
+
+batch_router = APIRouter(prefix="/batch", tags=["batch"])
+
+
+@batch_router.post("")
+async def batch(
+    payload: BatchRequest,
+    request: Request,
+    user: Dict = Depends(get_current_user)
+):
+    """
+    Run several order and product calls in one request
+    The caller is authenticated once for the whole batch
+    """
+    return await run_batch(request, payload, user)
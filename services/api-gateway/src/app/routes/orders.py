@@ -1,11 +1,25 @@
 from fastapi import APIRouter, Request, Depends
 from typing import Dict
 
+from app.aggregation import get_order_details
 from app.auth import get_current_user
-from app.config import config
 from app.proxy import forward_request
+from app.ratelimit import enforce_rate_limit
 
-order_router = APIRouter(prefix="/orders", tags=["orders"])
+order_router = APIRouter(prefix="/orders", tags=["orders"], dependencies=[Depends(enforce_rate_limit)])
+
+
+@order_router.get("/{order_id}/details")
+async def order_details(
+    order_id: str,
+    request: Request,
+    user: Dict = Depends(get_current_user)
+):
+    """
+    Order enriched with the catalog data of its products, in one call
+    Requires authentication
+    """
+    return await get_order_details(request, order_id, user)
 
 
 @order_router.api_route("/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
@@ -18,8 +32,7 @@ async def proxy_order_service(
     Proxy all requests to the Order Service
     Requires authentication
     """
-    target_url = f"{config.ORDER_SERVICE_URL}/orders/{path}"
-    return await forward_request(request, target_url, user)
+    return await forward_request(request, "orders", f"/orders/{path}", user)
 
 
 @order_router.api_route("", methods=["GET", "POST"], include_in_schema=True)
@@ -31,5 +44,4 @@ async def proxy_order_service_root(
     Proxy requests to the Order Service root endpoint
     Requires authentication
     """
-    target_url = f"{config.ORDER_SERVICE_URL}/orders"
-    return await forward_request(request, target_url, user)
+    return await forward_request(request, "orders", "/orders", user)
@@ -2,10 +2,29 @@ from fastapi import APIRouter, Request, Depends
 from typing import Dict
 
 from app.auth import get_current_user
-from app.config import config
+from app.cache import forward_cached_request
 from app.proxy import forward_request
+from app.ratelimit import enforce_rate_limit
 
-product_router = APIRouter(prefix="/products", tags=["products"])
+product_router = APIRouter(prefix="/products", tags=["products"], dependencies=[Depends(enforce_rate_limit)])
+
+
+async def proxy_products(request: Request, path: str, user: Dict):
+    """
+    Serve whitelisted catalog reads from the response cache and
+    invalidate the cached catalog on every successful write
+    """
+    cache = request.app.state.response_cache
+    if request.method == "GET":
+        ttl = cache.ttl_for(path)
+        if ttl is not None:
+            return await forward_cached_request(request, "products", path, ttl, user)
+        return await forward_request(request, "products", path, user)
+
+    response = await forward_request(request, "products", path, user)
+    if 200 <= response.status_code < 300:
+        cache.invalidate_prefix("/products")
+    return response
 
 
 @product_router.api_route("/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
@@ -18,8 +37,7 @@ async def proxy_product_service(
     Proxy all requests to the Product Service
     Requires authentication
     """
-    target_url = f"{config.PRODUCT_SERVICE_URL}/products/{path}"
-    return await forward_request(request, target_url, user)
+    return await proxy_products(request, f"/products/{path}", user)
 
 
 @product_router.api_route("", methods=["GET", "POST"], include_in_schema=True)
@@ -31,5 +49,4 @@ async def proxy_product_service_root(
     Proxy requests to the Product Service root endpoint
     Requires authentication
     """
-    target_url = f"{config.PRODUCT_SERVICE_URL}/products"
-    return await forward_request(request, target_url, user)
+    return await proxy_products(request, "/products", user)
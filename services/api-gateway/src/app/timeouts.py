@@ -0,0 +1,76 @@
+import time
+from typing import List, Optional, Tuple
+
+from app.cache import parse_route_ttls
+from app.config import config
+from app.resilience import LatencyTracker, route_key
+
+
+class TimeoutPolicy:
+    """
+    Timeout budget of the upstream calls
+
+    Each upstream path gets the budget of its longest configured prefix
+    (UPSTREAM_TIMEOUT otherwise). Once a route has enough latency samples,
+    the budget is tightened to a multiple of its observed percentile, so
+    a call hanging far beyond what the route normally takes fails early;
+    the configured budget stays the upper bound.
+    """
+
+    def __init__(
+        self,
+        latency: LatencyTracker,
+        route_timeouts: List[Tuple[str, float]],
+        default: float,
+        adaptive: bool = True,
+        percentile: float = 0.99,
+        multiplier: float = 3.0,
+        minimum: float = 0.5,
+        min_samples: int = 50
+    ):
+        self.latency = latency
+        self.route_timeouts = route_timeouts
+        self.default = default
+        self.adaptive = adaptive
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.minimum = minimum
+        self.min_samples = min_samples
+
+    def configured(self, path: str) -> float:
+        for prefix, seconds in self.route_timeouts:
+            if path.startswith(prefix):
+                return seconds
+        return self.default
+
+    def timeout(self, service: str, path: str) -> float:
+        budget = self.configured(path)
+        if not self.adaptive:
+            return budget
+        observed = self.latency.percentile(route_key(service, path), self.percentile, self.min_samples)
+        if observed is None:
+            return budget
+        return min(budget, max(self.minimum, observed * self.multiplier))
+
+    def deadline(self, client_deadline: Optional[float], service: str, path: str) -> float:
+        """
+        Absolute deadline (epoch seconds) of a call: its timeout from now,
+        or the deadline the client sent if that is earlier
+        """
+        deadline = time.time() + self.timeout(service, path)
+        if client_deadline is not None:
+            deadline = min(deadline, client_deadline)
+        return deadline
+
+
+def create_timeout_policy(latency: LatencyTracker) -> TimeoutPolicy:
+    return TimeoutPolicy(
+        latency,
+        route_timeouts=parse_route_ttls(config.ROUTE_TIMEOUTS),
+        default=config.UPSTREAM_TIMEOUT,
+        adaptive=config.ADAPTIVE_TIMEOUTS_ENABLED,
+        percentile=config.ADAPTIVE_TIMEOUT_PERCENTILE,
+        multiplier=config.ADAPTIVE_TIMEOUT_MULTIPLIER,
+        minimum=config.ADAPTIVE_TIMEOUT_MIN,
+        min_samples=config.ADAPTIVE_TIMEOUT_MIN_SAMPLES
+    )
@@ -0,0 +1,160 @@
+import httpx
+from typing import Dict, List, Optional, Union
+
+from app.balancer import ReplicaSet, create_replica_set, load_replica_file, parse_replica_urls
+from app.config import config
+from app.resilience import create_bulkhead, create_circuit_breaker
+
+
+def default_upstream_urls() -> Dict[str, List[str]]:
+    """
+    Replica URLs of every upstream service, keyed by the name used in the
+    routes; the replica file, when configured, overrides the settings
+    """
+    urls = {
+        "auth": parse_replica_urls(config.AUTH_SERVICE_URL),
+        "orders": parse_replica_urls(config.ORDER_SERVICE_URL),
+        "products": parse_replica_urls(config.PRODUCT_SERVICE_URL),
+    }
+    if config.UPSTREAM_REPLICAS_FILE:
+        try:
+            replicas = load_replica_file(config.UPSTREAM_REPLICAS_FILE)
+        except (OSError, ValueError):
+            replicas = {}
+        urls.update({name: replicas[name] for name in urls if replicas.get(name)})
+    return urls
+
+
+class UpstreamRegistry:
+    """
+    Owns one long-lived, pooled httpx.AsyncClient per upstream service
+
+    Clients are opened in the app lifespan and closed on shutdown, so
+    connections to the services are kept alive and reused across requests.
+    A service may run several replicas: the client pools connections to
+    all of them and each call is sent to the replica its ReplicaSet picks.
+    Long-lived event streams get a separate client per service, so they
+    cannot exhaust the pool of the regular calls.
+    """
+
+    def __init__(
+        self,
+        urls: Optional[Dict[str, Union[str, List[str]]]] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        urls = urls if urls is not None else default_upstream_urls()
+        self.replicas: Dict[str, ReplicaSet] = {
+            name: create_replica_set(parse_replica_urls(replica_urls)) for name, replica_urls in urls.items()
+        }
+        # Custom transport (e.g. httpx.MockTransport) used by the tests
+        self.transport = transport
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._stream_clients: Dict[str, httpx.AsyncClient] = {}
+        self.breakers = {name: create_circuit_breaker() for name in self.replicas}
+        self.bulkheads = {name: create_bulkhead() for name in self.replicas}
+
+    @property
+    def urls(self) -> Dict[str, List[str]]:
+        return {name: replica_set.urls for name, replica_set in self.replicas.items()}
+
+    def update_replicas(self, urls: Dict[str, List[str]]) -> None:
+        """
+        Apply new replica lists; unknown services and empty lists are ignored
+        """
+        for name, replica_urls in urls.items():
+            if name in self.replicas and replica_urls:
+                self.replicas[name].update(replica_urls)
+
+    def _build_client(self, name: str, stream: bool = False) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=config.STREAM_MAX_CONNECTIONS if stream else config.UPSTREAM_MAX_CONNECTIONS,
+            max_keepalive_connections=config.UPSTREAM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=config.UPSTREAM_KEEPALIVE_EXPIRY
+        )
+        timeout = httpx.Timeout(config.UPSTREAM_TIMEOUT)
+        if stream:
+            # Streams may stay silent up to the idle timeout between two chunks
+            timeout = httpx.Timeout(config.UPSTREAM_TIMEOUT, read=config.STREAM_IDLE_TIMEOUT)
+        # Requests are built against the first replica, then re-targeted
+        return httpx.AsyncClient(
+            base_url=self.urls[name][0],
+            limits=limits,
+            http2=config.UPSTREAM_HTTP2,
+            timeout=timeout,
+            transport=self.transport
+        )
+
+    async def startup(self) -> None:
+        """
+        Open a client for every configured upstream
+        """
+        for name in self.replicas:
+            if name not in self._clients:
+                self._clients[name] = self._build_client(name)
+
+    async def shutdown(self) -> None:
+        """
+        Close every client and release its pooled connections
+        """
+        clients, self._clients = self._clients, {}
+        stream_clients, self._stream_clients = self._stream_clients, {}
+        for client in list(clients.values()) + list(stream_clients.values()):
+            await client.aclose()
+
+    def get_client(self, name: str) -> httpx.AsyncClient:
+        """
+        Return the pooled client of an upstream
+        The client is created lazily if the lifespan hook did not run
+        """
+        client = self._clients.get(name)
+        if client is None:
+            if name not in self.replicas:
+                raise KeyError(f"Unknown upstream service: {name}")
+            client = self._build_client(name)
+            self._clients[name] = client
+        return client
+
+    def get_stream_client(self, name: str) -> httpx.AsyncClient:
+        """
+        Return the client of the long-lived event streams of an upstream,
+        created on first use
+        """
+        client = self._stream_clients.get(name)
+        if client is None:
+            if name not in self.replicas:
+                raise KeyError(f"Unknown upstream service: {name}")
+            client = self._build_client(name, stream=True)
+            self._stream_clients[name] = client
+        return client
+
+    def pool_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Active, idle and queued connections of every open client pool
+        Read from the httpcore pool; custom transports are skipped
+        """
+        stats = {}
+        for name, client in self._clients.items():
+            pool = getattr(client._transport, "_pool", None)
+            if pool is None:
+                continue
+            connections = list(pool.connections)
+            idle = sum(1 for connection in connections if connection.is_idle())
+            stats[name] = {
+                "active": len(connections) - idle,
+                "idle": idle,
+                "queued": sum(1 for pending in list(pool._requests) if pending.is_queued()),
+            }
+        return stats
+
+    def stats(self) -> Dict:
+        """
+        Replica, breaker and bulkhead state of every upstream
+        """
+        return {
+            name: {
+                "replicas": replica_set.stats(),
+                "circuit_breaker": self.breakers[name].stats(),
+                "bulkhead": self.bulkheads[name].stats(),
+            }
+            for name, replica_set in self.replicas.items()
+        }
@@ -1,5 +1,8 @@
+import httpx
+import json as jsonlib
 import pytest
 from fastapi.testclient import TestClient
+from jose import jwt
 from unittest.mock import patch, MagicMock
 import sys
 import os
@@ -7,9 +10,19 @@ import os
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
+from app.config import config
 from app.main import create_app
 
 
+@pytest.fixture(autouse=True)
+def no_health_probes(monkeypatch):
+    """
+    Keep the background health probes from hitting the mock upstreams;
+    the health monitor tests drive the probes themselves
+    """
+    monkeypatch.setattr(config, "HEALTH_CHECK_ENABLED", False)
+
+
 @pytest.fixture
 def client():
     """Create a test client"""
@@ -21,3 +34,39 @@ def client():
 def mock_auth_token():
     """Create a mock JWT token"""
     return "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.eyJzdWIiOiIxMjM0NTY3OC0xMjM0LTU2NzgtMTIzNC01Njc4MTIzNDU2NzgiLCJyb2xlIjoic3RhZmYiLCJkZXBhcnRtZW50X2lkIjoiMSIsInR5cGUiOiJhY2Nlc3MifQ"
+
+
+def upstream_response(status_code=200, json=None, content=b"", headers=None):
+    """
+    Build an upstream response whose body is still a stream,
+    like the ones returned by a real connection
+    """
+    headers = dict(headers or {})
+    if json is not None:
+        content = jsonlib.dumps(json).encode()
+        headers.setdefault("Content-Type", "application/json")
+    return httpx.Response(status_code, headers=headers, stream=httpx.ByteStream(content))
+
+
+@pytest.fixture
+def make_gateway():
+    """
+    Build a test client whose upstream calls are answered by ``handler``
+    instead of the real services (httpx.MockTransport)
+    """
+    def _make(handler):
+        app = create_app(upstream_transport=httpx.MockTransport(handler))
+        return TestClient(app)
+    return _make
+
+
+@pytest.fixture
+def access_token():
+    """Create a signed access token for the configured secret"""
+    payload = {
+        "sub": "12345678-1234-5678-1234-567812345678",
+        "role": "staff",
+        "department_id": "1",
+        "type": "access"
+    }
+    return jwt.encode(payload, config.JWT_SECRET, algorithm=config.ALGORITHM)
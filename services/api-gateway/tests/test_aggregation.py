@@ -0,0 +1,116 @@
+import asyncio
+
+from conftest import upstream_response
+from app.config import config
+
+ORDER_ID = "0b5f2a7e-6a4c-4c4f-9d3c-1c2b3a4d5e6f"
+
+ORDER = {
+    "id": ORDER_ID,
+    "status": "pending",
+    "items": [
+        {"product_name": "Paper A4", "quantity": 5},
+        {"product_name": "Stapler", "quantity": 1},
+        {"product_name": "Paper A4", "quantity": 2},
+    ],
+}
+
+PRODUCTS = {
+    "Paper A4": {"id": "p-1", "name": "Paper A4", "sku": "PAP-A4", "stock_quantity": 40},
+    "Stapler": {"id": "p-2", "name": "Stapler", "sku": "STA-01", "stock_quantity": 3},
+}
+
+
+def order_and_products(failing=()):
+    def handler(request):
+        if request.url.path == f"/orders/{ORDER_ID}":
+            return upstream_response(200, json=ORDER)
+        name = request.url.params["name"]
+        if name in failing:
+            return upstream_response(500, json={"detail": "boom"})
+        return upstream_response(200, json=[PRODUCTS[name]] if name in PRODUCTS else [])
+    return handler
+
+
+def test_order_details_merges_products(make_gateway, access_token):
+    """Test that the order is returned with the product of every item"""
+    lookups = []
+    handler = order_and_products()
+
+    def recording_handler(request):
+        if request.url.path == "/products/list":
+            lookups.append(request.url.params["name"])
+        return handler(request)
+
+    with make_gateway(recording_handler) as client:
+        response = client.get(
+            f"/orders/{ORDER_ID}/details",
+            headers={"Authorization": f"Bearer {access_token}"}
+        )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [item["product"]["sku"] for item in data["items"]] == ["PAP-A4", "STA-01", "PAP-A4"]
+    assert data["partial"] is False
+    assert data["errors"] == []
+    # Each distinct product is looked up once
+    assert sorted(lookups) == ["Paper A4", "Stapler"]
+    assert "orders;dur=" in response.headers["server-timing"]
+    assert "products;dur=" in response.headers["server-timing"]
+
+
+def test_order_details_degrades_on_product_failure(make_gateway, access_token):
+    """Test that a failed product lookup leaves the item without product data"""
+    with make_gateway(order_and_products(failing={"Stapler"})) as client:
+        response = client.get(
+            f"/orders/{ORDER_ID}/details",
+            headers={"Authorization": f"Bearer {access_token}"}
+        )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["items"][0]["product"]["sku"] == "PAP-A4"
+    assert data["items"][1]["product"] is None
+    assert data["partial"] is True
+    assert data["errors"][0]["product_name"] == "Stapler"
+
+
+def test_order_details_degrades_on_slow_product(make_gateway, access_token, monkeypatch):
+    """Test that a product lookup exceeding its time limit is reported as partial"""
+    monkeypatch.setattr(config, "AGGREGATION_TIMEOUT", 0.05)
+    handler = order_and_products()
+
+    async def slow_handler(request):
+        if request.url.path == "/products/list" and request.url.params["name"] == "Stapler":
+            await asyncio.sleep(0.5)
+        return handler(request)
+
+    with make_gateway(slow_handler) as client:
+        response = client.get(
+            f"/orders/{ORDER_ID}/details",
+            headers={"Authorization": f"Bearer {access_token}"}
+        )
+
+    data = response.json()
+    assert response.status_code == 200
+    assert data["items"][1]["product"] is None
+    assert data["errors"][0]["detail"].startswith("Timed out")
+
+
+def test_order_details_relays_order_errors(make_gateway, access_token):
+    """Test that a missing order is relayed without product lookups"""
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        return upstream_response(404, json={"detail": "Order not found"})
+
+    with make_gateway(handler) as client:
+        response = client.get(
+            f"/orders/{ORDER_ID}/details",
+            headers={"Authorization": f"Bearer {access_token}"}
+        )
+
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Order not found"}
+    assert calls == [f"/orders/{ORDER_ID}"]
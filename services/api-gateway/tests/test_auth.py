@@ -5,7 +5,10 @@ import os
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-from app.auth import decode_token, get_current_user
+import time
+from unittest.mock import patch
+
+from app.auth import TokenCache, decode_token, get_current_user, token_cache
 from app.config import config
 from fastapi import HTTPException
 from fastapi.security import HTTPAuthorizationCredentials
@@ -80,3 +83,61 @@ def test_get_current_user_refresh_token():
     
     assert exc_info.value.status_code == 401
     assert "Invalid token type" in exc_info.value.detail
+
+
+def test_decode_token_uses_cache():
+    """Test that a repeated token is verified only once"""
+    token_cache.clear()
+    payload = {"sub": "cached-user", "type": "access", "exp": int(time.time()) + 60}
+    token = jwt.encode(payload, config.JWT_SECRET, algorithm=config.ALGORITHM)
+
+    with patch("app.auth.jwt.decode", wraps=jwt.decode) as decode:
+        for _ in range(5):
+            assert decode_token(token)["sub"] == "cached-user"
+
+    assert decode.call_count == 1
+    assert token_cache.hits == 4
+    assert token_cache.misses == 1
+
+
+def test_cached_claims_cannot_be_mutated_by_callers():
+    """Test that callers get a copy of the cached claims"""
+    token_cache.clear()
+    token = jwt.encode({"sub": "1", "type": "access"}, config.JWT_SECRET, algorithm=config.ALGORITHM)
+
+    decode_token(token)["sub"] = "tampered"
+
+    assert decode_token(token)["sub"] == "1"
+
+
+def test_token_cache_evicts_at_exp():
+    """Test that cached claims are dropped once the token expires"""
+    cache = TokenCache(max_size=10, max_ttl=900)
+    cache.put("token", {"sub": "1", "exp": time.time() - 1})
+
+    assert cache.get("token") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_token_cache_is_bounded_lru():
+    """Test that the least recently used entry is evicted first"""
+    cache = TokenCache(max_size=2, max_ttl=900)
+    cache.put("a", {"sub": "a"})
+    cache.put("b", {"sub": "b"})
+    cache.get("a")
+    cache.put("c", {"sub": "c"})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"sub": "a"}
+    assert cache.get("c") == {"sub": "c"}
+
+
+def test_invalid_token_is_not_cached():
+    """Test that failed verifications are never cached"""
+    token_cache.clear()
+
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            decode_token("invalid.token.here")
+
+    assert token_cache.stats()["size"] == 0
@@ -0,0 +1,149 @@
+import json
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from conftest import upstream_response
+from app.balancer import (
+    Replica,
+    ReplicaFileWatcher,
+    ReplicaSet,
+    least_outstanding,
+    parse_replica_urls,
+    power_of_two_choices,
+)
+from app.config import config
+from app.health import HealthMonitor
+from app.main import create_app
+from app.upstream import UpstreamRegistry
+
+
+def replicas(*outstanding):
+    result = []
+    for index, count in enumerate(outstanding):
+        replica = Replica(f"http://replica-{index}:8002", slow_start_seconds=30)
+        replica.outstanding = count
+        result.append(replica)
+    return result
+
+
+def test_parse_replica_urls():
+    """Test that replica lists accept comma-separated strings and lists"""
+    assert parse_replica_urls("http://a:8002, http://b:8002/") == ["http://a:8002", "http://b:8002"]
+    assert parse_replica_urls(["http://a:8002"]) == ["http://a:8002"]
+
+
+def test_least_outstanding_picks_the_idlest_replica():
+    """Test least-outstanding-requests selection"""
+    candidates = replicas(4, 1, 3)
+    assert least_outstanding(candidates, time.monotonic()) is candidates[1]
+
+
+def test_power_of_two_choices_never_picks_the_busiest():
+    """Test that P2C always returns the less loaded of its two draws"""
+    candidates = replicas(0, 1, 9)
+    picks = {power_of_two_choices(candidates, time.monotonic()).url.host for _ in range(100)}
+    assert "replica-2" not in picks
+
+
+def test_failing_replica_is_ejected_then_ramps_up():
+    """Test passive ejection after consecutive failures and the slow start after it"""
+    replica_set = ReplicaSet(
+        ["http://a:8002", "http://b:8002"],
+        strategy="least_outstanding",
+        ejection_failures=2,
+        ejection_seconds=30,
+        slow_start_seconds=10
+    )
+    bad, good = replica_set.replicas
+    replica_set.record_failure(bad)
+    replica_set.record_failure(bad)
+
+    assert all(replica_set.pick() is good for _ in range(20))
+
+    # Ejection over: the replica is back, at a fraction of its weight
+    bad.ejected_until = time.monotonic()
+    bad.ramp_started = time.monotonic() - 5
+    assert bad.is_available(time.monotonic())
+    assert bad.weight(time.monotonic()) == pytest.approx(0.5, abs=0.05)
+
+
+def test_all_replicas_ejected_falls_back_to_all():
+    """Test that a service with no available replica is still tried"""
+    replica_set = ReplicaSet(["http://a:8002"], ejection_failures=1)
+    replica_set.record_failure(replica_set.replicas[0])
+    assert replica_set.pick() is replica_set.replicas[0]
+
+
+def test_update_keeps_known_replicas():
+    """Test that reloading the replica list keeps the state of known replicas"""
+    replica_set = ReplicaSet(["http://a:8002", "http://b:8002"])
+    known = replica_set.replicas[0]
+    known.outstanding = 3
+
+    replica_set.update(["http://a:8002", "http://c:8002"])
+
+    assert replica_set.urls == ["http://a:8002", "http://c:8002"]
+    assert replica_set.replicas[0] is known
+    # Added replicas start with a slow start
+    assert replica_set.replicas[1].weight(time.monotonic()) < 1
+
+
+def test_gateway_spreads_calls_over_replicas(access_token, monkeypatch):
+    """Test that calls are balanced over the replicas with the right Host"""
+    monkeypatch.setattr(config, "ORDER_SERVICE_URL", "http://order-1:8002,http://order-2:8002")
+    hosts = []
+
+    def handler(request):
+        hosts.append(request.headers["host"])
+        return upstream_response(200, json=[])
+
+    app = create_app(upstream_transport=httpx.MockTransport(handler))
+    with TestClient(app) as client:
+        for _ in range(20):
+            client.get("/orders/abc", headers={"Authorization": f"Bearer {access_token}"})
+        health = client.get("/health").json()
+
+    assert set(hosts) == {"order-1:8002", "order-2:8002"}
+    assert [replica["url"] for replica in health["upstreams"]["orders"]["replicas"]] == [
+        "http://order-1:8002", "http://order-2:8002"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_replica_failing_probes_is_taken_out():
+    """Test health-aware ejection: a replica failing its probes gets no traffic"""
+    def handler(request):
+        if request.url.host == "order-2":
+            raise httpx.ConnectError("connection refused")
+        return upstream_response(200, json={})
+
+    upstreams = UpstreamRegistry(
+        urls={"orders": ["http://order-1:8002", "http://order-2:8002"]},
+        transport=httpx.MockTransport(handler)
+    )
+    monitor = HealthMonitor(upstreams, interval=60, timeout=1, failure_threshold=1, alpha=0.5)
+    await monitor.probe_all()
+
+    assert monitor.status("orders") == "up"
+    assert all(upstreams.replicas["orders"].pick().url.host == "order-1" for _ in range(20))
+
+
+def test_replica_file_is_reloaded(tmp_path):
+    """Test that replica list changes in the watched file are applied"""
+    path = tmp_path / "replicas.json"
+    upstreams = UpstreamRegistry(urls={"orders": "http://order-1:8002"})
+    watcher = ReplicaFileWatcher(upstreams, str(path), interval=60)
+
+    path.write_text(json.dumps({"orders": ["http://order-1:8002", "http://order-2:8002"]}))
+    assert watcher.reload_if_changed()
+    assert upstreams.urls["orders"] == ["http://order-1:8002", "http://order-2:8002"]
+    # Unchanged file: nothing to do
+    assert not watcher.reload_if_changed()
+
+    path.write_text("{not json")
+    watcher._mtime = None
+    assert not watcher.reload_if_changed()
+    assert upstreams.urls["orders"] == ["http://order-1:8002", "http://order-2:8002"]
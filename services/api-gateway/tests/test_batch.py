@@ -0,0 +1,103 @@
+import asyncio
+
+from conftest import upstream_response
+from app.config import config
+
+
+def test_batch_runs_sub_requests_in_order(make_gateway, access_token):
+    """Test that each sub-request gets its own status and body, in request order"""
+    seen = []
+
+    def handler(request):
+        seen.append((request.method, request.url.path, request.headers.get("x-user-id")))
+        if request.url.path == "/products/missing":
+            return upstream_response(404, json={"detail": "Product not found"})
+        if request.method == "POST":
+            return upstream_response(200, json={"id": "order-1", "status": "pending"})
+        return upstream_response(200, json={"path": request.url.path, "query": str(request.url.query, "ascii")})
+
+    with make_gateway(handler) as client:
+        response = client.post(
+            "/batch",
+            json={"requests": [
+                {"id": "a", "path": "/products/list?limit=5"},
+                {"id": "b", "path": "/products/missing"},
+                {"id": "c", "method": "POST", "path": "/orders/create", "body": {"items": []}},
+                {"id": "d", "path": "/auth/me"},
+            ]},
+            headers={"Authorization": f"Bearer {access_token}"}
+        )
+
+    assert response.status_code == 200
+    results = response.json()["responses"]
+    assert [result["id"] for result in results] == ["a", "b", "c", "d"]
+    assert [result["status"] for result in results] == [200, 404, 200, 404]
+    assert results[0]["body"] == {"path": "/products/list", "query": "limit=5"}
+    assert results[0]["headers"]["content-type"] == "application/json"
+    assert results[2]["body"]["id"] == "order-1"
+    # The auth service is not reachable through a batch
+    assert all(path != "/auth/me" for _, path, _ in seen)
+    assert all(user_id == "12345678-1234-5678-1234-567812345678" for _, _, user_id in seen)
+
+
+def test_batch_caps_concurrency(make_gateway, access_token, monkeypatch):
+    """Test that at most BATCH_CONCURRENCY sub-requests are in flight at once"""
+    monkeypatch.setattr(config, "BATCH_CONCURRENCY", 2)
+    in_flight = 0
+    peak = 0
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.02)
+        in_flight -= 1
+        return upstream_response(200, json={"id": request.url.path})
+
+    with make_gateway(handler) as client:
+        response = client.post(
+            "/batch",
+            json={"requests": [{"path": f"/products/p-{i}"} for i in range(6)]},
+            headers={"Authorization": f"Bearer {access_token}"}
+        )
+
+    assert response.status_code == 200
+    assert [result["status"] for result in response.json()["responses"]] == [200] * 6
+    assert peak == 2
+
+
+def test_batch_rejects_too_many_sub_requests(make_gateway, access_token, monkeypatch):
+    """Test that batches above BATCH_MAX_REQUESTS are rejected"""
+    monkeypatch.setattr(config, "BATCH_MAX_REQUESTS", 2)
+
+    with make_gateway(lambda request: upstream_response(200, json={})) as client:
+        response = client.post(
+            "/batch",
+            json={"requests": [{"path": "/orders"}] * 3},
+            headers={"Authorization": f"Bearer {access_token}"}
+        )
+
+    assert response.status_code == 400
+
+
+def test_batch_reports_unavailable_upstream_per_item(make_gateway, access_token):
+    """Test that a failing upstream only fails its own sub-requests"""
+    def handler(request):
+        if request.url.path.startswith("/orders"):
+            return upstream_response(503, json={"detail": "down"})
+        return upstream_response(200, json=[])
+
+    with make_gateway(handler) as client:
+        response = client.post(
+            "/batch",
+            json={"requests": [{"path": "/orders/me"}, {"path": "/products/list"}]},
+            headers={"Authorization": f"Bearer {access_token}"}
+        )
+
+    assert [result["status"] for result in response.json()["responses"]] == [503, 200]
+
+
+def test_batch_requires_authentication(client):
+    """Test that the batch endpoint requires a token"""
+    response = client.post("/batch", json={"requests": [{"path": "/orders"}]})
+    assert response.status_code in [401, 403]
@@ -0,0 +1,35 @@
+import json
+import os
+import sys
+
+import pytest
+
+from app.config import config
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+import bench_gateway  # noqa: E402
+
+
+@pytest.mark.asyncio
+async def test_benchmark_writes_comparable_results(tmp_path, monkeypatch):
+    """Test a short benchmark run: every scenario succeeds and the JSON can be compared"""
+    monkeypatch.setattr(config, "RATE_LIMIT_ENABLED", config.RATE_LIMIT_ENABLED)
+    monkeypatch.setattr(config, "HEALTH_CHECK_ENABLED", config.HEALTH_CHECK_ENABLED)
+    output = tmp_path / "results.json"
+
+    results = await bench_gateway.main([
+        "--duration", "0.2", "--concurrency", "4", "--warmup", "4", "--memory-requests", "4",
+        "--latency-ms", "0", "--large-bytes", "65536", "--fan-out", "3", "--output", str(output),
+    ])
+
+    assert json.loads(output.read_text()) == results
+    for name, result in results["scenarios"].items():
+        assert result["requests"] > 0 and result["errors"] == 0, name
+        assert result["latency_ms"]["p50"] <= result["latency_ms"]["p99"]
+    # The details route fans out to the product lookups (per request: the runs are timed)
+    calls_per_request = {
+        name: result["upstream_calls"] / result["requests"] for name, result in results["scenarios"].items()
+    }
+    assert calls_per_request["fan_out_details"] > calls_per_request["jwt_cached"]
+    assert len(bench_gateway.compare(results, results)) == len(results["scenarios"]) + 1
@@ -0,0 +1,171 @@
+import time
+
+from conftest import upstream_response
+from app.cache import CacheEntry, ResponseCache, etag_matches, parse_route_ttls
+
+
+def test_parse_route_ttls_longest_prefix_first():
+    """Test that the most specific route prefix is matched first"""
+    ttls = parse_route_ttls("/products/=60,/products/list=30")
+
+    assert ttls[0] == ("/products/list", 30.0)
+    cache = ResponseCache(max_bytes=1024, route_ttls=ttls)
+    assert cache.ttl_for("/products/list") == 30.0
+    assert cache.ttl_for("/products/abc") == 60.0
+    assert cache.ttl_for("/orders") is None
+
+
+def test_etag_matches_weak_comparison():
+    """Test If-None-Match comparison"""
+    assert etag_matches('W/"abc"', '"abc"')
+    assert etag_matches('"x", W/"abc"', 'W/"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"other"', '"abc"')
+    assert not etag_matches(None, '"abc"')
+
+
+def test_response_cache_memory_budget_evicts_lru():
+    """Test that the cache stays within its memory budget"""
+    cache = ResponseCache(max_bytes=250, route_ttls=[])
+
+    def entry(size):
+        return CacheEntry(b"x" * size, 200, {}, '"e"', False, time.monotonic() + 60)
+
+    cache.put("a", entry(100))
+    cache.put("b", entry(100))
+    cache.get("a")
+    cache.put("c", entry(100))
+    cache.put("too-big", entry(1000))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.get("too-big") is None
+    assert cache.size <= 250
+
+
+def test_catalog_read_is_served_from_cache(make_gateway, access_token):
+    """Test that a repeated catalog read is answered without an upstream call"""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return upstream_response(200, json=[{"id": "1", "name": "Paper"}])
+
+    headers = {"Authorization": f"Bearer {access_token}"}
+    with make_gateway(handler) as client:
+        first = client.get("/products/list", headers=headers)
+        second = client.get("/products/list", headers=headers)
+
+    assert first.status_code == 200
+    assert first.headers["x-cache"] == "MISS"
+    assert second.headers["x-cache"] == "HIT"
+    assert second.json() == [{"id": "1", "name": "Paper"}]
+    assert second.headers["etag"] == first.headers["etag"]
+    assert len(calls) == 1
+
+
+def test_cached_read_still_requires_authentication(make_gateway, access_token):
+    """Test that cached catalog pages are never served anonymously"""
+    def handler(request):
+        return upstream_response(200, json=[])
+
+    with make_gateway(handler) as client:
+        client.get("/products/list", headers={"Authorization": f"Bearer {access_token}"})
+        response = client.get("/products/list")
+
+    assert response.status_code == 401
+
+
+def test_client_etag_match_returns_304(make_gateway, access_token):
+    """Test that clients holding the current ETag get 304 Not Modified"""
+    def handler(request):
+        return upstream_response(200, json={"id": "1"})
+
+    headers = {"Authorization": f"Bearer {access_token}"}
+    with make_gateway(handler) as client:
+        etag = client.get("/products/1", headers=headers).headers["etag"]
+        response = client.get("/products/1", headers={**headers, "If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+
+def test_stale_entry_is_revalidated_with_upstream_etag(make_gateway, access_token):
+    """Test that stale entries are revalidated with If-None-Match"""
+    seen = []
+
+    def handler(request):
+        seen.append(request.headers.get("if-none-match"))
+        if request.headers.get("if-none-match") == '"v1"':
+            return upstream_response(304, headers={"ETag": '"v1"'})
+        return upstream_response(200, json={"id": "1"}, headers={"ETag": '"v1"'})
+
+    headers = {"Authorization": f"Bearer {access_token}"}
+    with make_gateway(handler) as client:
+        client.get("/products/1", headers=headers)
+        for entry in client.app.state.response_cache._entries.values():
+            entry.expires_at = 0
+        response = client.get("/products/1", headers=headers)
+
+    assert seen == [None, '"v1"']
+    assert response.status_code == 200
+    assert response.headers["x-cache"] == "REVALIDATED"
+    assert response.json() == {"id": "1"}
+
+
+def test_write_invalidates_catalog_cache(make_gateway, access_token):
+    """Test that product writes through the gateway drop cached reads"""
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        return upstream_response(200, json={"id": "1"})
+
+    headers = {"Authorization": f"Bearer {access_token}"}
+    with make_gateway(handler) as client:
+        client.get("/products/list", headers=headers)
+        client.put("/products/1", json={"name": "New"}, headers=headers)
+        response = client.get("/products/list", headers=headers)
+
+    assert response.headers["x-cache"] == "MISS"
+    assert calls == ["GET", "PUT", "GET"]
+
+
+def test_failed_write_keeps_catalog_cache(make_gateway, access_token):
+    """Test that a write rejected by the product service doesn't drop cached reads"""
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        if request.method == "PUT":
+            return upstream_response(400, json={"detail": "Invalid product"})
+        return upstream_response(200, json={"id": "1"})
+
+    headers = {"Authorization": f"Bearer {access_token}"}
+    with make_gateway(handler) as client:
+        client.get("/products/list", headers=headers)
+        write = client.put("/products/1", json={"name": "New"}, headers=headers)
+        response = client.get("/products/list", headers=headers)
+
+    assert write.status_code == 400
+    assert response.headers["x-cache"] == "HIT"
+    assert calls == ["GET", "PUT"]
+
+
+def test_non_cacheable_responses_are_not_stored(make_gateway, access_token):
+    """Test that errors and no-store responses bypass the cache"""
+    def handler(request):
+        if request.url.path == "/products/missing":
+            return upstream_response(404, json={"detail": "Product not found"})
+        return upstream_response(200, json=[], headers={"Cache-Control": "no-store"})
+
+    headers = {"Authorization": f"Bearer {access_token}"}
+    with make_gateway(handler) as client:
+        missing = client.get("/products/missing", headers=headers)
+        client.get("/products/list", headers=headers)
+        stats = client.app.state.response_cache.stats()
+
+    assert missing.status_code == 404
+    assert stats["entries"] == 0
@@ -0,0 +1,95 @@
+import asyncio
+
+import httpx
+import pytest
+from jose import jwt
+
+from conftest import upstream_response
+from app.coalesce import SingleFlight
+from app.config import config
+from app.main import create_app
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_one_call():
+    """Test that concurrent callers with the same key share one call"""
+    flight = SingleFlight()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "result"
+
+    results = await asyncio.gather(*[flight.do("key", fetch) for _ in range(10)])
+
+    assert results == ["result"] * 10
+    assert calls == 1
+    assert flight.stats() == {"in_flight": 0, "upstream_calls": 1, "saved_calls": 9}
+
+
+@pytest.mark.asyncio
+async def test_single_flight_propagates_errors_and_forgets_key():
+    """Test that a failed call is shared and then retried by the next caller"""
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(flight.do("key", fail), flight.do("key", fail), return_exceptions=True)
+
+    async def succeed():
+        return "ok"
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert await flight.do("key", succeed) == "ok"
+    assert flight.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_gets_are_coalesced(access_token):
+    """Test that identical concurrent GETs reach the upstream once"""
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        await asyncio.sleep(0.05)
+        return upstream_response(200, json=[{"id": "order-1"}])
+
+    app = create_app(upstream_transport=httpx.MockTransport(handler))
+    transport = httpx.ASGITransport(app=app)
+    headers = {"Authorization": f"Bearer {access_token}"}
+    async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as client:
+        responses = await asyncio.gather(*[client.get("/orders", headers=headers) for _ in range(20)])
+
+    assert all(response.status_code == 200 for response in responses)
+    assert all(response.json() == [{"id": "order-1"}] for response in responses)
+    assert len(calls) == 1
+    assert app.state.single_flight.coalesced == 19
+
+
+@pytest.mark.asyncio
+async def test_different_users_are_not_coalesced(access_token):
+    """Test that user-scoped reads of different users are not shared"""
+    other_token = jwt.encode(
+        {"sub": "other-user", "role": "staff", "department_id": "2", "type": "access"},
+        config.JWT_SECRET, algorithm=config.ALGORITHM
+    )
+    calls = []
+
+    async def handler(request):
+        calls.append(request.headers["X-User-ID"])
+        await asyncio.sleep(0.05)
+        return upstream_response(200, json=[])
+
+    app = create_app(upstream_transport=httpx.MockTransport(handler))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as client:
+        await asyncio.gather(
+            client.get("/orders/me", headers={"Authorization": f"Bearer {access_token}"}),
+            client.get("/orders/me", headers={"Authorization": f"Bearer {other_token}"})
+        )
+
+    assert sorted(calls) == sorted(["12345678-1234-5678-1234-567812345678", "other-user"])
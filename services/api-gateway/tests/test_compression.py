@@ -0,0 +1,168 @@
+import gzip
+
+import httpx
+import pytest
+
+from conftest import upstream_response
+from app.compression import negotiate_encoding
+
+LARGE_LIST = [{"id": i, "product_name": "Paper A4", "quantity": 5} for i in range(200)]
+
+
+def test_negotiate_encoding_prefers_server_order():
+    """Test Accept-Encoding negotiation with q-values"""
+    supported = ["zstd", "br", "gzip"]
+
+    assert negotiate_encoding("gzip, br", supported) == "br"
+    assert negotiate_encoding("gzip, br;q=0, zstd;q=0", supported) == "gzip"
+    assert negotiate_encoding("*", supported) == "zstd"
+    assert negotiate_encoding("identity", supported) is None
+    assert negotiate_encoding("", supported) is None
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br", "zstd"])
+def test_large_json_is_compressed(make_gateway, access_token, encoding):
+    """Test that large JSON lists are compressed with the negotiated encoding"""
+    def handler(request):
+        return upstream_response(200, json=LARGE_LIST)
+
+    with make_gateway(handler) as client:
+        response = client.get(
+            "/orders",
+            headers={"Authorization": f"Bearer {access_token}", "Accept-Encoding": encoding}
+        )
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == encoding
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) < len(httpx.Response(200, json=LARGE_LIST).content)
+    # httpx decodes the body transparently
+    assert response.json() == LARGE_LIST
+
+
+def test_streamed_body_is_compressed_incrementally(make_gateway, access_token):
+    """Test that streamed upstream bodies are compressed without a length"""
+    class ChunkedStream(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            for i in range(50):
+                yield b'{"id": %d, "name": "Paper A4"},' % i
+
+    def handler(request):
+        return httpx.Response(200, headers={"Content-Type": "application/json"}, stream=ChunkedStream())
+
+    with make_gateway(handler) as client:
+        with client.stream(
+            "GET", "/orders/export",
+            headers={"Authorization": f"Bearer {access_token}", "Accept-Encoding": "gzip"}
+        ) as response:
+            raw = b"".join(response.iter_raw())
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert gzip.decompress(raw).startswith(b'{"id": 0,')
+
+
+def test_small_body_is_not_compressed(make_gateway, access_token):
+    """Test the minimum size threshold"""
+    def handler(request):
+        return upstream_response(200, json={"id": "1"})
+
+    with make_gateway(handler) as client:
+        response = client.get(
+            "/orders/me",
+            headers={"Authorization": f"Bearer {access_token}", "Accept-Encoding": "gzip"}
+        )
+
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"id": "1"}
+    # The same URL is compressed when its body grows
+    assert "Accept-Encoding" in response.headers["vary"]
+
+
+def test_compressible_response_varies_without_accept_encoding(make_gateway, access_token):
+    """Test that an uncompressed response still varies on Accept-Encoding"""
+    def handler(request):
+        return upstream_response(200, json=LARGE_LIST, headers={"Vary": "Authorization"})
+
+    with make_gateway(handler) as client:
+        response = client.get(
+            "/orders",
+            headers={"Authorization": f"Bearer {access_token}", "Accept-Encoding": "identity"}
+        )
+
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Authorization, Accept-Encoding"
+
+
+def test_compressed_response_has_weak_etag(make_gateway, access_token):
+    """Test that the strong ETag of the upstream body is weakened once re-encoded"""
+    def handler(request):
+        return upstream_response(200, json=LARGE_LIST, headers={"ETag": '"v1"'})
+
+    with make_gateway(handler) as client:
+        compressed = client.get(
+            "/orders",
+            headers={"Authorization": f"Bearer {access_token}", "Accept-Encoding": "gzip"}
+        )
+        identity = client.get(
+            "/orders",
+            headers={"Authorization": f"Bearer {access_token}", "Accept-Encoding": "identity"}
+        )
+
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["etag"] == 'W/"v1"'
+    assert identity.headers["etag"] == '"v1"'
+
+
+def test_cached_304_repeats_the_etag_of_the_compressed_200(make_gateway, access_token):
+    """Test that a cached 304 carries the same ETag as the gzip 200 it validates"""
+    def handler(request):
+        return upstream_response(200, json=LARGE_LIST, headers={"ETag": '"v1"'})
+
+    headers = {"Authorization": f"Bearer {access_token}", "Accept-Encoding": "gzip"}
+    with make_gateway(handler) as client:
+        compressed = client.get("/products/list", headers=headers)
+        etag = compressed.headers["etag"]
+        not_modified = client.get("/products/list", headers={**headers, "If-None-Match": etag})
+
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == etag
+
+
+def test_upstream_encoded_body_is_passed_through(make_gateway, access_token):
+    """Test that bodies the upstream already compressed are not recompressed"""
+    body = gzip.compress(httpx.Response(200, json=LARGE_LIST).content)
+
+    def handler(request):
+        return upstream_response(
+            200, content=body,
+            headers={"Content-Type": "application/json", "Content-Encoding": "gzip"}
+        )
+
+    with make_gateway(handler) as client:
+        with client.stream(
+            "GET", "/orders/export",
+            headers={"Authorization": f"Bearer {access_token}", "Accept-Encoding": "br, gzip"}
+        ) as response:
+            raw = b"".join(response.iter_raw())
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert raw == body
+
+
+def test_event_stream_is_not_compressed(make_gateway, access_token):
+    """Test that server-sent events are never buffered by the compressor"""
+    def handler(request):
+        return upstream_response(
+            200, content=b"data: x\n\n" * 500,
+            headers={"Content-Type": "text/event-stream"}
+        )
+
+    with make_gateway(handler) as client:
+        response = client.get(
+            "/orders/events",
+            headers={"Authorization": f"Bearer {access_token}", "Accept-Encoding": "gzip"}
+        )
+
+    assert "content-encoding" not in response.headers
@@ -0,0 +1,91 @@
+import asyncio
+
+import httpx
+import pytest
+
+from conftest import upstream_response
+from app.health import HealthMonitor
+from app.upstream import UpstreamRegistry
+
+
+def make_monitor(handler, failure_threshold=2):
+    upstreams = UpstreamRegistry(
+        urls={"orders": "http://orders", "products": "http://products"},
+        transport=httpx.MockTransport(handler)
+    )
+    return HealthMonitor(upstreams, interval=60, timeout=1, failure_threshold=failure_threshold, alpha=0.5)
+
+
+@pytest.mark.asyncio
+async def test_probes_track_latency_and_failures():
+    """Test that consecutive failed probes mark an upstream down until it recovers"""
+    orders_up = False
+
+    def handler(request):
+        if request.url.host == "orders" and not orders_up:
+            raise httpx.ConnectError("connection refused")
+        return upstream_response(200, json={"message": "Health check successful"})
+
+    monitor = make_monitor(handler)
+    assert monitor.stats()["orders"]["status"] == "unknown"
+
+    await monitor.probe_all()
+    assert not monitor.is_down("orders")
+    await monitor.probe_all()
+
+    orders = monitor.stats()["orders"]["replicas"]["http://orders"]
+    assert monitor.is_down("orders")
+    assert orders["consecutive_failures"] == 2
+    assert orders["last_error"].startswith("ConnectError")
+    assert monitor.stats()["products"]["status"] == "up"
+    assert monitor.stats()["products"]["replicas"]["http://products"]["latency_ewma_ms"] is not None
+
+    orders_up = True
+    await monitor.probe_all()
+    assert not monitor.is_down("orders")
+    assert monitor.stats()["orders"]["replicas"]["http://orders"]["consecutive_failures"] == 0
+
+
+@pytest.mark.asyncio
+async def test_monitor_runs_in_background():
+    """Test that the monitor probes on start and stops cleanly"""
+    probes = []
+
+    def handler(request):
+        probes.append(request.url.host)
+        return upstream_response(200, json={})
+
+    monitor = make_monitor(handler)
+    monitor.start()
+    for _ in range(20):
+        if len(probes) >= 2:
+            break
+        await asyncio.sleep(0.01)
+    await monitor.stop()
+
+    assert sorted(probes) == ["orders", "products"]
+
+
+def test_down_upstream_fails_fast(make_gateway, access_token):
+    """Test that calls to an upstream known to be down get 503 without being sent"""
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        return upstream_response(200, json=[])
+
+    with make_gateway(handler) as client:
+        state = client.app.state.health.state_for("orders", "http://localhost:8002")
+        for _ in range(state.failure_threshold):
+            state.record_failure("ConnectError: connection refused")
+
+        response = client.get("/orders/me", headers={"Authorization": f"Bearer {access_token}"})
+        products = client.get("/products/abc", headers={"Authorization": f"Bearer {access_token}"})
+        health = client.get("/health").json()
+
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+    assert products.status_code == 200
+    assert calls == ["/products/abc"]
+    assert health["status"] == "degraded"
+    assert health["upstreams"]["orders"]["health"]["status"] == "down"
@@ -0,0 +1,103 @@
+import re
+
+import pytest
+
+from conftest import upstream_response
+from app.metrics import Histogram
+from app.upstream import UpstreamRegistry
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Test the Prometheus text format of a histogram"""
+    histogram = Histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(3.0, "/a")
+
+    lines = histogram.render()
+
+    assert lines[:2] == ["# HELP latency_seconds Latency", "# TYPE latency_seconds histogram"]
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'latency_seconds_sum{route="/a"} 3.55' in lines
+    assert 'latency_seconds_count{route="/a"} 3' in lines
+
+
+def test_metrics_endpoint_reports_routes_and_upstreams(make_gateway, access_token):
+    """Test that requests are counted per route template and upstream"""
+    def handler(request):
+        return upstream_response(200, json=[])
+
+    with make_gateway(handler) as client:
+        client.get("/products/list", headers={"Authorization": f"Bearer {access_token}"})
+        client.get("/products/abc", headers={"Authorization": f"Bearer {access_token}"})
+        client.get("/does-not-exist")
+        response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/products/{path:path}",status="200"} 2' in body
+    assert 'http_requests_total{method="GET",route="unmatched",status="404"} 1' in body
+    assert 'http_request_duration_seconds_count{method="GET",route="/products/{path:path}"} 2' in body
+    assert 'upstream_request_duration_seconds_count{service="products",status="200"} 2' in body
+    # The scrape itself is in flight
+    assert "http_requests_in_flight 1" in body
+
+
+def sample(body: str, series: str) -> float:
+    match = re.search(rf"^{re.escape(series)} (\S+)$", body, re.MULTILINE)
+    assert match, f"{series} missing from /metrics"
+    return float(match.group(1))
+
+
+def scrape_after_two_gets(make_gateway, access_token) -> str:
+    def handler(request):
+        return upstream_response(200, json=[])
+
+    with make_gateway(handler) as client:
+        for _ in range(2):
+            client.get("/products/list", headers={"Authorization": f"Bearer {access_token}"})
+        return client.get("/metrics").text
+
+
+def test_metrics_endpoint_reports_jwt_cache(make_gateway, access_token):
+    """Test that the JWT cache hits and entries are exposed"""
+    body = scrape_after_two_gets(make_gateway, access_token)
+
+    assert sample(body, 'jwt_cache_lookups_total{result="hit"}') >= 1
+    assert sample(body, "jwt_cache_entries") >= 1
+    assert "# TYPE jwt_cache_lookups_total counter" in body
+
+
+def test_metrics_endpoint_reports_response_cache_and_coalescing(make_gateway, access_token):
+    """Test that the response cache and coalesced GET counters are exposed"""
+    body = scrape_after_two_gets(make_gateway, access_token)
+
+    assert sample(body, 'response_cache_lookups_total{result="miss"}') == 1
+    assert sample(body, 'response_cache_lookups_total{result="hit"}') == 1
+    assert sample(body, "response_cache_entries") == 1
+    assert sample(body, 'coalesced_requests_total{result="upstream"}') == 1
+    assert sample(body, 'coalesced_requests_total{result="coalesced"}') == 0
+
+
+def test_metrics_endpoint_reports_rate_limits_and_retries(make_gateway, access_token):
+    """Test that the rate limiter decisions and the retry counters are exposed"""
+    body = scrape_after_two_gets(make_gateway, access_token)
+
+    assert sample(body, 'rate_limit_decisions_total{decision="allowed"}') == 2
+    assert sample(body, 'rate_limit_decisions_total{decision="denied"}') == 0
+    assert sample(body, "upstream_retries_total") == 0
+    assert sample(body, 'upstream_hedged_requests_total{result="sent"}') == 0
+
+
+@pytest.mark.asyncio
+async def test_pool_stats_reads_the_connection_pools():
+    """Test that the pooled clients report their connections"""
+    upstreams = UpstreamRegistry(urls={"orders": "http://orders"})
+    await upstreams.startup()
+    try:
+        assert upstreams.pool_stats() == {"orders": {"active": 0, "idle": 0, "queued": 0}}
+    finally:
+        await upstreams.shutdown()
@@ -0,0 +1,174 @@
+import httpx
+
+from conftest import upstream_response
+
+
+def test_forward_request_uses_upstream_base_url(make_gateway, access_token):
+    """Test that requests are routed to the configured upstream with user headers"""
+    seen = []
+
+    def handler(request: httpx.Request):
+        seen.append(request)
+        return upstream_response(200, json={"ok": True})
+
+    with make_gateway(handler) as client:
+        response = client.get(
+            "/orders/me",
+            params={"status": "pending"},
+            headers={"Authorization": f"Bearer {access_token}"}
+        )
+
+    assert response.status_code == 200
+    assert response.json() == {"ok": True}
+    assert seen[0].url.path == "/orders/me"
+    assert seen[0].url.params["status"] == "pending"
+    assert seen[0].headers["X-User-ID"] == "12345678-1234-5678-1234-567812345678"
+    assert seen[0].headers["X-User-Department"] == "1"
+
+
+def test_upstream_client_is_reused_across_requests(make_gateway, access_token):
+    """Test that one pooled client per upstream serves every request"""
+    def handler(request: httpx.Request):
+        return upstream_response(200, json=[])
+
+    with make_gateway(handler) as client:
+        upstreams = client.app.state.upstreams
+        first = upstreams.get_client("orders")
+        client.get("/orders", headers={"Authorization": f"Bearer {access_token}"})
+        client.get("/orders", headers={"Authorization": f"Bearer {access_token}"})
+
+        assert upstreams.get_client("orders") is first
+        assert upstreams.get_client("products") is not first
+
+    # Lifespan shutdown closes the pooled clients
+    assert first.is_closed
+
+
+def test_request_body_is_streamed_upstream(make_gateway, access_token):
+    """Test that the client body reaches the upstream unchanged"""
+    payload = b"x" * (1024 * 1024)
+    received = {}
+
+    def handler(request: httpx.Request):
+        received["body"] = request.content
+        received["headers"] = request.headers
+        return upstream_response(201, json={"size": len(request.content)})
+
+    with make_gateway(handler) as client:
+        response = client.post(
+            "/orders/create",
+            content=payload,
+            headers={
+                "Authorization": f"Bearer {access_token}",
+                "Content-Type": "application/octet-stream"
+            }
+        )
+
+    assert response.status_code == 201
+    assert response.json() == {"size": len(payload)}
+    assert received["body"] == payload
+
+
+def test_response_is_streamed_back_in_chunks(make_gateway, access_token):
+    """Test that the upstream response is relayed chunk by chunk"""
+    chunks = [b"[", b'{"id": 1},' * 1000, b'{"id": 2}', b"]"]
+
+    class ChunkedStream(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            for chunk in chunks:
+                yield chunk
+
+    def handler(request: httpx.Request):
+        return httpx.Response(
+            200,
+            headers={"Content-Type": "application/json"},
+            stream=ChunkedStream()
+        )
+
+    with make_gateway(handler) as client:
+        with client.stream(
+            "GET", "/products/list",
+            headers={"Authorization": f"Bearer {access_token}"}
+        ) as response:
+            body = b"".join(response.iter_bytes())
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert body == b"".join(chunks)
+
+
+def test_hop_by_hop_headers_are_stripped(make_gateway, access_token):
+    """Test that connection-scoped headers are not forwarded in either direction"""
+    received = {}
+
+    def handler(request: httpx.Request):
+        received["headers"] = request.headers
+        return upstream_response(
+            200,
+            headers={"Connection": "close, X-Internal", "X-Internal": "1", "Keep-Alive": "timeout=5"},
+            json={}
+        )
+
+    with make_gateway(handler) as client:
+        response = client.get(
+            "/orders",
+            headers={
+                "Authorization": f"Bearer {access_token}",
+                "Connection": "keep-alive, X-Client-Hop",
+                "X-Client-Hop": "1",
+                "Proxy-Authorization": "Basic abc"
+            }
+        )
+
+    assert response.status_code == 200
+    assert "x-client-hop" not in received["headers"]
+    assert "proxy-authorization" not in received["headers"]
+    assert "host" not in received["headers"] or received["headers"]["host"] != "testserver"
+    assert "x-internal" not in response.headers
+    assert "keep-alive" not in response.headers
+
+
+def test_client_supplied_user_headers_are_replaced(make_gateway, access_token):
+    """Test that clients cannot spoof the user context headers"""
+    seen = []
+
+    def handler(request: httpx.Request):
+        seen.append(request.headers.get_list("X-User-Role"))
+        return upstream_response(200, json={})
+
+    with make_gateway(handler) as client:
+        client.get(
+            "/orders/me",
+            headers={"Authorization": f"Bearer {access_token}", "X-User-Role": "admin"}
+        )
+        client.post("/auth/login", json={}, headers={"X-User-Role": "admin"})
+
+    assert seen == [["staff"], []]
+
+
+def test_event_stream_is_relayed_outside_the_bulkhead(make_gateway, access_token):
+    """Test that SSE streams are passed through as-is, on the stream client, without a deadline"""
+    seen = []
+    frames = b"retry: 3000\n\nevent: order.status_changed\ndata: {\"status\": \"approved\"}\n\n"
+
+    def handler(request):
+        seen.append(request)
+        return upstream_response(200, content=frames, headers={"Content-Type": "text/event-stream"})
+
+    with make_gateway(handler) as client:
+        response = client.get(
+            "/orders/events?scope=me",
+            headers={"Authorization": f"Bearer {access_token}", "Accept-Encoding": "gzip"}
+        )
+        upstreams = client.app.state.upstreams
+        stream_clients = set(upstreams._stream_clients)
+        bulkhead = upstreams.bulkheads["orders"].stats()
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert "content-encoding" not in response.headers
+    assert response.content == frames
+    assert seen[0].url.params["scope"] == "me"
+    assert "x-request-deadline" not in seen[0].headers
+    assert stream_clients == {"orders"}
+    assert bulkhead["in_flight"] == 0
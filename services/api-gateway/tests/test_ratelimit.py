@@ -0,0 +1,85 @@
+import pytest
+
+from conftest import upstream_response
+from app.ratelimit import BucketSpec, BucketStore, InMemoryBucketStore, RateLimiter, parse_rate_limits
+
+
+def test_parse_rate_limits():
+    """Test parsing of per-prefix user and department limits"""
+    rules = parse_rate_limits("/orders user=10/20 department=50/100; /orders/create user=1/2")
+
+    assert rules[0] == ("/orders/create", {"user": (1.0, 2)})
+    assert rules[1] == ("/orders", {"user": (10.0, 20), "department": (50.0, 100)})
+
+
+def test_parse_rate_limits_rejects_unknown_scope():
+    """Test that a typo in the limit scope is reported"""
+    with pytest.raises(ValueError):
+        parse_rate_limits("/orders tenant=1/1")
+
+
+def test_bucket_store_must_implement_acquire():
+    """Test that a store without acquire() fails when created, not on its first request"""
+    class IncompleteStore(BucketStore):
+        pass
+
+    with pytest.raises(TypeError):
+        IncompleteStore()
+
+
+def test_bucket_allows_burst_then_denies():
+    """Test that a bucket admits its burst and then runs dry"""
+    store = InMemoryBucketStore()
+    spec = BucketSpec("user:1", rate=0.001, burst=3)
+
+    results = [store.acquire([spec])[0] for _ in range(4)]
+
+    assert results == [True, True, True, False]
+
+
+def test_acquire_is_all_or_nothing():
+    """Test that a denied department bucket does not consume the user bucket"""
+    store = InMemoryBucketStore()
+    user = BucketSpec("user:1", rate=0.001, burst=5)
+    department = BucketSpec("department:1", rate=0.001, burst=1)
+
+    assert store.acquire([user, department])[0]
+    allowed, states = store.acquire([user, department])
+
+    assert not allowed
+    assert states[0].remaining == 4
+
+
+def test_limiter_keys_on_user_and_department():
+    """Test that users of one department share the department bucket"""
+    limiter = RateLimiter(InMemoryBucketStore(), parse_rate_limits("/orders user=0.001/5 department=0.001/2"))
+
+    assert limiter.check("/orders", {"sub": "a", "department_id": "1"})[0]
+    assert limiter.check("/orders", {"sub": "b", "department_id": "1"})[0]
+    assert not limiter.check("/orders", {"sub": "c", "department_id": "1"})[0]
+    assert limiter.check("/orders", {"sub": "c", "department_id": "2"})[0]
+    # Routes without a rule are not limited
+    assert limiter.check("/auth/login", {"sub": "c", "department_id": "1"}) == (True, None)
+
+
+def test_rate_limited_route_returns_429_with_headers(make_gateway, access_token):
+    """Test the RateLimit-* headers on allowed and denied requests"""
+    def handler(request):
+        return upstream_response(200, json=[])
+
+    headers = {"Authorization": f"Bearer {access_token}"}
+    with make_gateway(handler) as client:
+        client.app.state.rate_limiter.rules = parse_rate_limits("/orders user=0.001/2")
+        first = client.get("/orders/me", headers=headers)
+        second = client.get("/orders/me", headers=headers)
+        denied = client.get("/orders/me", headers=headers)
+        other_route = client.get("/products/list", headers=headers)
+
+    assert first.status_code == 200
+    assert first.headers["ratelimit-limit"] == "2"
+    assert first.headers["ratelimit-remaining"] == "1"
+    assert second.headers["ratelimit-remaining"] == "0"
+    assert denied.status_code == 429
+    assert denied.headers["ratelimit-remaining"] == "0"
+    assert int(denied.headers["retry-after"]) >= 1
+    assert other_route.status_code == 200
@@ -0,0 +1,134 @@
+import asyncio
+
+import httpx
+import pytest
+
+from conftest import upstream_response
+from app.main import create_app
+from app.resilience import CLOSED, HALF_OPEN, OPEN, Bulkhead, CircuitBreaker
+
+
+def make_breaker(**overrides):
+    settings = dict(
+        window_size=10,
+        min_calls=4,
+        failure_rate_threshold=0.5,
+        slow_call_seconds=1.0,
+        slow_call_rate_threshold=0.8,
+        open_seconds=30.0,
+        half_open_max_calls=1
+    )
+    settings.update(overrides)
+    return CircuitBreaker(**settings)
+
+
+def test_breaker_opens_on_error_rate():
+    """Test that the breaker opens once the failure rate crosses the threshold"""
+    breaker = make_breaker()
+    breaker.record_success(0.01)
+    breaker.record_success(0.01)
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+    assert breaker.retry_after() >= 1
+
+
+def test_breaker_opens_on_slow_calls():
+    """Test that the breaker opens when most calls are slow"""
+    breaker = make_breaker()
+    for _ in range(4):
+        breaker.record_success(2.0)
+
+    assert breaker.state == OPEN
+
+
+def test_breaker_half_open_probe_closes_or_reopens():
+    """Test the half-open state after the open period"""
+    breaker = make_breaker(open_seconds=0.0)
+    for _ in range(4):
+        breaker.record_failure()
+    assert breaker.state == OPEN
+
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    # Only one probe at a time
+    assert not breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    assert breaker.allow_request()
+    breaker.record_success(0.01)
+    assert breaker.state == CLOSED
+
+
+def test_bulkhead_rejects_when_saturated():
+    """Test that the bulkhead never admits more than its limit"""
+    bulkhead = Bulkhead(max_concurrency=2)
+
+    assert bulkhead.try_acquire()
+    assert bulkhead.try_acquire()
+    assert not bulkhead.try_acquire()
+    bulkhead.release()
+    assert bulkhead.try_acquire()
+    assert bulkhead.stats()["rejected"] == 1
+
+
+def test_open_breaker_fails_fast_with_retry_after(make_gateway, access_token):
+    """Test that an open breaker answers 503 without calling the upstream"""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return upstream_response(500, json={"detail": "boom"})
+
+    headers = {"Authorization": f"Bearer {access_token}"}
+    with make_gateway(handler) as client:
+        breaker = client.app.state.upstreams.breakers["orders"]
+        breaker.min_calls = 3
+        for _ in range(3):
+            assert client.post("/orders/create", json={}, headers=headers).status_code == 500
+
+        response = client.post("/orders/create", json={}, headers=headers)
+        health = client.get("/health").json()
+
+    assert response.status_code == 503
+    assert "circuit open" in response.json()["detail"]
+    assert int(response.headers["retry-after"]) >= 1
+    assert len(calls) == 3
+    assert health["upstreams"]["orders"]["circuit_breaker"]["state"] == "open"
+    assert health["upstreams"]["products"]["circuit_breaker"]["state"] == "closed"
+
+
+@pytest.mark.asyncio
+async def test_saturated_bulkhead_returns_503(access_token):
+    """Test that excess concurrent calls to one upstream are shed at once"""
+    release = asyncio.Event()
+
+    async def handler(request):
+        if request.url.path.startswith("/products"):
+            await release.wait()
+        return upstream_response(200, json={})
+
+    app = create_app(upstream_transport=httpx.MockTransport(handler))
+    app.state.upstreams.bulkheads["products"].max_concurrency = 1
+    transport = httpx.ASGITransport(app=app)
+    headers = {"Authorization": f"Bearer {access_token}"}
+    async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as client:
+        slow = asyncio.ensure_future(client.post("/products/create", json={}, headers=headers))
+        await asyncio.sleep(0.05)
+        shed = await client.post("/products/create", json={}, headers=headers)
+        # Other upstreams are not affected
+        other = await client.post("/orders/create", json={}, headers=headers)
+        release.set()
+        first = await slow
+
+    assert shed.status_code == 503
+    assert shed.headers["retry-after"] == "1"
+    assert first.status_code == 200
+    assert other.status_code == 200
+    assert app.state.upstreams.bulkheads["products"].in_flight == 0
@@ -0,0 +1,147 @@
+import asyncio
+
+import httpx
+import pytest
+
+from conftest import upstream_response
+from app.config import config
+from app.main import create_app
+from app.resilience import LatencyTracker, backoff_delay, route_key
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(config, "RETRY_BACKOFF_BASE", 0.0)
+
+
+def test_route_key_collapses_identifiers():
+    """Test that id segments share one latency route"""
+    assert route_key("products", "/products/12345678-1234-5678-1234-567812345678") == "products:/products/{id}"
+    assert route_key("products", "/products/list") == "products:/products/list"
+
+
+def test_backoff_delay_is_jittered_and_capped():
+    """Test full-jitter exponential backoff"""
+    delays = [backoff_delay(10) for _ in range(50)]
+
+    assert all(0 <= delay <= config.RETRY_BACKOFF_MAX for delay in delays)
+    assert len(set(delays)) > 1
+
+
+def test_latency_percentile_needs_samples():
+    """Test that no hedging delay is derived before enough samples"""
+    tracker = LatencyTracker()
+    assert tracker.percentile("route", 0.95, min_samples=2) is None
+
+    for ms in range(1, 101):
+        tracker.record("route", ms / 1000)
+
+    assert tracker.percentile("route", 0.95) == pytest.approx(0.096)
+
+
+def test_get_is_retried_on_connection_error(make_gateway, access_token, no_backoff):
+    """Test that idempotent GETs survive a transient connection error"""
+    attempts = []
+
+    def handler(request):
+        attempts.append(request)
+        if len(attempts) == 1:
+            raise httpx.ConnectError("connection refused")
+        return upstream_response(200, json={"id": "1"})
+
+    with make_gateway(handler) as client:
+        response = client.get("/products/1", headers={"Authorization": f"Bearer {access_token}"})
+        retries = client.app.state.retry_stats.retries
+
+    assert response.status_code == 200
+    assert len(attempts) == 2
+    assert retries == 1
+
+
+def test_retries_are_capped_by_budget(make_gateway, access_token, no_backoff, monkeypatch):
+    """Test that a down service is not hammered beyond the retry budget"""
+    monkeypatch.setattr(config, "UPSTREAM_RETRIES", 10)
+    monkeypatch.setattr(config, "RETRY_BUDGET", 2)
+    attempts = []
+
+    def handler(request):
+        attempts.append(request)
+        raise httpx.ConnectError("connection refused")
+
+    with make_gateway(handler) as client:
+        response = client.get("/orders/42", headers={"Authorization": f"Bearer {access_token}"})
+
+    assert response.status_code == 503
+    assert len(attempts) == 3
+
+
+def test_writes_are_never_retried(make_gateway, access_token, no_backoff):
+    """Test that non-idempotent requests get a single attempt"""
+    attempts = []
+
+    def handler(request):
+        attempts.append(request)
+        raise httpx.ConnectError("connection refused")
+
+    with make_gateway(handler) as client:
+        response = client.post("/orders/create", json={}, headers={"Authorization": f"Bearer {access_token}"})
+
+    assert response.status_code == 503
+    assert len(attempts) == 1
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_wins_over_slow_replica(access_token, monkeypatch):
+    """Test that a slow first attempt is hedged after the route p95"""
+    monkeypatch.setattr(config, "HEDGING_ENABLED", True)
+    monkeypatch.setattr(config, "HEDGE_MIN_SAMPLES", 1)
+    attempts = []
+
+    async def handler(request):
+        attempts.append(request)
+        if len(attempts) == 1:
+            await asyncio.sleep(1.0)
+            return upstream_response(200, json={"replica": "slow"})
+        return upstream_response(200, json={"replica": "fast"})
+
+    app = create_app(upstream_transport=httpx.MockTransport(handler))
+    app.state.latency.record("products:/products/{id}", 0.01)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as client:
+        response = await client.get(
+            "/products/12345678-1234-5678-1234-567812345678",
+            headers={"Authorization": f"Bearer {access_token}"}
+        )
+
+    assert response.json() == {"replica": "fast"}
+    assert len(attempts) == 2
+    assert app.state.retry_stats.hedges == 1
+    assert app.state.retry_stats.hedge_wins == 1
+    # The losing attempt released its bulkhead slot
+    await asyncio.sleep(0)
+    assert app.state.upstreams.bulkheads["products"].in_flight == 0
+
+
+def test_write_with_idempotency_key_is_retried(make_gateway, access_token, no_backoff):
+    """Test that only writes the service deduplicates are retried, body included"""
+    bodies = []
+
+    def handler(request):
+        bodies.append(request.content)
+        if len(bodies) % 2 == 1:
+            raise httpx.ConnectError("connection refused")
+        return upstream_response(200, json={"id": "1"})
+
+    payload = {"items": [{"product_name": "Paper A4", "quantity": 1}]}
+    headers = {"Authorization": f"Bearer {access_token}"}
+    with make_gateway(handler) as client:
+        retried = client.post("/orders/create", json=payload, headers={**headers, "Idempotency-Key": "k-1"})
+        attempts = len(bodies)
+        plain = client.post("/orders/create", json=payload, headers=headers)
+
+    assert retried.status_code == 200
+    assert attempts == 2
+    assert bodies[0] == bodies[1]
+    # Without a key the write is not retried
+    assert plain.status_code == 503
+    assert len(bodies) == 3
@@ -0,0 +1,91 @@
+import time
+
+import httpx
+import pytest
+
+from conftest import upstream_response
+from app.cache import parse_route_ttls
+from app.resilience import LatencyTracker
+from app.timeouts import TimeoutPolicy
+
+
+def make_policy(**kwargs):
+    return TimeoutPolicy(
+        LatencyTracker(),
+        route_timeouts=parse_route_ttls("/auth=5,/products=5,/products/list=8"),
+        default=30.0,
+        min_samples=10,
+        **kwargs
+    )
+
+
+def test_route_budget_uses_longest_prefix():
+    """Test per-route timeout budgets with the upstream timeout as fallback"""
+    policy = make_policy()
+    assert policy.timeout("products", "/products/list") == 8
+    assert policy.timeout("products", "/products/12") == 5
+    assert policy.timeout("orders", "/orders/me") == 30
+
+
+def test_adaptive_timeout_follows_observed_latency():
+    """Test that the budget shrinks to a multiple of the route percentile, within bounds"""
+    policy = make_policy(percentile=0.99, multiplier=3.0, minimum=0.5)
+    for _ in range(10):
+        policy.latency.record("products:/products/{id}", 0.4)
+        policy.latency.record("auth:/auth/login", 0.01)
+        policy.latency.record("products:/products/list", 10.0)
+
+    assert policy.timeout("products", "/products/12") == pytest.approx(1.2)
+    # Never below the floor, never above the configured budget
+    assert policy.timeout("auth", "/auth/login") == 0.5
+    assert policy.timeout("products", "/products/list") == 8
+
+
+def test_deadline_is_propagated_upstream(make_gateway, access_token):
+    """Test that the upstream gets the route deadline, or the earlier one of the client"""
+    seen = []
+
+    def handler(request):
+        seen.append((int(request.headers["x-request-deadline"]) / 1000, request.extensions["timeout"]["read"]))
+        return upstream_response(200, json={"id": "1"})
+
+    client_deadline = time.time() + 1
+    with make_gateway(handler) as client:
+        headers = {"Authorization": f"Bearer {access_token}"}
+        client.get("/products/1", headers=headers)
+        client.get("/products/2", headers={**headers, "X-Request-Deadline": str(int(client_deadline * 1000))})
+
+    (deadline, timeout), (capped, capped_timeout) = seen
+    assert deadline == pytest.approx(time.time() + 5, abs=1)
+    assert timeout == pytest.approx(5, abs=0.5)
+    assert capped == pytest.approx(client_deadline, abs=0.01)
+    assert capped_timeout <= 1
+
+
+def test_expired_deadline_is_not_forwarded(make_gateway, access_token):
+    """Test that a request past its deadline fails with 504 without an upstream call"""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return upstream_response(200, json={})
+
+    with make_gateway(handler) as client:
+        response = client.get("/orders/me", headers={
+            "Authorization": f"Bearer {access_token}",
+            "X-Request-Deadline": str(int((time.time() - 1) * 1000)),
+        })
+
+    assert response.status_code == 504
+    assert calls == []
+
+
+def test_upstream_timeout_is_a_gateway_timeout(make_gateway, access_token):
+    """Test that an upstream exceeding its budget gives 504"""
+    def handler(request):
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    with make_gateway(handler) as client:
+        response = client.post("/orders/create", json={}, headers={"Authorization": f"Bearer {access_token}"})
+
+    assert response.status_code == 504
@@ -0,0 +1,86 @@
+from conftest import upstream_response
+from app.tracing import InMemorySpanExporter, parse_traceparent, prefix_server_timing, tracer
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+def test_parse_traceparent():
+    """Test W3C traceparent parsing"""
+    assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-01") == (TRACE_ID, PARENT_ID)
+    assert parse_traceparent(f"00-{'0' * 32}-{PARENT_ID}-01") is None
+    assert parse_traceparent("not-a-traceparent") is None
+    assert parse_traceparent(None) is None
+
+
+def test_trace_is_propagated_to_the_upstream(make_gateway, access_token, monkeypatch):
+    """Test that the gateway continues the caller's trace into the service"""
+    exporter = InMemorySpanExporter()
+    monkeypatch.setattr(tracer, "exporter", exporter)
+    received = []
+
+    def handler(request):
+        received.append(request.headers["traceparent"])
+        return upstream_response(200, json=[])
+
+    with make_gateway(handler) as client:
+        response = client.get(
+            "/orders/me",
+            headers={
+                "Authorization": f"Bearer {access_token}",
+                "traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01",
+            }
+        )
+
+    assert response.status_code == 200
+    spans = {span.kind: span for span in exporter.spans if span.kind != "internal"}
+    server, upstream = spans["server"], spans["client"]
+    jwt_span = next(span for span in exporter.spans if span.name == "jwt.decode")
+
+    assert server.trace_id == TRACE_ID
+    assert server.parent_id == PARENT_ID
+    assert server.name == "GET /orders/{path:path}"
+    assert upstream.parent_id == server.span_id
+    assert jwt_span.parent_id == server.span_id
+    # The service receives the upstream call span as its parent
+    assert received == [upstream.traceparent]
+
+    timing = response.headers["server-timing"]
+    assert "jwt;dur=" in timing
+    assert "upstream;dur=" in timing
+    assert "total;dur=" in timing
+
+
+def test_new_trace_without_traceparent(make_gateway, access_token, monkeypatch):
+    """Test that a request without traceparent starts a new trace"""
+    exporter = InMemorySpanExporter()
+    monkeypatch.setattr(tracer, "exporter", exporter)
+
+    with make_gateway(lambda request: upstream_response(200, json=[])) as client:
+        client.get("/orders/me", headers={"Authorization": f"Bearer {access_token}"})
+
+    server = next(span for span in exporter.spans if span.kind == "server")
+    assert server.parent_id is None
+    assert len({span.trace_id for span in exporter.spans}) == 1
+
+
+def test_prefix_server_timing():
+    """Test that relayed Server-Timing metric names are prefixed"""
+    assert prefix_server_timing("db;dur=1.5, total;dur=2", "upstream-") == (
+        "upstream-db;dur=1.5, upstream-total;dur=2"
+    )
+    assert prefix_server_timing("", "upstream-") == ""
+
+
+def test_upstream_server_timing_is_relayed_under_a_prefix(make_gateway, access_token):
+    """Test that the service's Server-Timing entries don't collide with the gateway's"""
+    def handler(request):
+        return upstream_response(200, json=[], headers={"Server-Timing": "db;dur=1.0, total;dur=2.0"})
+
+    with make_gateway(handler) as client:
+        response = client.get("/orders/me", headers={"Authorization": f"Bearer {access_token}"})
+
+    metrics = [metric.strip().split(";")[0] for metric in response.headers["server-timing"].split(",")]
+    assert metrics.count("total") == 1
+    assert "upstream-db" in metrics
+    assert "upstream-total" in metrics
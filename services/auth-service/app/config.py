@@ -12,6 +12,27 @@ class Config:
     REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS"))
     JWT_SECRET= os.getenv("JWT_SECRET")
 
+    # Server (run.py): "production" runs WORKERS processes on uvloop/httptools
+    RUN_MODE = os.getenv("RUN_MODE", "development")
+    # One process unless set: the /metrics counters live in each process
+    WORKERS = int(os.getenv("WORKERS", "1"))
+    BACKLOG = int(os.getenv("BACKLOG", "2048"))
+    # Longer than the idle expiry of the gateway's upstream pool, so the
+    # server never closes a connection the gateway is about to reuse
+    KEEP_ALIVE_TIMEOUT = int(os.getenv("KEEP_ALIVE_TIMEOUT", "75"))
+    # Time allowed to in-flight requests on SIGTERM before they are cut
+    GRACEFUL_SHUTDOWN_TIMEOUT = int(os.getenv("GRACEFUL_SHUTDOWN_TIMEOUT", "30"))
+
+    # Database connection pool of each worker (PostgreSQL), and the
+    # connections opened before the worker accepts traffic
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_WARMUP = int(os.getenv("DB_POOL_WARMUP", "2"))
+
+    # Tracing: span exporter ("none", "memory" or "file") and the file of the file exporter
+    TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none")
+    TRACE_FILE = os.getenv("TRACE_FILE", "spans.jsonl")
+
 
 class LocalRunConfig(Config):
     SQLALCHEMY_DATABASE_URL = "sqlite:///./test_auth.db"
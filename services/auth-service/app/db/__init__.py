@@ -3,6 +3,8 @@ import os
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.config import app_config, local_run_config, prod_run_config
+from app.deadline import watch_queries
+from app.tracing import tracer
 
 # get the environment mode
 IS_LOCAL_RUN_ENV = str(os.getenv("LOCAL_RUN")) == "1"
@@ -15,16 +17,43 @@ else:
     SQLALCHEMY_DATABASE_URL = str(prod_run_config.SQLALCHEMY_DATABASE_URL)
 
 connect_args = {"check_same_thread": False} if SQLALCHEMY_DATABASE_URL.startswith("sqlite") else {}
+# SQLite keeps its default pool; PostgreSQL gets a pool sized per worker,
+# whose connections are checked before use (dropped by a DB restart)
+pool_args = {} if SQLALCHEMY_DATABASE_URL.startswith("sqlite") else {
+    "pool_size": app_config.DB_POOL_SIZE,
+    "max_overflow": app_config.DB_MAX_OVERFLOW,
+    "pool_pre_ping": True,
+}
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args=connect_args)
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args=connect_args, **pool_args)
+watch_queries(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+def warm_up_pool(connections: int) -> None:
+    """
+    Open pooled connections up front, so the first requests of a worker
+    do not pay for the connection setup
+    """
+    opened = []
+    try:
+        for _ in range(connections):
+            connection = engine.connect()
+            connection.exec_driver_sql("SELECT 1")
+            opened.append(connection)
+    finally:
+        for connection in opened:
+            connection.close()
+
+
 # Dependency
 def get_db():
+    # Span of the whole session, from checkout to close
+    span = tracer.start_span("db.session")
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+        tracer.end_span(span)
@@ -0,0 +1,85 @@
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+
+# Absolute deadline of a request set by the gateway, in Unix epoch milliseconds
+DEADLINE_HEADER = b"x-request-deadline"
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """
+    Raised when the caller has already given up on the current request
+    """
+
+
+def parse_deadline(value: bytes) -> Optional[float]:
+    """
+    Deadline (epoch seconds) of an X-Request-Deadline header, None if it
+    is missing or invalid
+    """
+    try:
+        return int(value) / 1000 if value else None
+    except ValueError:
+        return None
+
+
+def remaining() -> Optional[float]:
+    """
+    Seconds left until the deadline of the current request, None without one
+    """
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.time()
+
+
+def check_deadline(operation: str = "processing") -> None:
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"Deadline exceeded before {operation}")
+
+
+def watch_queries(engine) -> None:
+    """
+    Check the deadline of the current request before every SQL statement,
+    so no query runs for a request the client stopped waiting for
+    """
+    @event.listens_for(engine, "before_cursor_execute")
+    def check_before_query(conn, cursor, statement, parameters, context, executemany):
+        check_deadline("running a query")
+
+
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded) -> JSONResponse:
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+
+class DeadlineMiddleware:
+    """
+    Pure ASGI middleware making the X-Request-Deadline of a request
+    available to check_deadline(); requests arriving after their deadline
+    are answered with 504 right away
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        deadline = parse_deadline(dict(scope.get("headers", [])).get(DEADLINE_HEADER, b""))
+        if deadline is not None and deadline <= time.time():
+            response = JSONResponse(status_code=504, content={"detail": "Deadline exceeded before processing"})
+            await response(scope, receive, send)
+            return
+
+        token = _deadline.set(deadline)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _deadline.reset(token)
@@ -2,19 +2,26 @@ from fastapi import FastAPI
 from contextlib import asynccontextmanager
 
 from app.config import app_config
-from app.db import engine, Base, SQLALCHEMY_DATABASE_URL
+from app.deadline import DeadlineExceeded, DeadlineMiddleware, deadline_exceeded_handler
+from app.db import engine, SQLALCHEMY_DATABASE_URL, warm_up_pool
+from app.metrics import AppMetrics, MetricsMiddleware, metrics_endpoint
+from app.tracing import TracingMiddleware
+from app.utils import hash_password
 from app.routes import auth_router
 
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # STARTUP
-    Base.metadata.create_all(bind=engine)
+    # STARTUP: runs in every worker before it accepts traffic; the tables
+    # are created by run.py beforehand
+    warm_up_pool(app_config.DB_POOL_WARMUP)
+    # Load the bcrypt backend, its first use is slow
+    hash_password("warm-up")
     yield  # the app run here
 
-    # SHUTDOWN (optional)
-    # engine.dispose()
+    # SHUTDOWN: runs once the in-flight requests are drained; close the pooled connections
+    engine.dispose()
 
 def create_app():
     auth_app = FastAPI(
@@ -26,6 +33,13 @@ def create_app():
     print(">>> DATABASE_URL =", SQLALCHEMY_DATABASE_URL)
     auth_app.include_router(auth_router)
 
+    auth_app.add_middleware(DeadlineMiddleware)
+    auth_app.add_exception_handler(DeadlineExceeded, deadline_exceeded_handler)
+    auth_app.state.metrics = AppMetrics()
+    auth_app.add_middleware(MetricsMiddleware, metrics=auth_app.state.metrics)
+    auth_app.add_middleware(TracingMiddleware)
+    auth_app.add_api_route("/metrics", metrics_endpoint, methods=["GET"], include_in_schema=False)
+
     @auth_app.get("/")
     def health():
         return {"message": "Health check successful"}
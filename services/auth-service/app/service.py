@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Session
 
+from app.deadline import check_deadline
 from app.user_repository import UserRepository
 from app.utils import verify_password, create_access_token, create_refresh_token
 
@@ -26,6 +27,8 @@ class AuthService:
         if not user:
             raise ValueError("Invalid credentials")
 
+        # bcrypt is the slowest step of a login
+        check_deadline("verifying the password")
         if not verify_password(request.password, user.password_hash):
             raise ValueError("Invalid credentials")
 
@@ -0,0 +1,288 @@
+import abc
+import functools
+import inspect
+import json
+import re
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.config import app_config
+
+# W3C Trace Context: version-trace_id-parent_id-flags
+TRACEPARENT_PATTERN = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+SERVICE_NAME = "auth-service"
+
+
+def new_trace_id() -> str:
+    return secrets.token_hex(16)
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str]]:
+    """
+    (trace id, parent span id) of a traceparent header, None if it is
+    missing or invalid (all-zero ids are invalid too)
+    """
+    match = TRACEPARENT_PATTERN.match((value or "").strip().lower())
+    if match is None:
+        return None
+    trace_id, parent_id, _ = match.groups()
+    if trace_id == "0" * 32 or parent_id == "0" * 16:
+        return None
+    return trace_id, parent_id
+
+
+class Span:
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str] = None,
+        kind: str = "internal",
+        attributes: Optional[Dict] = None
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.status = "ok"
+        self.start_time = time.time()
+        self.duration: Optional[float] = None
+        self._start = time.perf_counter()
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def end(self) -> None:
+        if self.duration is None:
+            self.duration = time.perf_counter() - self._start
+
+    def to_dict(self) -> Dict:
+        return {
+            "service": SERVICE_NAME,
+            "name": self.name,
+            "kind": self.kind,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration_ms": round((self.duration or 0.0) * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class SpanExporter(abc.ABC):
+    """
+    Destination of finished spans
+
+    Implement export() to ship spans to a tracing backend (e.g. an OTLP
+    collector); it is called inline, so it must not block for long.
+    """
+
+    @abc.abstractmethod
+    def export(self, span: Span) -> None:
+        ...
+
+
+class NoopSpanExporter(SpanExporter):
+    def export(self, span: Span) -> None:
+        pass
+
+
+class InMemorySpanExporter(SpanExporter):
+    """
+    Keeps the last finished spans, for the tests
+    """
+
+    def __init__(self, max_spans: int = 10000):
+        self.spans: deque = deque(maxlen=max_spans)
+
+    def export(self, span: Span) -> None:
+        self.spans.append(span)
+
+    def clear(self) -> None:
+        self.spans.clear()
+
+
+class FileSpanExporter(SpanExporter):
+    """
+    Appends every span as one JSON line to a file, for local runs
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            with open(self.path, "a") as file:
+                file.write(line + "\n")
+
+
+def create_exporter() -> SpanExporter:
+    if app_config.TRACE_EXPORTER == "memory":
+        return InMemorySpanExporter()
+    if app_config.TRACE_EXPORTER == "file":
+        return FileSpanExporter(app_config.TRACE_FILE)
+    return NoopSpanExporter()
+
+
+class RequestTrace:
+    """
+    Server span of one request and the time spent in its main phases,
+    reported in the Server-Timing header
+    """
+
+    def __init__(self, span: Span):
+        self.span = span
+        self.phases: Dict[str, float] = {}
+
+    def add_phase(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def server_timing(self) -> str:
+        elapsed = time.perf_counter() - self.span._start
+        metrics: List[str] = [f"{phase};dur={seconds * 1000:.1f}" for phase, seconds in self.phases.items()]
+        metrics.append(f"total;dur={elapsed * 1000:.1f}")
+        return ", ".join(metrics)
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("current_trace", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+class Tracer:
+    def __init__(self, exporter: SpanExporter):
+        self.exporter = exporter
+
+    def start_span(self, name: str, kind: str = "internal", **attributes) -> Span:
+        """
+        Start a child of the current span (or a new trace) without making
+        it current; finish it with end_span()
+        """
+        parent = _current_span.get()
+        if parent is None:
+            return Span(name, new_trace_id(), kind=kind, attributes=attributes)
+        return Span(name, parent.trace_id, parent.span_id, kind=kind, attributes=attributes)
+
+    def end_span(self, span: Span, phase: Optional[str] = None) -> None:
+        """
+        Finish a span, export it and add its duration to a Server-Timing phase
+        """
+        span.end()
+        self.exporter.export(span)
+        if phase is not None:
+            trace = _current_trace.get()
+            if trace is not None:
+                trace.add_phase(phase, span.duration)
+
+    @contextmanager
+    def span(self, name: str, phase: Optional[str] = None, kind: str = "internal", **attributes) -> Iterator[Span]:
+        """
+        Run a block in a child span of the current one
+        """
+        span = self.start_span(name, kind, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException:
+            span.status = "error"
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end_span(span, phase)
+
+
+tracer = Tracer(create_exporter())
+
+
+def _traced(name: str, function: Callable) -> Callable:
+    if inspect.iscoroutinefunction(function):
+        @functools.wraps(function)
+        async def async_wrapper(*args, **kwargs):
+            with tracer.span(name, phase="db"):
+                return await function(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        with tracer.span(name, phase="db"):
+            return function(*args, **kwargs)
+    return wrapper
+
+
+def trace_repository(cls):
+    """
+    Class decorator running every static method of a repository in its
+    own span; their time is reported as the "db" Server-Timing phase
+    """
+    for name, attribute in list(vars(cls).items()):
+        if isinstance(attribute, staticmethod):
+            setattr(cls, name, staticmethod(_traced(f"{cls.__name__}.{name}", attribute.__func__)))
+    return cls
+
+
+class TracingMiddleware:
+    """
+    Pure ASGI middleware opening the server span of every request
+
+    The span continues the trace of an incoming ``traceparent`` header,
+    and the response carries a Server-Timing header with the main phases
+    of the request measured so far.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers", []))
+        parent = parse_traceparent(headers.get(b"traceparent", b"").decode("latin-1"))
+        span = Span(
+            f"{scope['method']} {scope['path']}",
+            trace_id=parent[0] if parent else new_trace_id(),
+            parent_id=parent[1] if parent else None,
+            kind="server",
+            attributes={"http.method": scope["method"], "http.target": scope["path"]}
+        )
+        trace = RequestTrace(span)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                span.attributes["http.status_code"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", trace.server_timing().encode("latin-1"))
+                ]
+            await send(message)
+
+        span_token = _current_span.set(span)
+        trace_token = _current_trace.set(trace)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        except BaseException:
+            span.status = "error"
+            raise
+        finally:
+            _current_trace.reset(trace_token)
+            _current_span.reset(span_token)
+            route = getattr(scope.get("route"), "path", None)
+            if route:
+                span.name = f"{scope['method']} {route}"
+                span.attributes["http.route"] = route
+            tracer.end_span(span)
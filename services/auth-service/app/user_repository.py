@@ -3,8 +3,10 @@ from sqlalchemy.exc import IntegrityError
 
 from app.db.models import User
 from app.utils import hash_password
+from app.tracing import trace_repository
 
 
+@trace_repository
 class UserRepository:
 
     @staticmethod
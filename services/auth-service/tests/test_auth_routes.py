@@ -1,3 +1,6 @@
+import time
+
+
 
 def test_register_route(client):
     response = client.post(
@@ -38,3 +41,25 @@ def test_login_route(client):
 
     assert response.status_code == 200
     assert "access_token" in response.json()
+
+
+def test_metrics_endpoint(client):
+    """Test that served requests show up in the Prometheus metrics"""
+    client.get("/")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert 'http_requests_total{method="GET",route="/",status="200"} 1' in response.text
+
+
+def test_login_past_its_deadline_returns_504(client):
+    """Test that a login the gateway already gave up on is not processed"""
+    expired = str(int((time.time() - 1) * 1000))
+    response = client.post(
+        "/auth/login",
+        json={"email": "api_login@test.com", "password": "password123"},
+        headers={"X-Request-Deadline": expired}
+    )
+
+    assert response.status_code == 504
@@ -0,0 +1,37 @@
+"""add order list indexes
+
+Indexes of the keyset queries of the order lists (filter, then
+created_at, id in index order) and of the item loading by order_id.
+
+Revision ID: 5d83a6e1c07f
+Revises: 8c3e5a1f2b07
+Create Date: 2026-10-18 14:09:47.270193
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d83a6e1c07f'
+down_revision: Union[str, Sequence[str], None] = '8c3e5a1f2b07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_orders_department_id_created_at', 'orders', ['department_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_orders_user_id_created_at', 'orders', ['user_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_orders_created_at', 'orders', ['created_at', 'id'], unique=False)
+    op.create_index(op.f('ix_order_items_order_id'), 'order_items', ['order_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_order_items_order_id'), table_name='order_items')
+    op.drop_index('ix_orders_created_at', table_name='orders')
+    op.drop_index('ix_orders_user_id_created_at', table_name='orders')
+    op.drop_index('ix_orders_department_id_created_at', table_name='orders')
@@ -0,0 +1,52 @@
+"""create orders and order_items tables
+
+The schema the service had before the migrations, when create_all built
+it; upgrade_schema() stamps such a database with this revision.
+
+Revision ID: b41f0c7d92ae
+Revises: 
+Create Date: 2026-10-18 14:02:11.418305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import app.db.models
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41f0c7d92ae'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('orders',
+    sa.Column('id', app.db.models.GUID(), nullable=False),
+    sa.Column('user_id', app.db.models.GUID(), nullable=False),
+    sa.Column('department_id', app.db.models.GUID(), nullable=False),
+    sa.Column('status', sa.Enum('PENDING', 'APPROVED', 'REJECTED', 'COMPLETED', name='orderstatus'), nullable=False),
+    sa.Column('description', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('order_items',
+    sa.Column('id', app.db.models.GUID(), nullable=False),
+    sa.Column('order_id', app.db.models.GUID(), nullable=False),
+    sa.Column('product_name', sa.String(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('order_items')
+    op.drop_table('orders')
+    # PostgreSQL keeps the enum type of the status column
+    sa.Enum(name='orderstatus').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,35 @@
+"""add pending orders partial index
+
+Only the orders waiting for approval, a small share of the table, newest
+first: the admins' approval queue (GET /orders?status=pending).
+
+Revision ID: e2a9174bd356
+Revises: 5d83a6e1c07f
+Create Date: 2026-10-18 14:16:05.913452
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a9174bd356'
+down_revision: Union[str, Sequence[str], None] = '5d83a6e1c07f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_orders_pending_created_at', 'orders', ['created_at', 'id'], unique=False,
+        postgresql_where=sa.text("status = 'PENDING'"),
+        sqlite_where=sa.text("status = 'PENDING'")
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_orders_pending_created_at', table_name='orders')
@@ -0,0 +1,107 @@
+"""
+The order routes of DB_MODE=async: the same API as app.routes, served
+by async def handlers on an AsyncSession, so a request waiting for the
+database holds no thread
+"""
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+
+from app.auth import get_current_user
+from app.config import app_config
+from app.db import get_async_db
+from app.db.models import OrderStatus
+from app.pagination import InvalidCursor
+from app.routes import order_events, set_next_cursor
+from app.schemas import OrderResponse, OrderCreateRequest
+from app.services import AsyncOrderService, IdempotencyKeyInProgress, IdempotencyKeyReused
+
+async_order_router = APIRouter(prefix="/orders", tags=["orders"])
+
+
+@async_order_router.post("/create", response_model=OrderResponse)
+async def create_order(
+    request: OrderCreateRequest,
+    response: Response,
+    idempotency_key: str | None = Header(None, min_length=1, max_length=255),
+    db=Depends(get_async_db),
+    user=Depends(get_current_user)
+):
+    try:
+        if idempotency_key is None:
+            return await AsyncOrderService.create_order(db, request, user)
+        status_code, body, replayed = await AsyncOrderService.create_order_idempotent(
+            db, request, user, idempotency_key
+        )
+        response.status_code = status_code
+        if replayed:
+            response.headers["Idempotent-Replayed"] = "true"
+        return body
+    except IdempotencyKeyReused as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except IdempotencyKeyInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@async_order_router.get("", response_model=list[OrderResponse])
+async def list_orders(
+    response: Response,
+    limit: int = Query(app_config.ORDER_PAGE_SIZE, ge=1, le=app_config.ORDER_PAGE_MAX_SIZE),
+    cursor: str | None = Query(None, description="X-Next-Cursor of the previous page"),
+    status: OrderStatus | None = None,
+    db=Depends(get_async_db),
+    user=Depends(get_current_user)
+):
+    try:
+        orders = await AsyncOrderService.list_orders(db, user, limit=limit, cursor=cursor, status=status)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, orders, limit)
+    return orders
+
+
+@async_order_router.get("/me", response_model=list[OrderResponse])
+async def get_my_orders(
+    response: Response,
+    limit: int = Query(app_config.ORDER_PAGE_SIZE, ge=1, le=app_config.ORDER_PAGE_MAX_SIZE),
+    cursor: str | None = Query(None, description="X-Next-Cursor of the previous page"),
+    db=Depends(get_async_db),
+    user=Depends(get_current_user)
+):
+    try:
+        orders = await AsyncOrderService.get_my_orders(db, user, limit=limit, cursor=cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, orders, limit)
+    return orders
+
+
+# Before /{order_id}, which would match it
+async_order_router.add_api_route("/events", order_events, methods=["GET"])
+
+
+@async_order_router.get("/{order_id}", response_model=OrderResponse)
+async def get_order(
+    order_id: UUID,
+    db=Depends(get_async_db),
+    user=Depends(get_current_user)
+):
+    try:
+        return await AsyncOrderService.get_order(db, order_id, user)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@async_order_router.put("/{order_id}/status")
+async def update_order_status(
+    order_id: str,
+    status: OrderStatus,
+    db=Depends(get_async_db),
+    user=Depends(get_current_user)
+):
+    try:
+        return await AsyncOrderService.update_order_status(db, order_id, status, user)
+    except ValueError as e:
+        raise HTTPException(status_code=403, detail=str(e))
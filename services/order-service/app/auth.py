@@ -10,7 +10,7 @@ DEFAULT_USER_ID = "12345678-1234-5678-1234-567812345678"
 DEFAULT_DEPARTMENT_ID = "00000000-0000-0000-0000-000000000001"
 
 
-def get_current_user(
+async def get_current_user(
     x_user_id: Optional[str] = Header(None),
     x_user_role: Optional[str] = Header(None),
     x_user_department: Optional[str] = Header(None)
@@ -18,6 +18,8 @@ def get_current_user(
     """
     Extract user information from headers injected by API Gateway
     Falls back to mock user for direct service access (development/testing)
+    Declared async as it does no I/O: FastAPI then runs it on the event
+    loop instead of sending it to the threadpool
     """
     if x_user_id and x_user_role:
         # User info from gateway
@@ -8,6 +8,45 @@ class Config:
     PROJECT_NAME = os.getenv("PROJECT_NAME", "Order service of the B2B ordering system")
     VERSION = os.getenv("VERSION", "0.1.0")
 
+    # Hours an Idempotency-Key and its stored response are kept
+    IDEMPOTENCY_KEY_TTL_HOURS = float(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+    # Seconds between two deletions of the expired keys by each worker (0: never)
+    IDEMPOTENCY_KEY_PURGE_INTERVAL = float(os.getenv("IDEMPOTENCY_KEY_PURGE_INTERVAL", "3600"))
+
+    # Order events stream: pending events kept per subscriber, keep-alive interval (seconds)
+    ORDER_EVENTS_QUEUE_SIZE = int(os.getenv("ORDER_EVENTS_QUEUE_SIZE", "100"))
+    ORDER_EVENTS_HEARTBEAT = float(os.getenv("ORDER_EVENTS_HEARTBEAT", "15"))
+
+    # Order lists (keyset pagination): orders per page by default, and at most
+    ORDER_PAGE_SIZE = int(os.getenv("ORDER_PAGE_SIZE", "100"))
+    ORDER_PAGE_MAX_SIZE = int(os.getenv("ORDER_PAGE_MAX_SIZE", "1000"))
+
+    # Server (run.py): "production" runs WORKERS processes on uvloop/httptools
+    RUN_MODE = os.getenv("RUN_MODE", "development")
+    # One process unless set: the order event streams and the /metrics
+    # counters live in each process (see the README)
+    WORKERS = int(os.getenv("WORKERS", "1"))
+    BACKLOG = int(os.getenv("BACKLOG", "2048"))
+    # Longer than the idle expiry of the gateway's upstream pool, so the
+    # server never closes a connection the gateway is about to reuse
+    KEEP_ALIVE_TIMEOUT = int(os.getenv("KEEP_ALIVE_TIMEOUT", "75"))
+    # Time allowed to in-flight requests on SIGTERM before they are cut
+    GRACEFUL_SHUTDOWN_TIMEOUT = int(os.getenv("GRACEFUL_SHUTDOWN_TIMEOUT", "30"))
+
+    # Database connection pool of each worker (PostgreSQL), and the
+    # connections opened before the worker accepts traffic
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_WARMUP = int(os.getenv("DB_POOL_WARMUP", "2"))
+
+    # "sync": def routes on the threadpool with blocking sessions; "async": async def
+    # routes with AsyncSession (asyncpg for PostgreSQL, aiosqlite for SQLite)
+    DB_MODE = os.getenv("DB_MODE", "sync")
+
+    # Tracing: span exporter ("none", "memory" or "file") and the file of the file exporter
+    TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none")
+    TRACE_FILE = os.getenv("TRACE_FILE", "spans.jsonl")
+
 
 class LocalRunConfig(Config):
     SQLALCHEMY_DATABASE_URL = "sqlite:///./test_order.db"
@@ -1,8 +1,11 @@
 # app/db/database.py
 import os
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.config import app_config, local_run_config, prod_run_config
+from app.deadline import watch_queries
+from app.tracing import tracer
 
 # get the environment mode
 IS_LOCAL_RUN_ENV = str(os.getenv("LOCAL_RUN")) == "1"
@@ -15,16 +18,144 @@ else:
     SQLALCHEMY_DATABASE_URL = str(prod_run_config.SQLALCHEMY_DATABASE_URL)
 
 connect_args = {"check_same_thread": False} if SQLALCHEMY_DATABASE_URL.startswith("sqlite") else {}
+# SQLite keeps its default pool; PostgreSQL gets a pool sized per worker,
+# whose connections are checked before use (dropped by a DB restart)
+pool_args = {} if SQLALCHEMY_DATABASE_URL.startswith("sqlite") else {
+    "pool_size": app_config.DB_POOL_SIZE,
+    "max_overflow": app_config.DB_MAX_OVERFLOW,
+    "pool_pre_ping": True,
+}
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args=connect_args)
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args=connect_args, **pool_args)
+watch_queries(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+def async_database_url(url: str) -> str:
+    """
+    The URL of the same database on its asyncio driver
+    """
+    scheme, rest = url.split("://", 1)
+    dialect = scheme.split("+")[0]
+    driver = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}[dialect]
+    return f"{dialect}+{driver}://{rest}"
+
+
+# Async engine of DB_MODE=async, built only then: its driver is not needed otherwise.
+# The sync engine stays, for the migrations
+if app_config.DB_MODE == "async":
+    async_engine = create_async_engine(async_database_url(SQLALCHEMY_DATABASE_URL), **pool_args)
+    watch_queries(async_engine.sync_engine)
+    # Nothing is expired at commit: an expired attribute could not be loaded implicitly
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+else:
+    async_engine = None
+    AsyncSessionLocal = None
+
+
+def alembic_config(connection=None):
+    """
+    Alembic configuration of the service (alembic.ini), running on
+    ``connection`` when one is given
+    """
+    from alembic.config import Config as AlembicConfig
+
+    config = AlembicConfig(os.path.join(os.path.dirname(__file__), "..", "..", "alembic.ini"))
+    config.attributes["connection"] = connection
+    return config
+
+
+# Revisions matching the schemas create_all built before the migrations:
+# the orders and order_items tables, then idempotency_keys as well
+LEGACY_REVISIONS = (
+    ({"orders", "order_items", "idempotency_keys"}, "8c3e5a1f2b07"),
+    ({"orders", "order_items"}, "b41f0c7d92ae"),
+)
+
+
+def legacy_revision(connection) -> str | None:
+    """
+    The revision of a database created by create_all, which Alembic does
+    not know about yet; None for a versioned or an empty database
+    """
+    from sqlalchemy import inspect
+
+    tables = set(inspect(connection).get_table_names())
+    if "alembic_version" in tables:
+        return None
+    for legacy_tables, revision in LEGACY_REVISIONS:
+        if legacy_tables <= tables:
+            return revision
+    return None
+
+
+def upgrade_schema(bind=None) -> None:
+    """
+    Apply the pending migrations; the tables are never created otherwise.
+    A database created by create_all is stamped with the revision of its
+    schema first, so only what it lacks is migrated.
+    """
+    from alembic import command
+
+    with (bind or engine).begin() as connection:
+        config = alembic_config(connection)
+        revision = legacy_revision(connection)
+        if revision is not None:
+            command.stamp(config, revision)
+        command.upgrade(config, "head")
+
+
+def warm_up_pool(connections: int) -> None:
+    """
+    Open pooled connections up front, so the first requests of a worker
+    do not pay for the connection setup
+    """
+    opened = []
+    try:
+        for _ in range(connections):
+            connection = engine.connect()
+            connection.exec_driver_sql("SELECT 1")
+            opened.append(connection)
+    finally:
+        for connection in opened:
+            connection.close()
+
+
+async def warm_up_async_pool(connections: int) -> None:
+    """
+    warm_up_pool() of the async engine
+    """
+    opened = []
+    try:
+        for _ in range(connections):
+            connection = await async_engine.connect()
+            opened.append(connection)
+            await connection.exec_driver_sql("SELECT 1")
+    finally:
+        for connection in opened:
+            await connection.close()
+
+
 # Dependency
 def get_db():
+    # Span of the whole session, from checkout to close
+    span = tracer.start_span("db.session")
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+        tracer.end_span(span)
+
+
+async def get_async_db():
+    """
+    get_db() of DB_MODE=async
+    """
+    span = tracer.start_span("db.session")
+    try:
+        async with AsyncSessionLocal() as db:
+            yield db
+    finally:
+        tracer.end_span(span)
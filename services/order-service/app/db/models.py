@@ -2,7 +2,7 @@ import enum
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Column, String, DateTime, Enum, Integer, ForeignKey, TypeDecorator, CHAR
+from sqlalchemy import Column, String, DateTime, Enum, Integer, ForeignKey, Text, TypeDecorator, CHAR, UniqueConstraint, Index, text
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 from sqlalchemy.orm import relationship
 
@@ -36,6 +36,10 @@ class GUID(TypeDecorator):
             else:
                 return value.hex
 
+    def process_literal_param(self, value, dialect):
+        # Inlined in SQL compiled with literal_binds (e.g. EXPLAIN of a query)
+        return self.process_bind_param(value, dialect)
+
     def process_result_value(self, value, dialect):
         if value is None:
             return value
@@ -54,7 +58,23 @@ class OrderStatus(enum.Enum):
 
 
 class Order(Base):
+    """
+    The schema is managed by the Alembic migrations (alembic/versions);
+    indexes added here need a migration too
+    """
     __tablename__ = "orders"
+    __table_args__ = (
+        # The order lists: a filter, then newest first by (created_at, id)
+        Index("ix_orders_department_id_created_at", "department_id", "created_at", "id"),
+        Index("ix_orders_user_id_created_at", "user_id", "created_at", "id"),
+        Index("ix_orders_created_at", "created_at", "id"),
+        # The approval queue: pending orders only
+        Index(
+            "ix_orders_pending_created_at", "created_at", "id",
+            postgresql_where=text("status = 'PENDING'"),
+            sqlite_where=text("status = 'PENDING'")
+        ),
+    )
 
     id = Column(GUID(), primary_key=True, default=uuid.uuid4)
     user_id = Column(GUID(), nullable=False)
@@ -73,9 +93,33 @@ class OrderItem(Base):
     __tablename__ = "order_items"
 
     id = Column(GUID(), primary_key=True, default=uuid.uuid4)
-    order_id = Column(GUID(), ForeignKey("orders.id"), nullable=False)
+    order_id = Column(GUID(), ForeignKey("orders.id"), nullable=False, index=True)
 
     product_name = Column(String, nullable=False)
     quantity = Column(Integer, nullable=False)
 
     order = relationship("Order", back_populates="items")
+
+
+class IdempotencyKey(Base):
+    """
+    Outcome of a request sent with an Idempotency-Key header, replayed
+    when the same user sends the same key again before it expires
+    """
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint("user_id", "key", name="uq_idempotency_keys_user_key"),
+    )
+
+    id = Column(GUID(), primary_key=True, default=uuid.uuid4)
+    user_id = Column(GUID(), nullable=False)
+    key = Column(String(255), nullable=False)
+    # SHA-256 of the request payload, to detect a key reused for another request
+    request_hash = Column(String(64), nullable=False)
+
+    # Empty while the request is being processed
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,149 @@
+import asyncio
+import json
+import threading
+import uuid
+from datetime import datetime
+from typing import AsyncIterator, Dict, Optional, Set
+
+from app.config import app_config
+
+STATUS_CHANGED = "order.status_changed"
+# Sent instead of the events a slow subscriber missed: the client should reload
+RESYNC = "stream.resync"
+# Reconnection delay suggested to the clients (ms)
+RETRY_MS = 3000
+
+
+class Subscription:
+    """
+    One open event stream: its scope and a bounded queue of pending events
+
+    When the queue is full the oldest event is dropped, so a slow client
+    cannot make the service buffer without limit; it is told to reload
+    with a resync event instead.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        user_id: str,
+        department_id: Optional[str],
+        all_orders: bool,
+        max_size: int
+    ):
+        self.loop = loop
+        self.user_id = user_id
+        # Orders of this department too (staff), or of every department (admins)
+        self.department_id = department_id
+        self.all_orders = all_orders
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        self.dropped = 0
+
+    def matches(self, event: Dict) -> bool:
+        if self.all_orders or str(event["user_id"]) == str(self.user_id):
+            return True
+        return self.department_id is not None and str(event["department_id"]) == str(self.department_id)
+
+    def offer(self, event: Dict) -> None:
+        """
+        Enqueue an event; runs on the event loop of the subscriber
+        """
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def next(self) -> Dict:
+        if self.dropped:
+            self.dropped = 0
+            return {"type": RESYNC}
+        return await self.queue.get()
+
+
+class EventBroker:
+    """
+    In-process pub/sub of the order events
+
+    publish() may be called from any thread (the sync routes run in a
+    thread pool): events are handed to every matching subscriber on its
+    own event loop. Each replica of the service only sees the changes it
+    commits itself.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscriptions: Set[Subscription] = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id: str, department_id: Optional[str] = None, all_orders: bool = False) -> Subscription:
+        subscription = Subscription(asyncio.get_running_loop(), user_id, department_id, all_orders, self.queue_size)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscriptions)
+
+    def publish(self, event: Dict) -> None:
+        with self._lock:
+            targets = [subscription for subscription in self._subscriptions if subscription.matches(event)]
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:
+                # Loop closed: the stream is gone
+                self.unsubscribe(subscription)
+
+
+broker = EventBroker(app_config.ORDER_EVENTS_QUEUE_SIZE)
+
+
+def status_changed_event(order, previous_status) -> Dict:
+    return {
+        "type": STATUS_CHANGED,
+        "id": str(uuid.uuid4()),
+        "order_id": str(order.id),
+        "user_id": str(order.user_id),
+        "department_id": str(order.department_id),
+        "status": order.status.value,
+        "previous_status": previous_status.value if previous_status is not None else None,
+        "updated_at": (order.updated_at or datetime.utcnow()).isoformat(),
+    }
+
+
+def format_event(event: Dict) -> str:
+    """
+    Server-sent event frame of an event
+    """
+    data = {key: value for key, value in event.items() if key not in ("type", "id")}
+    lines = []
+    if "id" in event:
+        lines.append(f"id: {event['id']}")
+    lines.append(f"event: {event['type']}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def event_stream(subscription: Subscription, heartbeat: float) -> AsyncIterator[str]:
+    """
+    SSE body of a subscription, with a comment line every ``heartbeat``
+    seconds so idle connections are not closed by proxies; the
+    subscription ends when the client disconnects
+    """
+    try:
+        # Sent at once, so the client knows the stream is open
+        yield f"retry: {RETRY_MS}\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.next(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield format_event(event)
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,116 @@
+from datetime import datetime
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.db.models import IdempotencyKey
+from app.tracing import trace_repository
+
+
+@trace_repository
+class IdempotencyRepository:
+
+    @staticmethod
+    def get(db: Session, user_id, key: str) -> IdempotencyKey | None:
+        return (
+            db.query(IdempotencyKey)
+            .filter(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+            .first()
+        )
+
+    @staticmethod
+    def reserve(db: Session, user_id, key: str, request_hash: str, expires_at: datetime) -> IdempotencyKey:
+        """
+        Claim a key for a request being processed; flushed, not committed,
+        so it is committed together with the work of the request. A
+        concurrent claim of the same key fails with an IntegrityError.
+        """
+        # An expired claim of this key goes first; other expired keys are
+        # left to purge_expired()
+        db.query(IdempotencyKey).filter(
+            IdempotencyKey.user_id == user_id,
+            IdempotencyKey.key == key,
+            IdempotencyKey.expires_at <= datetime.utcnow()
+        ).delete()
+
+        record = IdempotencyKey(
+            user_id=user_id,
+            key=key,
+            request_hash=request_hash,
+            expires_at=expires_at
+        )
+        db.add(record)
+        db.flush()
+        return record
+
+    @staticmethod
+    def complete(db: Session, record: IdempotencyKey, status_code: int, response_body: str) -> IdempotencyKey:
+        """
+        Store the response of a claimed key and commit it, with the work
+        of the request flushed in the same transaction
+        """
+        record.status_code = status_code
+        record.response_body = response_body
+        db.commit()
+        return record
+
+    @staticmethod
+    def purge_expired(db: Session) -> int:
+        """
+        Delete the expired keys; run periodically, not per request
+        """
+        deleted = db.query(IdempotencyKey).filter(IdempotencyKey.expires_at <= datetime.utcnow()).delete()
+        db.commit()
+        return deleted
+
+
+@trace_repository
+class AsyncIdempotencyRepository:
+    """
+    IdempotencyRepository on an AsyncSession (DB_MODE=async)
+    """
+
+    @staticmethod
+    async def get(db: AsyncSession, user_id, key: str) -> IdempotencyKey | None:
+        query = select(IdempotencyKey).filter(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+        return (await db.execute(query)).scalars().first()
+
+    @staticmethod
+    async def reserve(
+        db: AsyncSession,
+        user_id,
+        key: str,
+        request_hash: str,
+        expires_at: datetime
+    ) -> IdempotencyKey:
+        await db.execute(
+            delete(IdempotencyKey).where(
+                IdempotencyKey.user_id == user_id,
+                IdempotencyKey.key == key,
+                IdempotencyKey.expires_at <= datetime.utcnow()
+            )
+        )
+
+        record = IdempotencyKey(
+            user_id=user_id,
+            key=key,
+            request_hash=request_hash,
+            expires_at=expires_at
+        )
+        db.add(record)
+        await db.flush()
+        return record
+
+    @staticmethod
+    async def complete(db: AsyncSession, record: IdempotencyKey, status_code: int, response_body: str) -> IdempotencyKey:
+        record.status_code = status_code
+        record.response_body = response_body
+        await db.commit()
+        return record
+
+    @staticmethod
+    async def purge_expired(db: AsyncSession) -> int:
+        result = await db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.utcnow()))
+        await db.commit()
+        return result.rowcount
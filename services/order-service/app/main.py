@@ -1,20 +1,66 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI
-from contextlib import asynccontextmanager
 
 from app.config import app_config
-from app.db import engine, Base, SQLALCHEMY_DATABASE_URL
+from app.deadline import DeadlineExceeded, DeadlineMiddleware, deadline_exceeded_handler
+from app.db import (
+    AsyncSessionLocal, SessionLocal, SQLALCHEMY_DATABASE_URL, async_engine, engine, warm_up_async_pool, warm_up_pool
+)
+from app.idempotency_repository import AsyncIdempotencyRepository, IdempotencyRepository
+from app.metrics import AppMetrics, MetricsMiddleware, metrics_endpoint
+from app.tracing import TracingMiddleware
+from app.async_routes import async_order_router
 from app.routes import order_router
 
+logger = logging.getLogger(__name__)
+
+
+def purge_expired_keys() -> int:
+    with SessionLocal() as db:
+        return IdempotencyRepository.purge_expired(db)
+
+
+async def purge_idempotency_keys(interval: float) -> None:
+    """
+    Delete the expired Idempotency-Keys every ``interval`` seconds, out of
+    the request path; a failed run is retried at the next interval
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if async_engine is not None:
+                async with AsyncSessionLocal() as db:
+                    await AsyncIdempotencyRepository.purge_expired(db)
+            else:
+                await asyncio.to_thread(purge_expired_keys)
+        except Exception:
+            logger.exception("Purge of the expired idempotency keys failed")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # STARTUP
-    Base.metadata.create_all(bind=engine)
+    # STARTUP: runs in every worker before it accepts traffic; the schema
+    # is migrated by run.py (or `alembic upgrade head`) beforehand
+    if async_engine is not None:
+        await warm_up_async_pool(app_config.DB_POOL_WARMUP)
+    else:
+        warm_up_pool(app_config.DB_POOL_WARMUP)
+    purge = None
+    if app_config.IDEMPOTENCY_KEY_PURGE_INTERVAL > 0:
+        purge = asyncio.create_task(purge_idempotency_keys(app_config.IDEMPOTENCY_KEY_PURGE_INTERVAL))
     yield  # the app run here
 
-    # SHUTDOWN (optional)
-    # engine.dispose()
+    # SHUTDOWN: runs once the in-flight requests are drained; close the pooled connections
+    if purge is not None:
+        purge.cancel()
+        with suppress(asyncio.CancelledError):
+            await purge
+    if async_engine is not None:
+        await async_engine.dispose()
+    engine.dispose()
 
 def create_app():
     order_app = FastAPI(
@@ -24,7 +70,15 @@ def create_app():
     )
 
     print(">>> DATABASE_URL =", SQLALCHEMY_DATABASE_URL)
-    order_app.include_router(order_router)
+    # DB_MODE: blocking sessions on the threadpool, or async sessions on the event loop
+    order_app.include_router(async_order_router if app_config.DB_MODE == "async" else order_router)
+
+    order_app.add_middleware(DeadlineMiddleware)
+    order_app.add_exception_handler(DeadlineExceeded, deadline_exceeded_handler)
+    order_app.state.metrics = AppMetrics()
+    order_app.add_middleware(MetricsMiddleware, metrics=order_app.state.metrics)
+    order_app.add_middleware(TracingMiddleware)
+    order_app.add_api_route("/metrics", metrics_endpoint, methods=["GET"], include_in_schema=False)
 
     @order_app.get("/")
     def health():
@@ -1,8 +1,91 @@
-from sqlalchemy.orm import Session
+import uuid
+from datetime import datetime
+
+from sqlalchemy import bindparam, insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, lazyload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
 from app.db.models import Order, OrderItem, OrderStatus
+from app.events import broker, status_changed_event
+from app.tracing import trace_repository
+
+# Loading strategies of Order.items, chosen per query:
+# "selectin": one SELECT ... IN for the items of all the listed orders
+# "joined": the items in the same SELECT (LEFT OUTER JOIN), one row per item
+# "lazy": one SELECT per order, when its items are first accessed
+ITEM_LOADERS = {
+    "selectin": selectinload,
+    "joined": joinedload,
+    "lazy": lazyload,
+}
+
+
+def with_items(query, items: str):
+    """
+    Apply an ITEM_LOADERS strategy to a query of orders
+    """
+    if items not in ITEM_LOADERS:
+        raise ValueError(f"Unknown items loading strategy: {items}")
+    return query.options(ITEM_LOADERS[items](Order.items))
+
+
+def status_literal(status: OrderStatus):
+    """
+    A status inlined in the SQL rather than bound: the planner can only
+    pick the partial index of the pending orders when it sees the value
+    """
+    return bindparam("status", status, type_=Order.status.type, literal_execute=True)
+
+
+def keyset(query, limit: int | None = None, after=None):
+    """
+    Orders of a query (or select()), newest first, by (created_at, id)
+
+    ``after`` is the (created_at, id) of the last order of the previous
+    page: the page starts right after it in the index order instead of
+    skipping rows with OFFSET, so deep pages cost the same as the first.
+    """
+    if after is not None:
+        query = query.filter(tuple_(Order.created_at, Order.id) < tuple(after))
+    query = query.order_by(Order.created_at.desc(), Order.id.desc())
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def page(query, limit: int | None = None, after=None):
+    return keyset(query, limit, after).all()
 
 
+def new_order(user_id, department_id, description, items):
+    """
+    A pending order and the rows of its items, with their ids and
+    timestamps generated here rather than by the database
+    """
+    now = datetime.utcnow()
+    order = Order(
+        id=uuid.uuid4(),
+        user_id=user_id,
+        department_id=department_id,
+        description=description,
+        status=OrderStatus.PENDING,
+        created_at=now,
+        updated_at=now
+    )
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "order_id": order.id,
+            "product_name": item.product_name,
+            "quantity": item.quantity
+        }
+        for item in items
+    ]
+    return order, rows
+
+
+@trace_repository
 class OrderRepository:
 
     @staticmethod
@@ -11,29 +94,35 @@ class OrderRepository:
         user_id,
         department_id,
         description,
-        items
+        items,
+        commit: bool = True
     ) -> Order:
+        """
+        Insert an order and all its items in two statements
 
-        order = Order(
-            user_id=user_id,
-            department_id=department_id,
-            description=description,
-            status=OrderStatus.PENDING
-        )
+        Ids and timestamps are generated here rather than by the database,
+        so the items go in one multi-row INSERT and the returned order is
+        built from memory, without reading back what was just written.
+        With commit=False the order is only flushed, and committed by the
+        caller with the rest of its transaction.
+        """
+        order, rows = new_order(user_id, department_id, description, items)
 
         db.add(order)
-        db.flush()  # get order.id before commit
+        db.flush()  # the items reference the order
+        if rows:
+            db.execute(insert(OrderItem), rows)
 
-        for item in items:
-            order_item = OrderItem(
-                order_id=order.id,
-                product_name=item.product_name,
-                quantity=item.quantity
-            )
-            db.add(order_item)
+        if commit:
+            # Kept out of the session while committing, so the commit does not
+            # expire it and its attributes are not loaded again
+            db.expunge(order)
+            db.commit()
+            db.add(order)  # persistent again, as it is
 
-        db.commit()
-        db.refresh(order)
+        # In-memory copies of the inserted rows, not tracked by the session:
+        # building tracked ones would cost more than the insert itself
+        set_committed_value(order, "items", [OrderItem(**row) for row in rows])
         return order
 
     @staticmethod
@@ -41,30 +130,122 @@ class OrderRepository:
         return db.query(Order).filter(Order.id == order_id).first()
 
     @staticmethod
-    def list_by_department(db: Session, department_id):
-        return (
-            db.query(Order)
-            .filter(Order.department_id == department_id)
-            .order_by(Order.created_at.desc())
-            .all()
-        )
+    def list_by_department(
+        db: Session,
+        department_id,
+        items: str = "selectin",
+        limit: int | None = None,
+        after=None,
+        status: OrderStatus | None = None
+    ):
+        query = with_items(db.query(Order), items).filter(Order.department_id == department_id)
+        if status is not None:
+            query = query.filter(Order.status == status_literal(status))
+        return page(query, limit, after)
 
     @staticmethod
-    def list_by_user(db: Session, user_id):
-        return (
-            db.query(Order)
-            .filter(Order.user_id == user_id)
-            .order_by(Order.created_at.desc())
-            .all()
-        )
+    def list_by_user(db: Session, user_id, items: str = "selectin", limit: int | None = None, after=None):
+        query = with_items(db.query(Order), items).filter(Order.user_id == user_id)
+        return page(query, limit, after)
 
     @staticmethod
-    def list_all(db: Session):
-        return db.query(Order).order_by(Order.created_at.desc()).all()
+    def list_all(
+        db: Session,
+        items: str = "selectin",
+        limit: int | None = None,
+        after=None,
+        status: OrderStatus | None = None
+    ):
+        query = with_items(db.query(Order), items)
+        if status is not None:
+            query = query.filter(Order.status == status_literal(status))
+        return page(query, limit, after)
 
     @staticmethod
     def update_status(db: Session, order: Order, status: OrderStatus):
+        previous_status = order.status
         order.status = status
         db.commit()
         db.refresh(order)
+        # Pushed to the event streams once the change is committed
+        broker.publish(status_changed_event(order, previous_status))
+        return order
+
+
+@trace_repository
+class AsyncOrderRepository:
+    """
+    OrderRepository on an AsyncSession (DB_MODE=async)
+
+    Nothing can be lazy-loaded on an AsyncSession: the items of the
+    orders returned are always loaded eagerly, unless told otherwise.
+    """
+
+    @staticmethod
+    async def create_order(
+        db: AsyncSession,
+        user_id,
+        department_id,
+        description,
+        items,
+        commit: bool = True
+    ) -> Order:
+        order, rows = new_order(user_id, department_id, description, items)
+
+        db.add(order)
+        await db.flush()  # the items reference the order
+        if rows:
+            await db.execute(insert(OrderItem), rows)
+        if commit:
+            # The session does not expire the order at commit
+            await db.commit()
+
+        set_committed_value(order, "items", [OrderItem(**row) for row in rows])
+        return order
+
+    @staticmethod
+    async def get_by_id(db: AsyncSession, order_id, items: str = "selectin") -> Order | None:
+        query = with_items(select(Order), items).filter(Order.id == order_id)
+        return (await db.execute(query)).scalars().first()
+
+    @staticmethod
+    async def list_by_department(
+        db: AsyncSession,
+        department_id,
+        items: str = "selectin",
+        limit: int | None = None,
+        after=None,
+        status: OrderStatus | None = None
+    ):
+        query = with_items(select(Order), items).filter(Order.department_id == department_id)
+        if status is not None:
+            query = query.filter(Order.status == status_literal(status))
+        return (await db.execute(keyset(query, limit, after))).scalars().unique().all()
+
+    @staticmethod
+    async def list_by_user(db: AsyncSession, user_id, items: str = "selectin", limit: int | None = None, after=None):
+        query = with_items(select(Order), items).filter(Order.user_id == user_id)
+        return (await db.execute(keyset(query, limit, after))).scalars().unique().all()
+
+    @staticmethod
+    async def list_all(
+        db: AsyncSession,
+        items: str = "selectin",
+        limit: int | None = None,
+        after=None,
+        status: OrderStatus | None = None
+    ):
+        query = with_items(select(Order), items)
+        if status is not None:
+            query = query.filter(Order.status == status_literal(status))
+        return (await db.execute(keyset(query, limit, after))).scalars().unique().all()
+
+    @staticmethod
+    async def update_status(db: AsyncSession, order: Order, status: OrderStatus):
+        previous_status = order.status
+        order.status = status
+        await db.commit()
+        await db.refresh(order)
+        # Pushed to the event streams once the change is committed
+        broker.publish(status_changed_event(order, previous_status))
         return order
@@ -0,0 +1,35 @@
+import base64
+import binascii
+import json
+import uuid
+from datetime import datetime
+from typing import Tuple
+
+# Response header carrying the cursor of the next page of a list
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursor(ValueError):
+    """
+    The cursor was not issued by this service, or was altered
+    """
+
+
+def encode_cursor(order) -> str:
+    """
+    Opaque cursor pointing right after an order, in (created_at, id) order
+    """
+    payload = json.dumps([order.created_at.isoformat(), str(order.id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """
+    (created_at, id) of the last order of the previous page
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, order_id = json.loads(payload)
+        return datetime.fromisoformat(created_at), uuid.UUID(order_id)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise InvalidCursor("Invalid cursor")
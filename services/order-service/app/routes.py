@@ -1,10 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 
 from app.auth import get_current_user
 from app.db import get_db
+from app.config import app_config
 from app.db.models import OrderStatus
+from app.events import broker, event_stream
+from app.pagination import NEXT_CURSOR_HEADER, InvalidCursor, encode_cursor
 from app.schemas import OrderResponse, OrderCreateRequest
-from app.services import OrderService
+from app.services import IdempotencyKeyInProgress, IdempotencyKeyReused, OrderService
 
 order_router = APIRouter(prefix="/orders", tags=["orders"])
 
@@ -12,30 +18,114 @@ order_router = APIRouter(prefix="/orders", tags=["orders"])
 @order_router.post("/create", response_model=OrderResponse)
 def create_order(
     request: OrderCreateRequest,
+    response: Response,
+    idempotency_key: str | None = Header(None, min_length=1, max_length=255),
     db=Depends(get_db),
     user=Depends(get_current_user)
 ):
+    """
+    Create an order; with an Idempotency-Key header, retries of the same
+    request return the first response instead of creating another order
+    """
     try:
-        return OrderService.create_order(db, request, user)
+        if idempotency_key is None:
+            return OrderService.create_order(db, request, user)
+        status_code, body, replayed = OrderService.create_order_idempotent(db, request, user, idempotency_key)
+        response.status_code = status_code
+        if replayed:
+            response.headers["Idempotent-Replayed"] = "true"
+        return body
+    except IdempotencyKeyReused as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except IdempotencyKeyInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+def set_next_cursor(response: Response, orders, limit: int) -> None:
+    """
+    A full page links to the next one; the page after it may be empty
+    """
+    if len(orders) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(orders[-1])
+
+
 @order_router.get("", response_model=list[OrderResponse])
 def list_orders(
+    response: Response,
+    limit: int = Query(app_config.ORDER_PAGE_SIZE, ge=1, le=app_config.ORDER_PAGE_MAX_SIZE),
+    cursor: str | None = Query(None, description="X-Next-Cursor of the previous page"),
+    status: OrderStatus | None = None,
     db=Depends(get_db),
     user=Depends(get_current_user)
 ):
-    return OrderService.list_orders(db, user)
+    """
+    Orders the user may list, newest first, one page at a time; the
+    X-Next-Cursor response header is the cursor of the next page.
+    status=pending: the orders waiting for approval
+    """
+    try:
+        orders = OrderService.list_orders(db, user, limit=limit, cursor=cursor, status=status)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, orders, limit)
+    return orders
 
 
 @order_router.get("/me", response_model=list[OrderResponse])
 def get_my_orders(
+    response: Response,
+    limit: int = Query(app_config.ORDER_PAGE_SIZE, ge=1, le=app_config.ORDER_PAGE_MAX_SIZE),
+    cursor: str | None = Query(None, description="X-Next-Cursor of the previous page"),
+    db=Depends(get_db),
+    user=Depends(get_current_user)
+):
+    """Get orders for the current user, paginated as /orders"""
+    try:
+        orders = OrderService.get_my_orders(db, user, limit=limit, cursor=cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, orders, limit)
+    return orders
+
+
+@order_router.get("/events")
+async def order_events(
+    scope: str = Query("orders", pattern="^(orders|me)$"),
+    user=Depends(get_current_user)
+):
+    """
+    Server-sent events stream of order status changes (order.status_changed)
+    scope=orders: the orders the user may list (department, or all for admins)
+    scope=me: the user's own orders
+    """
+    if scope == "me":
+        subscription = broker.subscribe(user["sub"])
+    else:
+        subscription = broker.subscribe(
+            user["sub"],
+            department_id=user["department_id"],
+            all_orders=user["role"] == "admin"
+        )
+    return StreamingResponse(
+        event_stream(subscription, app_config.ORDER_EVENTS_HEARTBEAT),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@order_router.get("/{order_id}", response_model=OrderResponse)
+def get_order(
+    order_id: UUID,
     db=Depends(get_db),
     user=Depends(get_current_user)
 ):
-    """Get orders for the current user"""
-    return OrderService.get_my_orders(db, user)
+    """Get order details by ID"""
+    try:
+        return OrderService.get_order(db, order_id, user)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
 
 @order_router.put("/{order_id}/status")
@@ -1,13 +1,51 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.order_repository import OrderRepository
-from app.db.models import OrderStatus
+from app.config import app_config
+from app.idempotency_repository import AsyncIdempotencyRepository, IdempotencyRepository
+from app.order_repository import AsyncOrderRepository, OrderRepository
+from app.pagination import decode_cursor
+from app.db.models import IdempotencyKey, OrderStatus
+from app.schemas import OrderResponse
+
+
+class IdempotencyKeyReused(ValueError):
+    """
+    The Idempotency-Key was already used for a different request
+    """
+
+
+class IdempotencyKeyInProgress(ValueError):
+    """
+    The first request with this Idempotency-Key has not finished yet
+    """
+
+
+def request_hash(request) -> str:
+    payload = json.dumps(request.model_dump(mode="json"), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def replay(record: IdempotencyKey | None, digest: str):
+    """
+    (status code, body, True) of the stored response of a key
+    """
+    if record is not None and record.request_hash != digest:
+        raise IdempotencyKeyReused("Idempotency-Key was already used for a different request")
+    if record is None or record.response_body is None:
+        raise IdempotencyKeyInProgress("A request with this Idempotency-Key is still being processed")
+    return record.status_code, json.loads(record.response_body), True
 
 
 class OrderService:
 
     @staticmethod
-    def create_order(db: Session, request, user):
+    def create_order(db: Session, request, user, commit: bool = True):
         """
         user comes from JWT (gateway or dependency)
         """
@@ -16,29 +54,94 @@ class OrderService:
             user_id=user["sub"],
             department_id=user["department_id"],
             description=request.description,
-            items=request.items
+            items=request.items,
+            commit=commit
         )
 
     @staticmethod
-    def list_orders(db: Session, user):
+    def create_order_idempotent(db: Session, request, user, idempotency_key: str):
+        """
+        Create an order at most once per (user, Idempotency-Key)
+
+        The key claim, the order, its items and the stored response are
+        committed in one transaction: either all of them or none. A retry
+        of the same request gets the stored response back instead of a new
+        order. Returns the status code, the response body and whether it
+        was replayed.
+        """
+        digest = request_hash(request)
+        record = IdempotencyRepository.get(db, user["sub"], idempotency_key)
+        if record is not None and record.expires_at > datetime.utcnow():
+            return replay(record, digest)
+
+        expires_at = datetime.utcnow() + timedelta(hours=app_config.IDEMPOTENCY_KEY_TTL_HOURS)
+        try:
+            record = IdempotencyRepository.reserve(db, user["sub"], idempotency_key, digest, expires_at)
+        except IntegrityError:
+            # Claimed by a concurrent request in the meantime
+            db.rollback()
+            return replay(IdempotencyRepository.get(db, user["sub"], idempotency_key), digest)
+
+        try:
+            order = OrderService.create_order(db, request, user, commit=False)
+            body = OrderResponse.model_validate(order).model_dump(mode="json")
+            IdempotencyRepository.complete(db, record, 200, json.dumps(body))
+        except Exception:
+            # Neither the order nor the claim is kept, so the request can be retried
+            db.rollback()
+            raise
+        return 200, body, False
+
+    @staticmethod
+    def list_orders(
+        db: Session,
+        user,
+        limit: int | None = None,
+        cursor: str | None = None,
+        status: OrderStatus | None = None
+    ):
+        """
+        Orders the user may list, newest first, optionally of one status;
+        at most ``limit`` of them, after the order ``cursor`` points to
+        """
+        after = decode_cursor(cursor) if cursor else None
         if user["role"] == "admin":
-            return OrderRepository.list_all(db)
+            return OrderRepository.list_all(db, limit=limit, after=after, status=status)
 
         return OrderRepository.list_by_department(
             db=db,
-            department_id=user["department_id"]
+            department_id=user["department_id"],
+            limit=limit,
+            after=after,
+            status=status
         )
 
     @staticmethod
-    def get_my_orders(db: Session, user):
+    def get_my_orders(db: Session, user, limit: int | None = None, cursor: str | None = None):
         """
-        Get orders for the current user
+        Get orders for the current user, paginated as list_orders
         """
         return OrderRepository.list_by_user(
             db=db,
-            user_id=user["sub"]
+            user_id=user["sub"],
+            limit=limit,
+            after=decode_cursor(cursor) if cursor else None
         )
 
+    @staticmethod
+    def get_order(db: Session, order_id, user):
+        """
+        Get one order; staff only see the orders of their department
+        """
+        order = OrderRepository.get_by_id(db, order_id)
+        if not order:
+            raise ValueError("Order not found")
+
+        if user["role"] != "admin" and str(order.department_id) != str(user["department_id"]):
+            raise ValueError("Order not found")
+
+        return order
+
     @staticmethod
     def update_order_status(db: Session, order_id, status: OrderStatus, user):
         if user["role"] != "admin":
@@ -49,3 +152,95 @@ class OrderService:
             raise ValueError("Order not found")
 
         return OrderRepository.update_status(db, order, status)
+
+
+class AsyncOrderService:
+    """
+    OrderService on an AsyncSession (DB_MODE=async)
+    """
+
+    @staticmethod
+    async def create_order(db: AsyncSession, request, user, commit: bool = True):
+        return await AsyncOrderRepository.create_order(
+            db=db,
+            user_id=user["sub"],
+            department_id=user["department_id"],
+            description=request.description,
+            items=request.items,
+            commit=commit
+        )
+
+    @staticmethod
+    async def create_order_idempotent(db: AsyncSession, request, user, idempotency_key: str):
+        digest = request_hash(request)
+        record = await AsyncIdempotencyRepository.get(db, user["sub"], idempotency_key)
+        if record is not None and record.expires_at > datetime.utcnow():
+            return replay(record, digest)
+
+        expires_at = datetime.utcnow() + timedelta(hours=app_config.IDEMPOTENCY_KEY_TTL_HOURS)
+        try:
+            record = await AsyncIdempotencyRepository.reserve(db, user["sub"], idempotency_key, digest, expires_at)
+        except IntegrityError:
+            await db.rollback()
+            return replay(await AsyncIdempotencyRepository.get(db, user["sub"], idempotency_key), digest)
+
+        try:
+            order = await AsyncOrderService.create_order(db, request, user, commit=False)
+            body = OrderResponse.model_validate(order).model_dump(mode="json")
+            await AsyncIdempotencyRepository.complete(db, record, 200, json.dumps(body))
+        except Exception:
+            await db.rollback()
+            raise
+        return 200, body, False
+
+    @staticmethod
+    async def list_orders(
+        db: AsyncSession,
+        user,
+        limit: int | None = None,
+        cursor: str | None = None,
+        status: OrderStatus | None = None
+    ):
+        after = decode_cursor(cursor) if cursor else None
+        if user["role"] == "admin":
+            return await AsyncOrderRepository.list_all(db, limit=limit, after=after, status=status)
+
+        return await AsyncOrderRepository.list_by_department(
+            db=db,
+            department_id=user["department_id"],
+            limit=limit,
+            after=after,
+            status=status
+        )
+
+    @staticmethod
+    async def get_my_orders(db: AsyncSession, user, limit: int | None = None, cursor: str | None = None):
+        return await AsyncOrderRepository.list_by_user(
+            db=db,
+            user_id=user["sub"],
+            limit=limit,
+            after=decode_cursor(cursor) if cursor else None
+        )
+
+    @staticmethod
+    async def get_order(db: AsyncSession, order_id, user):
+        order = await AsyncOrderRepository.get_by_id(db, order_id)
+        if not order:
+            raise ValueError("Order not found")
+
+        if user["role"] != "admin" and str(order.department_id) != str(user["department_id"]):
+            raise ValueError("Order not found")
+
+        return order
+
+    @staticmethod
+    async def update_order_status(db: AsyncSession, order_id, status: OrderStatus, user):
+        if user["role"] != "admin":
+            raise ValueError("Only admin can update order status")
+
+        # The response has the order columns only
+        order = await AsyncOrderRepository.get_by_id(db, order_id, items="lazy")
+        if not order:
+            raise ValueError("Order not found")
+
+        return await AsyncOrderRepository.update_status(db, order, status)
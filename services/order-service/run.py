@@ -1,10 +1,48 @@
+import importlib.util
+
 import uvicorn
-from app.main import create_app
+
+from app.config import app_config
+
+
+def server_options() -> dict:
+    """
+    uvicorn settings of the run mode: one process with the defaults in
+    development, WORKERS processes on uvloop/httptools in production
+    """
+    if app_config.RUN_MODE != "production":
+        return {}
+    return {
+        "workers": app_config.WORKERS,
+        "loop": "uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        "http": "httptools" if importlib.util.find_spec("httptools") else "h11",
+        "backlog": app_config.BACKLOG,
+        "timeout_keep_alive": app_config.KEEP_ALIVE_TIMEOUT,
+        # On SIGTERM: stop accepting, let in-flight requests finish, then
+        # run the lifespan shutdown (engine.dispose())
+        "timeout_graceful_shutdown": app_config.GRACEFUL_SHUTDOWN_TIMEOUT,
+        # Requests are counted by /metrics already
+        "access_log": False,
+    }
+
+
+def migrate() -> None:
+    """
+    Apply the migrations once, before the workers start
+    """
+    from app.db import engine, upgrade_schema
+
+    upgrade_schema()
+    engine.dispose()
+
 
 if __name__ == "__main__":
+    migrate()
+    # Passed by name: every worker builds its own app (and DB pool)
     uvicorn.run(
-        create_app(),
+        "app.main:create_app",
+        factory=True,
         host="0.0.0.0",
         port=8002,
+        **server_options()
     )
-
@@ -1,14 +1,24 @@
+from contextlib import contextmanager
+
+import httpx
 import pytest
+import pytest_asyncio
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 
 import sys
 import os
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from app.db import Base, get_db
+from alembic import command
+
+from app.config import app_config
+from app.db import alembic_config, async_database_url, get_async_db, get_db
+from app.deadline import watch_queries
 from app.main import create_app
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -17,6 +27,7 @@ engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False}
 )
+watch_queries(engine)
 
 TestingSessionLocal = sessionmaker(
     autocommit=False,
@@ -24,12 +35,47 @@ TestingSessionLocal = sessionmaker(
     bind=engine
 )
 
+# Same database, for the DB_MODE=async tests; no pooling, as every async
+# test runs on its own event loop
+async_engine = create_async_engine(async_database_url(SQLALCHEMY_DATABASE_URL), poolclass=NullPool)
+watch_queries(async_engine.sync_engine)
+
+TestingAsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+
+@contextmanager
+def assert_query_count(expected: int):
+    """
+    Assert that the block runs exactly ``expected`` SQL statements on the
+    test engine; yields the list of the statements run
+    """
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert len(statements) == expected, (
+        f"expected {expected} statements, got {len(statements)}:\n" + "\n".join(statements)
+    )
+
 
 @pytest.fixture(scope="session", autouse=True)
 def create_test_db():
-    Base.metadata.create_all(bind=engine)
+    # The schema of the migrations, as in production
+    with engine.begin() as connection:
+        command.upgrade(alembic_config(connection), "head")
     yield
-    Base.metadata.drop_all(bind=engine)
+    with engine.begin() as connection:
+        command.downgrade(alembic_config(connection), "base")
 
 
 @pytest.fixture()
@@ -53,3 +99,24 @@ def client(db):
 
     app.dependency_overrides[get_db] = override_get_db
     return TestClient(app)
+
+
+@pytest_asyncio.fixture()
+async def async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+
+@pytest_asyncio.fixture()
+async def async_client(async_db, monkeypatch):
+    # The app of DB_MODE=async, on the async session of the test
+    monkeypatch.setattr(app_config, "DB_MODE", "async")
+    app = create_app()
+
+    async def override_get_async_db():
+        yield async_db
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://order-service") as client:
+        yield client
@@ -0,0 +1,65 @@
+import inspect
+from uuid import UUID
+
+import pytest
+
+from app.db.models import OrderStatus
+from app.order_repository import AsyncOrderRepository
+from app.schemas import OrderItemCreate
+
+ADMIN = {"X-User-ID": "cdcdcdcd-cdcd-cdcd-cdcd-cdcdcdcdcdcd", "X-User-Role": "admin"}
+
+
+@pytest.mark.asyncio
+async def test_async_repository_loads_items_eagerly(async_db):
+    """Test that orders listed on an AsyncSession come with their items, newest first"""
+    user_id = UUID("efefefef-efef-efef-efef-efefefefefef")
+    for name in ("Product R", "Product S"):
+        created = await AsyncOrderRepository.create_order(
+            db=async_db,
+            user_id=user_id,
+            department_id=UUID("00000000-0000-0000-0000-000000000002"),
+            description=f"Async order {name}",
+            items=[OrderItemCreate(product_name=name, quantity=2)]
+        )
+    async_db.expunge_all()
+
+    orders = await AsyncOrderRepository.list_by_user(async_db, user_id, limit=1)
+    fetched = await AsyncOrderRepository.get_by_id(async_db, created.id)
+
+    assert [order.id for order in orders] == [created.id]
+    # Loaded already: a lazy load would fail outside of a greenlet
+    assert [(item.product_name, item.quantity) for item in fetched.items] == [("Product S", 2)]
+
+    updated = await AsyncOrderRepository.update_status(async_db, fetched, OrderStatus.APPROVED)
+    assert updated.status == OrderStatus.APPROVED
+
+
+@pytest.mark.asyncio
+async def test_async_routes_serve_the_same_api(async_client):
+    """Test the DB_MODE=async routes: async handlers with the API of the sync ones"""
+    routes = {route.path: route for route in async_client._transport.app.routes if hasattr(route, "endpoint")}
+    assert inspect.iscoroutinefunction(routes["/orders/me"].endpoint)
+
+    payload = {"description": "Async route order", "items": [{"product_name": "Product T", "quantity": 3}]}
+    created = await async_client.post("/orders/create", json=payload, headers={"Idempotency-Key": "async-1"})
+    replayed = await async_client.post("/orders/create", json=payload, headers={"Idempotency-Key": "async-1"})
+    assert created.status_code == 200
+    assert replayed.json() == created.json()
+    assert replayed.headers["idempotent-replayed"] == "true"
+
+    order_id = created.json()["id"]
+    fetched = await async_client.get(f"/orders/{order_id}")
+    assert fetched.json()["items"] == [{"product_name": "Product T", "quantity": 3}]
+
+    mine = await async_client.get("/orders/me", params={"limit": 1})
+    assert [order["id"] for order in mine.json()] == [order_id]
+    assert "x-next-cursor" in mine.headers
+
+    updated = await async_client.put(f"/orders/{order_id}/status", params={"status": "approved"}, headers=ADMIN)
+    assert updated.status_code == 200
+    assert updated.json()["status"] == "approved"
+
+    pending = await async_client.get("/orders", params={"status": "pending"}, headers=ADMIN)
+    assert order_id not in [order["id"] for order in pending.json()]
+    assert (await async_client.get("/orders/me", params={"cursor": "bad"})).status_code == 400
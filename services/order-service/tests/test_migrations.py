@@ -0,0 +1,118 @@
+import re
+import uuid
+from contextlib import contextmanager
+
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import MetaData, create_engine, event, text
+
+from conftest import engine
+from app.db import Base, upgrade_schema
+from app.db.models import OrderStatus
+from app.idempotency_repository import IdempotencyRepository
+from app.order_repository import OrderRepository
+from app.schemas import OrderItemCreate
+
+
+@contextmanager
+def query_plans():
+    """
+    Yield a list filled, when the block ends, with the (table, SQLite query
+    plan) of every SELECT the block ran, explained with its parameters
+    """
+    executed, plans = [], []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            executed.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield plans
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    with engine.connect() as connection:
+        for statement, parameters in executed:
+            rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)
+            table = re.search(r"\bFROM (\w+)", statement).group(1)
+            plans.append((table, " | ".join(row[3] for row in rows)))
+
+
+def test_migrations_match_the_models():
+    """Test that the migrated schema has every table, column and index of the models"""
+    with engine.connect() as connection:
+        assert compare_metadata(MigrationContext.configure(connection), Base.metadata) == []
+
+
+def test_idempotency_key_lookup_uses_unique_index(db):
+    """Test 8c3e5a1f2b07: a key is found through the (user_id, key) unique constraint"""
+    with query_plans() as plans:
+        IdempotencyRepository.get(db, uuid.uuid4(), "key")
+
+    assert "USING INDEX sqlite_autoindex_idempotency_keys" in plans[0][1]
+
+
+def test_order_lists_use_their_indexes(db):
+    """Test 5d83a6e1c07f: filtered, sorted and item queries read an index, without a sort"""
+    order = OrderRepository.create_order(
+        db=db,
+        user_id=uuid.uuid4(),
+        department_id=uuid.uuid4(),
+        description="Indexed order",
+        items=[OrderItemCreate(product_name="Product Q", quantity=1)]
+    )
+    db.expunge_all()
+
+    with query_plans() as plans:
+        OrderRepository.list_by_department(db, order.department_id, limit=10)
+        OrderRepository.list_by_user(db, order.user_id, limit=10)
+        OrderRepository.list_all(db, limit=10)
+
+    orders = [plan for table, plan in plans if table == "orders"]
+    items = [plan for table, plan in plans if table == "order_items"]
+    department, user, everything = orders
+    assert "USING INDEX ix_orders_department_id_created_at (department_id=?)" in department
+    assert "USING INDEX ix_orders_user_id_created_at (user_id=?)" in user
+    assert "USING INDEX ix_orders_created_at" in everything
+    assert all("USING INDEX ix_order_items_order_id" in plan for plan in items) and items
+    assert not any("TEMP B-TREE" in plan for plan in orders)
+
+
+def test_pending_orders_use_partial_index(db):
+    """Test e2a9174bd356: the approval queue reads the partial index of the pending orders"""
+    with query_plans() as plans:
+        OrderRepository.list_all(db, limit=10, status=OrderStatus.PENDING)
+        OrderRepository.list_all(db, limit=10, status=OrderStatus.APPROVED)
+
+    pending, approved = [plan for table, plan in plans if table == "orders"]
+    assert "USING INDEX ix_orders_pending_created_at" in pending
+    assert "TEMP B-TREE" not in pending
+    assert "ix_orders_pending_created_at" not in approved
+
+
+@pytest.mark.parametrize("tables", [
+    ("orders", "order_items"),
+    ("orders", "order_items", "idempotency_keys"),
+])
+def test_database_created_by_create_all_is_migrated(tmp_path, tables):
+    """Test that an unversioned database of create_all is stamped, then migrated, keeping its rows"""
+    legacy = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    metadata = MetaData()
+    for name in tables:
+        table = Base.metadata.tables[name].to_metadata(metadata)
+        if name != "idempotency_keys":
+            # As create_all built them, before the list indexes
+            table.indexes.clear()
+    metadata.create_all(legacy)
+    with legacy.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO orders (id, user_id, department_id, status) VALUES ('1', '2', '3', 'PENDING')"
+        ))
+
+    upgrade_schema(legacy)
+
+    with legacy.connect() as connection:
+        assert compare_metadata(MigrationContext.configure(connection), Base.metadata) == []
+        assert connection.execute(text("SELECT count(*) FROM orders")).scalar() == 1
+    legacy.dispose()
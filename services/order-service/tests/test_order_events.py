@@ -0,0 +1,77 @@
+import asyncio
+import json
+from uuid import UUID
+
+import pytest
+
+from app.db.models import OrderStatus
+from app.events import RESYNC, STATUS_CHANGED, EventBroker, broker, event_stream, format_event
+from app.order_repository import OrderRepository
+from app.schemas import OrderItemCreate
+
+DEPARTMENT = "77777777-7777-7777-7777-777777777777"
+
+
+@pytest.mark.asyncio
+async def test_status_change_is_pushed_to_matching_subscribers(db):
+    """Test that a committed status change reaches the department, not the others"""
+    department = broker.subscribe("88888888-8888-8888-8888-888888888888", department_id=DEPARTMENT)
+    other = broker.subscribe("99999999-9999-9999-9999-999999999999", department_id=str(UUID(int=5)))
+    try:
+        order = OrderRepository.create_order(
+            db=db,
+            user_id=UUID("88888888-8888-8888-8888-888888888881"),
+            department_id=UUID(DEPARTMENT),
+            description="Evented order",
+            items=[OrderItemCreate(product_name="Product V", quantity=1)]
+        )
+        OrderRepository.update_status(db, order, OrderStatus.APPROVED)
+
+        event = await asyncio.wait_for(department.next(), timeout=1)
+        await asyncio.sleep(0)
+        assert other.queue.empty()
+    finally:
+        broker.unsubscribe(department)
+        broker.unsubscribe(other)
+
+    assert event["type"] == STATUS_CHANGED
+    assert event["order_id"] == str(order.id)
+    assert (event["previous_status"], event["status"]) == ("pending", "approved")
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_queue_is_bounded():
+    """Test that a full queue drops the oldest events and asks the client to resync"""
+    events = EventBroker(queue_size=2)
+    subscription = events.subscribe("u", all_orders=True)
+    for index in range(5):
+        events.publish({"type": STATUS_CHANGED, "user_id": "x", "department_id": "d", "index": index})
+    await asyncio.sleep(0)
+
+    assert subscription.queue.qsize() == 2
+    assert (await subscription.next())["type"] == RESYNC
+    assert [(await subscription.next())["index"] for _ in range(2)] == [3, 4]
+
+
+@pytest.mark.asyncio
+async def test_event_stream_frames_and_heartbeat():
+    """Test the SSE framing, the keep-alive comments and the unsubscribe on close"""
+    subscription = broker.subscribe("u", all_orders=True)
+    stream = event_stream(subscription, heartbeat=0.01)
+
+    assert (await stream.__anext__()).startswith("retry: ")
+    assert await stream.__anext__() == ": keep-alive\n\n"
+    broker.publish({"type": STATUS_CHANGED, "id": "1", "user_id": "x", "department_id": "d", "status": "approved"})
+    frame = await stream.__anext__()
+    await stream.aclose()
+
+    lines = frame.strip().split("\n")
+    assert lines[:2] == ["id: 1", f"event: {STATUS_CHANGED}"]
+    assert json.loads(lines[2][len("data: "):])["status"] == "approved"
+    assert frame == format_event({"type": STATUS_CHANGED, "id": "1", "user_id": "x", "department_id": "d", "status": "approved"})
+    assert subscription not in broker._subscriptions
+
+
+def test_events_route_rejects_unknown_scope(client):
+    """Test the scope parameter of the events stream"""
+    assert client.get("/orders/events?scope=everything").status_code == 422
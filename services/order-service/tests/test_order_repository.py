@@ -1,7 +1,14 @@
+import pytest
+import time
+import uuid
+from datetime import datetime
 from uuid import UUID
+from sqlalchemy import insert
+from conftest import assert_query_count
+from app.deadline import DeadlineExceeded, _deadline
 from app.order_repository import OrderRepository
-from app.schemas import OrderItemCreate
-from app.db.models import OrderStatus
+from app.schemas import OrderItemCreate, OrderResponse
+from app.db.models import Order, OrderItem, OrderStatus
 
 
 def test_create_and_get_order(db):
@@ -112,3 +119,61 @@ def test_update_order_status(db):
     # Verify the update persisted
     fetched = OrderRepository.get_by_id(db, order.id)
     assert fetched.status == OrderStatus.APPROVED
+
+
+def test_query_after_deadline_is_not_run(db):
+    """Test that no query runs once the deadline of the request has passed"""
+    token = _deadline.set(time.time() - 1)
+    try:
+        with pytest.raises(DeadlineExceeded):
+            OrderRepository.list_all(db)
+    finally:
+        _deadline.reset(token)
+
+
+def test_create_order_inserts_items_at_once_without_reading_back(db):
+    """Test that an order takes one INSERT per table and is returned without a SELECT"""
+    with assert_query_count(2) as statements:
+        order = OrderRepository.create_order(
+            db=db,
+            user_id=UUID("12121212-1212-1212-1212-121212121212"),
+            department_id=UUID("34343434-3434-3434-3434-343434343434"),
+            description="Bulk order",
+            items=[OrderItemCreate(product_name=f"Product {i}", quantity=i + 1) for i in range(50)]
+        )
+        assert order.created_at is not None
+        assert [item.quantity for item in order.items] == list(range(1, 51))
+
+    assert [statement.split()[2] for statement in statements] == ["orders", "order_items"]
+
+    fetched = OrderRepository.get_by_id(db, order.id)
+    assert fetched is order
+    assert sorted(item.product_name for item in fetched.items) == sorted(f"Product {i}" for i in range(50))
+
+
+def test_listing_orders_takes_constant_statements(db):
+    """Test that listing 1,000 orders with their items does not query per order"""
+    department_id = UUID("56565656-5656-5656-5656-565656565656")
+    orders = [
+        {"id": uuid.uuid4(), "user_id": uuid.uuid4(), "department_id": department_id,
+         "status": OrderStatus.PENDING, "created_at": datetime.utcnow()}
+        for _ in range(1000)
+    ]
+    db.execute(insert(Order), orders)
+    db.execute(insert(OrderItem), [
+        {"id": uuid.uuid4(), "order_id": order["id"], "product_name": name, "quantity": 1}
+        for order in orders for name in ("Product F", "Product G")
+    ])
+    db.commit()
+
+    # The orders, then the items of each batch of 500 orders (SELECT ... IN)
+    for items, statements in (("selectin", 3), ("joined", 1)):
+        db.expunge_all()
+        with assert_query_count(statements):
+            listed = OrderRepository.list_by_department(db, department_id, items=items)
+            body = [OrderResponse.model_validate(order) for order in listed]
+        assert len(body) == 1000
+        assert all(len(order.items) == 2 for order in body)
+
+    with pytest.raises(ValueError):
+        OrderRepository.list_all(db, items="eager")
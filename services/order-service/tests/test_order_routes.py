@@ -1,4 +1,7 @@
+import time
 from uuid import UUID
+from app.db.models import Order, OrderItem
+from app.tracing import InMemorySpanExporter, tracer
 
 
 def test_create_order_route(client):
@@ -130,9 +133,121 @@ def test_update_order_status_route_requires_admin(client, db):
     assert "Only admin can update order status" in response.json()["detail"]
 
 
+def test_get_order_route(client, db):
+    """Test getting a single order via /orders/{order_id}"""
+    order = Order(
+        user_id=UUID("12345678-1234-5678-1234-567812345678"),
+        department_id=UUID("00000000-0000-0000-0000-000000000001"),
+        description="Order to fetch"
+    )
+    order.items.append(OrderItem(product_name="Product A", quantity=2))
+    db.add(order)
+    db.commit()
+
+    response = client.get(f"/orders/{order.id}")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["id"] == str(order.id)
+    assert data["items"] == [{"product_name": "Product A", "quantity": 2}]
+
+    missing = client.get("/orders/bbbbbbbb-bbbb-bbbb-bbbb-bbbbbbbbbbbb")
+    assert missing.status_code == 404
+
+
 def test_health_check(client):
     """Test health check endpoint"""
     response = client.get("/")
     
     assert response.status_code == 200
     assert response.json()["message"] == "Health check successful"
+
+
+def test_metrics_endpoint(client):
+    """Test that served requests show up in the Prometheus metrics"""
+    client.get("/")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert 'http_requests_total{method="GET",route="/",status="200"} 1' in response.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/"} 1' in response.text
+
+
+def test_trace_context_and_server_timing(client, monkeypatch):
+    """Test that the gateway trace is continued down to the repository calls"""
+    exporter = InMemorySpanExporter()
+    monkeypatch.setattr(tracer, "exporter", exporter)
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+
+    response = client.get("/orders/me", headers={"traceparent": f"00-{trace_id}-00f067aa0ba902b7-01"})
+
+    assert response.status_code == 200
+    assert "db;dur=" in response.headers["server-timing"]
+    server = next(span for span in exporter.spans if span.kind == "server")
+    repository = next(span for span in exporter.spans if span.name == "OrderRepository.list_by_user")
+    assert server.trace_id == trace_id
+    assert server.parent_id == "00f067aa0ba902b7"
+    assert repository.trace_id == trace_id
+    assert repository.parent_id == server.span_id
+
+
+def test_request_past_its_deadline_returns_504(client):
+    """Test that a request the gateway already gave up on is not processed"""
+    expired = str(int((time.time() - 1) * 1000))
+    response = client.get("/orders/me", headers={"X-Request-Deadline": expired})
+
+    assert response.status_code == 504
+    # A deadline still ahead does not get in the way
+    upcoming = str(int((time.time() + 30) * 1000))
+    assert client.get("/", headers={"X-Request-Deadline": upcoming}).status_code == 200
+
+
+def test_create_order_with_idempotency_key_is_replayed(client, db):
+    """Test that a retried creation returns the first order without a new insert"""
+    payload = {"description": "Idempotent order", "items": [{"product_name": "Product I", "quantity": 2}]}
+    headers = {"Idempotency-Key": "create-7f3a"}
+
+    first = client.post("/orders/create", json=payload, headers=headers)
+    count = db.query(Order).count()
+    retry = client.post("/orders/create", json=payload, headers=headers)
+
+    assert first.status_code == 200
+    assert retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+    assert db.query(Order).count() == count
+
+    # Same key, other payload: rejected
+    other = client.post("/orders/create", json={**payload, "description": "Other"}, headers=headers)
+    assert other.status_code == 422
+
+
+def test_list_orders_is_paginated_by_cursor(client):
+    """Test walking /orders/me page by page, newest first, without gaps or repeats"""
+    headers = {"X-User-ID": "abababab-abab-abab-abab-abababababab", "X-User-Role": "staff"}
+    created = [
+        client.post(
+            "/orders/create",
+            json={"description": f"Paged order {i}", "items": [{"product_name": "Product P", "quantity": 1}]},
+            headers=headers
+        ).json()["id"]
+        for i in range(5)
+    ]
+
+    seen, cursor = [], None
+    for _ in range(4):
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/orders/me", params=params, headers=headers)
+        assert response.status_code == 200
+        seen.extend(order["id"] for order in response.json())
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+
+    assert seen == created[::-1]
+    assert cursor is None
+
+    assert client.get("/orders/me", params={"cursor": "not-a-cursor"}, headers=headers).status_code == 400
+    assert client.get("/orders", params={"limit": 0}).status_code == 422
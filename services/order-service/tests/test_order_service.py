@@ -1,8 +1,10 @@
 import pytest
+from datetime import datetime, timedelta
 from uuid import UUID
+from app.idempotency_repository import IdempotencyRepository
 from app.schemas import OrderCreateRequest, OrderItemCreate
-from app.services import OrderService
-from app.db.models import OrderStatus
+from app.services import IdempotencyKeyInProgress, OrderService, request_hash
+from app.db.models import IdempotencyKey, Order, OrderStatus
 
 
 def test_create_order(db):
@@ -153,3 +155,93 @@ def test_update_nonexistent_order_raises_error(db):
     
     with pytest.raises(ValueError, match="Order not found"):
         OrderService.update_order_status(db, fake_order_id, OrderStatus.APPROVED, admin_user)
+
+
+def test_get_order_is_scoped_to_department(db):
+    """Test that staff can only read the orders of their own department"""
+    request = OrderCreateRequest(
+        description="Order to read",
+        items=[OrderItemCreate(product_name="Product V", quantity=4)]
+    )
+
+    user = {
+        "sub": UUID("cccccccc-cccc-cccc-cccc-cccccccccccc"),
+        "role": "staff",
+        "department_id": UUID("00000000-0000-0000-0000-00000000000a")
+    }
+    other_department_user = {
+        "sub": UUID("dddddddd-dddd-dddd-dddd-dddddddddddd"),
+        "role": "staff",
+        "department_id": UUID("00000000-0000-0000-0000-00000000000b")
+    }
+
+    order = OrderService.create_order(db, request, user)
+
+    fetched = OrderService.get_order(db, order.id, user)
+    assert fetched.id == order.id
+
+    with pytest.raises(ValueError, match="Order not found"):
+        OrderService.get_order(db, order.id, other_department_user)
+
+
+def test_idempotency_key_in_progress_and_expired(db):
+    """Test a key still being processed, then reused once it expired"""
+    user = {
+        "sub": "22222222-2222-2222-2222-222222222222",
+        "role": "staff",
+        "department_id": "00000000-0000-0000-0000-000000000001"
+    }
+    request = OrderCreateRequest(items=[OrderItemCreate(product_name="Product K", quantity=1)])
+    record = IdempotencyRepository.reserve(
+        db, user["sub"], "pending-key", request_hash(request), datetime.utcnow() + timedelta(hours=1)
+    )
+    db.commit()
+
+    with pytest.raises(IdempotencyKeyInProgress):
+        OrderService.create_order_idempotent(db, request, user, "pending-key")
+
+    record.expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+    status_code, body, replayed = OrderService.create_order_idempotent(db, request, user, "pending-key")
+
+    assert (status_code, replayed) == (200, False)
+    assert IdempotencyRepository.get(db, user["sub"], "pending-key").response_body is not None
+
+
+def test_idempotent_create_is_all_or_nothing(db, monkeypatch):
+    """Test that a failure before the response is stored keeps neither the order nor the key"""
+    user = {
+        "sub": UUID("eeeeeeee-eeee-eeee-eeee-eeeeeeeeeeee"),
+        "role": "staff",
+        "department_id": UUID("00000000-0000-0000-0000-00000000000e")
+    }
+    request = OrderCreateRequest(items=[OrderItemCreate(product_name="Product F", quantity=1)])
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("crashed before the response was stored")
+
+    monkeypatch.setattr(IdempotencyRepository, "complete", fail)
+    with pytest.raises(RuntimeError):
+        OrderService.create_order_idempotent(db, request, user, "crash-key")
+    monkeypatch.undo()
+
+    assert db.query(Order).filter(Order.user_id == user["sub"]).count() == 0
+    assert IdempotencyRepository.get(db, user["sub"], "crash-key") is None
+
+    status_code, body, replayed = OrderService.create_order_idempotent(db, request, user, "crash-key")
+    assert (status_code, replayed) == (200, False)
+    assert db.query(Order).filter(Order.user_id == user["sub"]).count() == 1
+    assert OrderService.create_order_idempotent(db, request, user, "crash-key") == (200, body, True)
+
+
+def test_purge_expired_idempotency_keys(db):
+    """Test that the purge deletes the expired keys only"""
+    user_id = UUID("ffffffff-ffff-ffff-ffff-ffffffffffff")
+    now = datetime.utcnow()
+    for key, expires_at in (("expired", now - timedelta(seconds=1)), ("live", now + timedelta(hours=1))):
+        db.add(IdempotencyKey(user_id=user_id, key=key, request_hash="hash", expires_at=expires_at))
+    db.commit()
+
+    assert IdempotencyRepository.purge_expired(db) >= 1
+    assert IdempotencyRepository.get(db, user_id, "expired") is None
+    assert IdempotencyRepository.get(db, user_id, "live") is not None
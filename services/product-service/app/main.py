@@ -2,7 +2,10 @@ from fastapi import FastAPI
 from contextlib import asynccontextmanager
 
 from app.config import app_config
-from app.db import engine, Base, SQLALCHEMY_DATABASE_URL
+from app.deadline import DeadlineExceeded, DeadlineMiddleware, deadline_exceeded_handler
+from app.db import engine, SQLALCHEMY_DATABASE_URL, warm_up_pool
+from app.metrics import AppMetrics, MetricsMiddleware, metrics_endpoint
+from app.tracing import TracingMiddleware
 
 from app.routes import product_router
 
@@ -11,12 +14,13 @@ from app.routes import product_router
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # STARTUP
-    Base.metadata.create_all(bind=engine)
+    # STARTUP: runs in every worker before it accepts traffic; the tables
+    # are created by run.py beforehand
+    warm_up_pool(app_config.DB_POOL_WARMUP)
     yield  # the app run here
 
-    # SHUTDOWN (optional)
-    # engine.dispose()
+    # SHUTDOWN: runs once the in-flight requests are drained; close the pooled connections
+    engine.dispose()
 
 def create_app():
     product_app = FastAPI(
@@ -28,6 +32,13 @@ def create_app():
     print(">>> DATABASE_URL =", SQLALCHEMY_DATABASE_URL)
     product_app.include_router(product_router)
 
+    product_app.add_middleware(DeadlineMiddleware)
+    product_app.add_exception_handler(DeadlineExceeded, deadline_exceeded_handler)
+    product_app.state.metrics = AppMetrics()
+    product_app.add_middleware(MetricsMiddleware, metrics=product_app.state.metrics)
+    product_app.add_middleware(TracingMiddleware)
+    product_app.add_api_route("/metrics", metrics_endpoint, methods=["GET"], include_in_schema=False)
+
     @product_app.get("/")
     def health():
         return {"message": "Health check successful"}
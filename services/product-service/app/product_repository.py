@@ -2,8 +2,10 @@ from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 
 from app.db.models import Product
+from app.tracing import trace_repository
 
 
+@trace_repository
 class ProductRepository:
 
     @staticmethod
@@ -44,9 +46,12 @@ class ProductRepository:
         return db.query(Product).filter(Product.sku == sku).first()
 
     @staticmethod
-    def list_all(db: Session, skip: int = 0, limit: int = 100):
-        """List all products with pagination"""
-        return db.query(Product).offset(skip).limit(limit).all()
+    def list_all(db: Session, skip: int = 0, limit: int = 100, name: str | None = None):
+        """List all products with pagination, optionally only those with an exact name"""
+        query = db.query(Product)
+        if name is not None:
+            query = query.filter(Product.name == name)
+        return query.offset(skip).limit(limit).all()
 
     @staticmethod
     def update_product(
@@ -25,11 +25,12 @@ def create_product(
 def list_products(
     skip: int = 0,
     limit: int = 100,
+    name: str | None = None,
     db=Depends(get_db),
     user=Depends(get_current_user)
 ):
-    """List all products"""
-    return ProductService.list_products(db, user, skip=skip, limit=limit)
+    """List all products, optionally filtered by exact name"""
+    return ProductService.list_products(db, user, skip=skip, limit=limit, name=name)
 
 
 @product_router.get("/{product_id}", response_model=ProductResponse)
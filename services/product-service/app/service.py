@@ -35,11 +35,11 @@ class ProductService:
         return product
 
     @staticmethod
-    def list_products(db: Session, user: dict, skip: int = 0, limit: int = 100):
+    def list_products(db: Session, user: dict, skip: int = 0, limit: int = 100, name: str | None = None):
         """
         List all products (Admin and Staff)
         """
-        return ProductRepository.list_all(db, skip=skip, limit=limit)
+        return ProductRepository.list_all(db, skip=skip, limit=limit, name=name)
 
     @staticmethod
     def update_product(db: Session, product_id: str, request: ProductUpdate, user: dict):
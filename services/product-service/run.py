@@ -1,9 +1,50 @@
+import importlib.util
+
 import uvicorn
-from app.main import create_app
+
+from app.config import app_config
+
+
+def server_options() -> dict:
+    """
+    uvicorn settings of the run mode: one process with the defaults in
+    development, WORKERS processes on uvloop/httptools in production
+    """
+    if app_config.RUN_MODE != "production":
+        return {}
+    return {
+        "workers": app_config.WORKERS,
+        "loop": "uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        "http": "httptools" if importlib.util.find_spec("httptools") else "h11",
+        "backlog": app_config.BACKLOG,
+        "timeout_keep_alive": app_config.KEEP_ALIVE_TIMEOUT,
+        # On SIGTERM: stop accepting, let in-flight requests finish, then
+        # run the lifespan shutdown (engine.dispose())
+        "timeout_graceful_shutdown": app_config.GRACEFUL_SHUTDOWN_TIMEOUT,
+        # Requests are counted by /metrics already
+        "access_log": False,
+    }
+
+
+def create_tables() -> None:
+    """
+    Create the missing tables once, before the server (and its workers)
+    start; the workers do not create any, so they cannot race on them
+    """
+    from app.db import Base, engine
+    import app.db.models  # noqa: F401 - registers the tables
+
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
 
 if __name__ == "__main__":
+    create_tables()
+    # Passed by name: every worker builds its own app (and DB pool)
     uvicorn.run(
-        create_app(),
+        "app.main:create_app",
+        factory=True,
         host="0.0.0.0",
         port=8003,
+        **server_options()
     )
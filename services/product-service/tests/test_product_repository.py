@@ -1,5 +1,6 @@
 from uuid import UUID
 from app.product_repository import ProductRepository
+from app.tracing import InMemorySpanExporter, tracer
 
 
 def test_create_and_get_product(db):
@@ -96,6 +97,25 @@ def test_list_all_products(db):
     assert any(product.sku == "TEST-SKU-005" for product in all_products)
 
 
+def test_list_products_by_name(db):
+    """Test filtering the product list by exact name"""
+    product = ProductRepository.create_product(
+        db=db,
+        name="Named Product",
+        sku="TEST-SKU-NAME",
+        description="Product looked up by name",
+        stock_quantity=3,
+        min_stock=1
+    )
+
+
+    named = ProductRepository.list_all(db, name="Named Product")
+
+
+    assert [p.id for p in named] == [product.id]
+    assert ProductRepository.list_all(db, name="Unknown Product") == []
+
+
 def test_update_product(db):
     """Test updating product details"""
     product = ProductRepository.create_product(
@@ -183,3 +203,13 @@ def test_delete_product(db):
     fetched = ProductRepository.get_by_id(db, product_id)
     assert fetched is None
 
+
+
+def test_repository_calls_are_traced(db, monkeypatch):
+    """Test that every repository call is recorded as a span"""
+    exporter = InMemorySpanExporter()
+    monkeypatch.setattr(tracer, "exporter", exporter)
+
+    ProductRepository.get_by_sku(db, "UNKNOWN-SKU")
+
+    assert [span.name for span in exporter.spans] == ["ProductRepository.get_by_sku"]
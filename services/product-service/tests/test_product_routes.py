@@ -1,3 +1,6 @@
+import time
+
+
 def test_create_product_route(client):
     """Test creating a product via API endpoint"""
     response = client.post(
@@ -234,3 +237,23 @@ def test_duplicate_sku_returns_400(client):
     assert response.status_code == 400
     assert "already exists" in response.json()["detail"]
 
+
+
+def test_metrics_endpoint(client):
+    """Test that served requests show up in the Prometheus metrics"""
+    client.get("/")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert 'http_requests_total{method="GET",route="/",status="200"} 1' in response.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/"} 1' in response.text
+
+
+def test_request_past_its_deadline_returns_504(client):
+    """Test that a request the gateway already gave up on is not processed"""
+    expired = str(int((time.time() - 1) * 1000))
+    response = client.get("/products/list", headers={"X-Request-Deadline": expired})
+
+    assert response.status_code == 504
+    assert response.json() == {"detail": "Deadline exceeded before processing"}